@@ -132,6 +132,7 @@ class DesktopserverFramework(sgtk.platform.Framework):
                 host_aliases=self._get_host_aliases(host),
                 port=self._settings.port,
                 uses_intermediate_certificate_chain=self._uses_intermediate_certificate_chain,
+                prewarm_projects=self._settings.prewarm_projects,
             )
 
             self._server.start()
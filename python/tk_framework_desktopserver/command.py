@@ -8,48 +8,230 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import codecs
 import os
+import select
+import selectors
+import signal
 import subprocess
-from threading import Thread
 import tempfile
 import sys
-from queue import Queue
+import threading
+import time
 import traceback
 from .logger import get_logger
 
 import sgtk.util
+from twisted.internet import defer, protocol, reactor, threads
+from twisted.python import threadable
 
 logger = get_logger(__name__)
 
 
-class ReadThread(Thread):
+class OutputReader(object):
     """
-    Thread that reads a pipe.
+    Accumulates the output read from a pipe, and reports each complete line
+    to an optional callback as soon as it has been read.
     """
 
-    def __init__(self, p_out, target_queue):
+    def __init__(self, name, line_callback=None):
         """
         Constructor.
 
-        :param p_out: Pipe to read.
-        :param target_queue: Queue that will accumulate the pipe output.
+        :param str name: Name of the pipe, such as stdout, given to the
+            callback.
+        :param line_callback: Optional callable taking the name of the pipe
+            and a line of output, including its line ending.
         """
-        Thread.__init__(self, daemon=True)
-        self.pipe = p_out
-        self.target_queue = target_queue
+        self.name = name
+        self.chunks = []
+        self._line_callback = line_callback
+        self._partial_line = ""
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
 
-    def run(self):
+    def feed(self, data):
         """
-        Reads the contents of the pipe and adds it to the queue until the pipe
-        is closed.
+        Adds data read from the pipe.
+
+        :param bytes data: The data read.
         """
-        while True:
-            line = self.pipe.readline()  # blocking read
-            if isinstance(line, bytes):
-                line = line.decode("utf-8")
-            if line == "":
-                break
-            self.target_queue.put(line)
+        self._add(self._decoder.decode(data))
+
+    def close(self):
+        """
+        Flushes the data left once the pipe is closed.
+        """
+        self._add(self._decoder.decode(b"", final=True))
+
+        if self._line_callback and self._partial_line:
+            self._line_callback(self.name, self._partial_line)
+        self._partial_line = ""
+
+    def _add(self, text):
+        """
+        Adds decoded output, and reports the lines it completes.
+
+        :param str text: The decoded output.
+        """
+        if not text:
+            return
+
+        self.chunks.append(text)
+
+        if self._line_callback is None:
+            return
+
+        lines = (self._partial_line + text).splitlines(True)
+        if lines and not lines[-1].endswith(("\n", "\r")):
+            self._partial_line = lines.pop()
+        else:
+            self._partial_line = ""
+
+        for line in lines:
+            self._line_callback(self.name, line)
+
+
+class ProcessOutputProtocol(protocol.ProcessProtocol):
+    """
+    Collects the output of a process spawned by the reactor, and fires a
+    Deferred with its exit code and output once it has exited and all its
+    pipes are closed.
+
+    The process is terminated when it runs for longer than its timeout, or
+    when the Deferred is cancelled, in which case the Deferred fails with
+    CancelledError right away.
+    """
+
+    def __init__(
+        self, line_callback=None, timeout=None, stdin_data=None, results_pipe=False
+    ):
+        """
+        Constructor.
+
+        :param line_callback: Optional callable taking the name of the pipe
+            and a line of output.
+        :param float timeout: Optional number of seconds after which the
+            process is terminated.
+        :param bytes stdin_data: Optional data written to the process' stdin.
+        :param bool results_pipe: Whether the process writes results to
+            :attr:`Command.RESULTS_FD`, in which case they're added to the
+            tuple the Deferred fires with.
+        """
+        self.deferred = defer.Deferred(lambda _: self.terminate())
+        self._readers = {
+            1: OutputReader("stdout", line_callback),
+            2: OutputReader("stderr", line_callback),
+        }
+        if results_pipe:
+            self._readers[Command.RESULTS_FD] = OutputReader("results")
+        self._stdin_data = stdin_data
+        self._timeout = timeout
+        self._timed_out = False
+        self._pid = None
+        self._timeout_call = None
+        self._kill_call = None
+
+    def connectionMade(self):
+        """
+        Sends the data for the process' stdin, closing it once it's written,
+        and starts the timeout.
+        """
+        self._pid = self.transport.pid
+        if self._stdin_data:
+            self.transport.write(self._stdin_data)
+        self.transport.closeStdin()
+
+        if self._timeout is not None:
+            self._timeout_call = reactor.callLater(self._timeout, self._on_timeout)
+
+    def terminate(self):
+        """
+        Terminates the process, along with the processes it started if it
+        leads its own process group. They are killed if they're still running
+        once the grace period is over.
+        """
+        # The process either hasn't started yet, or was already asked to
+        # terminate.
+        if self._pid is None or self._kill_call is not None:
+            return
+
+        Command.signal_process_group(self._pid, signal.SIGTERM)
+        self._kill_call = reactor.callLater(
+            Command.TERMINATE_GRACE_PERIOD,
+            Command.signal_process_group,
+            self._pid,
+            signal.SIGKILL,
+        )
+
+    def _on_timeout(self):
+        """
+        Terminates the process once its timeout is over.
+        """
+        logger.warning("Subprocess timed out after %s seconds.", self._timeout)
+        self._timed_out = True
+        self.terminate()
+
+    def childDataReceived(self, child_fd, data):
+        """
+        Adds output read from one of the process' pipes.
+
+        :param int child_fd: The pipe's file descriptor in the process.
+        :param bytes data: The data read.
+        """
+        self._readers[child_fd].feed(data)
+
+    def childConnectionLost(self, child_fd):
+        """
+        Flushes the output of a pipe the process closed.
+
+        :param int child_fd: The pipe's file descriptor in the process.
+        """
+        if child_fd in self._readers:
+            self._readers[child_fd].close()
+
+    def processExited(self, reason):
+        """
+        Stops the timeout once the process has exited.
+
+        :param reason: A Failure wrapping ProcessDone or ProcessTerminated.
+        """
+        for delayed_call in (self._timeout_call, self._kill_call):
+            if delayed_call is not None and delayed_call.active():
+                delayed_call.cancel()
+
+        # The pid can be reused once the process has been reaped.
+        self._pid = None
+
+        if self._kill_call is not None:
+            # The processes it started that didn't lead the same process group
+            # can still hold the pipes open. We're not waiting on them.
+            self.transport.loseConnection()
+
+    def processEnded(self, reason):
+        """
+        Fires the Deferred with the process' exit code and output.
+
+        :param reason: A Failure wrapping ProcessDone or ProcessTerminated.
+        """
+        exit_code = reason.value.exitCode
+        if exit_code is None:
+            # Killed by a signal, which subprocess reports as a negative code.
+            exit_code = -reason.value.signal
+
+        if self._timed_out:
+            self._readers[2].chunks.append(Command.get_timeout_message(self._timeout))
+
+        result = (
+            exit_code,
+            "".join(self._readers[1].chunks),
+            "".join(self._readers[2].chunks),
+        )
+        if Command.RESULTS_FD in self._readers:
+            result += ("".join(self._readers[Command.RESULTS_FD].chunks),)
+
+        # The Deferred already failed if it was cancelled.
+        if not self.deferred.called:
+            self.deferred.callback(result)
 
 
 class Command(object):
@@ -63,13 +245,11 @@ class Command(object):
         return path
 
     @staticmethod
-    def call_cmd(args):
+    def get_environment():
         """
-        Runs a command in a separate process.
-
-        :param args: Command line tokens.
+        Builds the environment variables given to the processes we launch.
 
-        :returns: A tuple containing (exit code, stdout, stderr).
+        :returns: A dictionary of environment variables.
         """
         # The commands that are being run are probably being launched from Desktop, which would
         # have a TANK_CURRENT_PC environment variable set to the site configuration. Since we
@@ -84,80 +264,320 @@ class Command(object):
             if var in env:
                 del env[var]
 
+        return env
+
+    # Size of the chunks read from the pipes of a process.
+    READ_CHUNK_SIZE = 64 * 1024
+
+    # Number of seconds a process that timed out is given to exit once asked
+    # to terminate, after which it's killed.
+    TERMINATE_GRACE_PERIOD = 5.0
+
+    # Number of seconds between the checks for the cancellation of a process
+    # on Windows, where we can only wait on the process itself.
+    CANCEL_POLL_INTERVAL = 0.5
+
+    # Processes can write results to a pipe of their own, rather than mixing
+    # them with their output. This environment variable tells them where to
+    # write them: a file descriptor, or the path of a file on Windows, where
+    # the pipe can't be inherited. The reactor gives them the pipe as this
+    # file descriptor.
+    RESULTS_ENV_VAR = "TK_DESKTOP_SERVER_RESULTS"
+    RESULTS_FD = 3
+
+    @staticmethod
+    def signal_process_group(pid, sig):
+        """
+        Sends a signal to a process. When the process leads its own process
+        group, the signal is sent to the whole group, so that the processes
+        it started get it as well.
+
+        :param int pid: The process id.
+        :param int sig: The signal to send.
+        """
+        try:
+            if os.getpgid(pid) == pid:
+                os.killpg(pid, sig)
+            else:
+                os.kill(pid, sig)
+        except OSError:
+            # The process already exited.
+            pass
+
+    @staticmethod
+    def get_timeout_message(timeout):
+        """
+        :param float timeout: The number of seconds a process was allowed to
+            run for.
+
+        :returns: The message added to the stderr of a process that timed out.
+        """
+        return "\nThe process was terminated after running for %s seconds.\n" % timeout
+
+    @staticmethod
+    def call_cmd(
+        args,
+        line_callback=None,
+        timeout=None,
+        stdin_data=None,
+        results_pipe=False,
+        cancelled=None,
+    ):
+        """
+        Runs a command in a separate process.
+
+        :param args: Command line tokens.
+        :param line_callback: Optional callable taking the name of the pipe,
+            stdout or stderr, and a line of output. On Unix, it's called as
+            soon as each line has been read. On Windows, the output can only
+            be read once the process is done, so it's called then.
+        :param float timeout: Optional number of seconds after which the
+            process is terminated, along with the processes it started.
+        :param bytes stdin_data: Optional data written to the process' stdin.
+        :param bool results_pipe: Whether the process writes results where
+            the :attr:`RESULTS_ENV_VAR` environment variable tells it to.
+
+        :param cancelled: Optional :class:`threading.Event` that kills the
+            process, along with the processes it started, once set. This is
+            only supported on Windows, where :meth:`spawn_cmd` runs the
+            process from a thread.
+
+        :returns: A tuple containing (exit code, stdout, stderr), followed by
+            the results if a results pipe was requested.
+        """
+        env = Command.get_environment()
+
         # Launch the child process
         # Due to discrepencies on how child file descriptors and shell=True are
         # handled on Windows and Unix, we'll provide two implementations. See the Windows
         # implementation for more details.
         if sgtk.util.is_windows():
-            ret, stdout_lines, stderr_lines = Command._call_cmd_win32(args, env)
+            ret, stdout_lines, stderr_lines, results = Command._call_cmd_win32(
+                args, env, timeout, stdin_data, results_pipe, cancelled
+            )
+
+            if line_callback:
+                for name, lines in (("stdout", stdout_lines), ("stderr", stderr_lines)):
+                    for line in lines:
+                        line_callback(name, line)
         else:
-            ret, stdout_lines, stderr_lines = Command._call_cmd_unix(args, env)
+            ret, stdout_lines, stderr_lines, results = Command._call_cmd_unix(
+                args, env, line_callback, timeout, stdin_data, results_pipe
+            )
 
         out = "".join(stdout_lines)
         err = "".join(stderr_lines)
 
+        if results_pipe:
+            return ret, out, err, results
         return ret, out, err
 
     @staticmethod
-    def _call_cmd_unix(args, env):
+    def spawn_cmd(
+        args, line_callback=None, timeout=None, stdin_data=None, results_pipe=False
+    ):
+        """
+        Runs a command in a separate process without waiting for it. Must be
+        called from the reactor thread, which reads the process' output and
+        notices when it exits, so that no thread waits on the process.
+
+        The reactor can't start the process in its own process group, so
+        only the processes started by a process that makes itself a group
+        leader are terminated along with it.
+
+        :param args: Command line tokens.
+        :param line_callback: Optional callable taking the name of the pipe,
+            stdout or stderr, and a line of output, called from the reactor
+            thread as soon as each line has been read.
+        :param float timeout: Optional number of seconds after which the
+            process is terminated.
+        :param bytes stdin_data: Optional data written to the process' stdin.
+        :param bool results_pipe: Whether the process writes results where
+            the :attr:`RESULTS_ENV_VAR` environment variable tells it to.
+
+        :returns: A Deferred firing with a tuple containing (exit code, stdout,
+            stderr), followed by the results if a results pipe was requested.
+            Cancelling it terminates the process.
+        """
+        if sgtk.util.is_windows():
+            # The reactor's Windows processes inherit our handles, including
+            # the server's socket, which is what _call_cmd_win32 avoids. See
+            # its implementation for details. The thread waiting on the
+            # process kills it when the Deferred is cancelled.
+            cancelled = threading.Event()
+            deferred = defer.Deferred(lambda _: cancelled.set())
+
+            def on_result(result, fire):
+                # The Deferred already failed if it was cancelled.
+                if not deferred.called:
+                    fire(result)
+
+            threads.deferToThread(
+                Command.call_cmd,
+                args,
+                line_callback,
+                timeout,
+                stdin_data,
+                results_pipe,
+                cancelled,
+            ).addCallbacks(
+                on_result,
+                on_result,
+                callbackArgs=(deferred.callback,),
+                errbackArgs=(deferred.errback,),
+            )
+            return deferred
+
+        process_protocol = ProcessOutputProtocol(
+            line_callback, timeout, stdin_data, results_pipe
+        )
+        env = Command.get_environment()
+        child_fds = {0: "w", 1: "r", 2: "r"}
+        if results_pipe:
+            env[Command.RESULTS_ENV_VAR] = str(Command.RESULTS_FD)
+            child_fds[Command.RESULTS_FD] = "r"
+
+        try:
+            reactor.spawnProcess(
+                process_protocol,
+                args[0],
+                args,
+                env=env,
+                childFDs=child_fds,
+            )
+        except Exception:
+            # Do not log the command line, it might contain sensitive information!
+            logger.exception("Error running subprocess:")
+            result = (1, "", "%s\n%s" % (traceback.format_exc(), args))
+            return defer.succeed(result + ("",) if results_pipe else result)
+
+        return process_protocol.deferred
+
+    @staticmethod
+    def call_cmd_from_thread(
+        args,
+        line_callback=None,
+        timeout=None,
+        cancellation=None,
+        stdin_data=None,
+        results_pipe=False,
+    ):
+        """
+        Runs a command in a separate process spawned by the reactor, and waits
+        for it. This is meant for threads other than the reactor's, and falls
+        back on :meth:`call_cmd` when the reactor isn't running.
+
+        :param args: Command line tokens.
+        :param line_callback: Optional callable taking the name of the pipe
+            and a line of output. It's called from the reactor thread, unless
+            falling back on :meth:`call_cmd`.
+        :param float timeout: Optional number of seconds after which the
+            process is terminated.
+        :param cancellation: Optional :class:`shotgun.concurrency.Cancellation`
+            that terminates the process, without waiting for it to exit, once
+            cancelled. It's ignored when falling back on :meth:`call_cmd`.
+        :param bytes stdin_data: Optional data written to the process' stdin.
+        :param bool results_pipe: Whether the process writes results where
+            the :attr:`RESULTS_ENV_VAR` environment variable tells it to.
+
+        :returns: A tuple containing (exit code, stdout, stderr), followed by
+            the results if a results pipe was requested.
+        """
+        if not reactor.running or threadable.isInIOThread():
+            return Command.call_cmd(
+                args, line_callback, timeout, stdin_data, results_pipe
+            )
+
+        def spawn():
+            deferred = Command.spawn_cmd(
+                args, line_callback, timeout, stdin_data, results_pipe
+            )
+            if cancellation is not None:
+                cancellation.on_cancel(lambda: reactor.callFromThread(deferred.cancel))
+            return deferred
+
+        try:
+            return threads.blockingCallFromThread(reactor, spawn)
+        except defer.CancelledError:
+            result = (1, "", "The process was cancelled.\n")
+            return result + ("",) if results_pipe else result
+
+    @staticmethod
+    def _call_cmd_unix(
+        args, env, line_callback=None, timeout=None, stdin_data=None, results_pipe=False
+    ):
         """
         Runs a command in a separate process. Implementation for Unix based OSes.
 
         :param args: Command line tokens.
         :param env: Environment variables to set for the subprocess.
-
-        :returns: A tuple containing (exit code, stdout, stderr).
+        :param line_callback: Optional callable taking the name of the pipe
+            and a line of output, called as soon as each line has been read.
+        :param float timeout: Optional number of seconds after which the
+            process is terminated. The process is then started in its own
+            process group, so that the processes it started are terminated
+            with it.
+        :param bytes stdin_data: Optional data written to the process' stdin.
+        :param bool results_pipe: Whether to give the process a pipe to write
+            results to.
+
+        :returns: A tuple containing (exit code, stdout, stderr, results),
+            where stdout and stderr are lists of output chunks.
         """
         # Note: Tie stdin to a PIPE as well to avoid this python bug on windows
         # http://bugs.python.org/issue3905
-        # Queue code taken from: http://stackoverflow.com/questions/375427/non-blocking-read-on-a-subprocess-pipe-in-python
         stdout_lines = []
         stderr_lines = []
+        results = ""
+        results_fd = None
+        process = None
 
         try:
-            process = subprocess.Popen(
-                args,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                env=env,
-            )
-            process.stdin.close()
-
-            stdout_q = Queue()
-            stderr_q = Queue()
+            pass_fds = ()
+            if results_pipe:
+                # The process gets the write end of the pipe under the same
+                # file descriptor.
+                results_fd, results_write_fd = os.pipe()
+                pass_fds = (results_write_fd,)
+                env = dict(env)
+                env[Command.RESULTS_ENV_VAR] = str(results_write_fd)
 
-            stdout_t = ReadThread(process.stdout, stdout_q)
-            stdout_t.start()
-
-            stderr_t = ReadThread(process.stderr, stderr_q)
-            stderr_t.start()
+            try:
+                process = subprocess.Popen(
+                    args,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env=env,
+                    start_new_session=timeout is not None,
+                    pass_fds=pass_fds,
+                )
+            finally:
+                # Only the process writes to the pipe, so that we see it
+                # closed once it's done.
+                for fd in pass_fds:
+                    os.close(fd)
+
+            if not stdin_data:
+                process.stdin.close()
 
             # Popen.communicate() doesn't play nicely if the stdin pipe is closed
             # as it tries to flush it causing an 'I/O error on closed file' error
             # when run from a terminal
             #
-            # to avoid this, lets just poll the output from the process until
-            # it's finished
+            # to avoid this, lets just read the output from the process until
+            # both pipes are closed, then wait for it to exit. The pipes are
+            # closed by _read_output, whatever happens.
+            read_fd, results_fd = results_fd, None
+            stdout_lines, stderr_lines, results_lines, timed_out = Command._read_output(
+                process, line_callback, timeout, stdin_data, read_fd
+            )
+            results = "".join(results_lines)
             process.wait()
 
-            try:
-                process.stdout.flush()
-                process.stderr.flush()
-            except IOError:
-                # This fails on OSX 10.7, but it looks like there's no ill side effect
-                # from failing on that platform so we can ignore it.
-                logger.exception("Error while flushing file descriptor:")
-            stdout_t.join()
-            stderr_t.join()
-
-            while not stdout_q.empty():
-                stdout_lines.append(stdout_q.get())
-
-            while not stderr_q.empty():
-                stderr_lines.append(stderr_q.get())
-
             ret = process.returncode
+            if timed_out:
+                stderr_lines.append(Command.get_timeout_message(timeout))
         except Exception:
             # Do not log the command line, it might contain sensitive information!
             logger.exception("Error running subprocess:")
@@ -166,23 +586,191 @@ class Command(object):
             stderr_lines = traceback.format_exc().split()
             stderr_lines.append("%s" % args)
 
-        return ret, stdout_lines, stderr_lines
+            if results_fd is not None:
+                os.close(results_fd)
+
+            # Nobody is reading the process' output anymore, so we don't
+            # leave it running.
+            if process is not None and process.poll() is None:
+                Command.signal_process_group(process.pid, signal.SIGKILL)
+                process.wait()
+
+        return ret, stdout_lines, stderr_lines, results
+
+    @staticmethod
+    def _read_output(
+        process, line_callback=None, timeout=None, stdin_data=None, results_fd=None
+    ):
+        """
+        Reads the stdout and stderr pipes of a process until both are closed.
+        Both pipes are read from the current thread, in large chunks, as soon
+        as data is available on either of them. The data for the process'
+        stdin is written as the process reads it, so that neither of us
+        blocks on a full pipe.
+
+        When the timeout is over, the process is asked to terminate, and then
+        killed once the grace period is over.
+
+        :param process: A :class:`subprocess.Popen` object whose stdin, stdout
+            and stderr are pipes.
+        :param line_callback: Optional callable taking the name of the pipe
+            and a line of output.
+        :param float timeout: Optional number of seconds after which the
+            process is terminated.
+        :param bytes stdin_data: Optional data to write to the process' stdin,
+            which is closed once it's written.
+        :param int results_fd: Optional file descriptor of the read end of a
+            pipe the process writes its results to.
+
+        All the pipes are closed once this returns, or if it raises.
+
+        :returns: A tuple containing the stdout, stderr and results chunks,
+            and whether the process timed out.
+        :rtype: tuple
+        """
+        stdout_reader = OutputReader("stdout", line_callback)
+        stderr_reader = OutputReader("stderr", line_callback)
+        results_reader = OutputReader("results")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending_signals = [signal.SIGTERM, signal.SIGKILL]
+        timed_out = False
+
+        with selectors.DefaultSelector() as selector:
+            try:
+                selector.register(process.stdout, selectors.EVENT_READ, stdout_reader)
+                selector.register(process.stderr, selectors.EVENT_READ, stderr_reader)
+                if results_fd is not None:
+                    selector.register(results_fd, selectors.EVENT_READ, results_reader)
+                    # The selector's pipes are closed below.
+                    results_fd = None
+                if stdin_data:
+                    selector.register(
+                        process.stdin, selectors.EVENT_WRITE, memoryview(stdin_data)
+                    )
+
+                while selector.get_map():
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+
+                    if remaining is not None and remaining <= 0:
+                        if not pending_signals:
+                            # The pipes are held open by processes that left
+                            # the process group, we're not waiting on them.
+                            break
+
+                        if not timed_out:
+                            logger.warning(
+                                "Subprocess timed out after %s seconds.", timeout
+                            )
+                            timed_out = True
+
+                        Command.signal_process_group(
+                            process.pid, pending_signals.pop(0)
+                        )
+                        deadline = time.monotonic() + Command.TERMINATE_GRACE_PERIOD
+                        continue
+
+                    for key, events in selector.select(remaining):
+                        if events & selectors.EVENT_WRITE:
+                            Command._write_input(selector, key)
+                            continue
+
+                        data = os.read(key.fd, Command.READ_CHUNK_SIZE)
+                        if data:
+                            key.data.feed(data)
+                        else:
+                            # The process closed this pipe.
+                            Command._close_pipe(selector, key)
+            finally:
+                # Whether we're done or something went wrong, none of the
+                # pipes are left open, and none is closed twice.
+                for key in list(selector.get_map().values()):
+                    Command._close_pipe(selector, key)
+
+                if results_fd is not None:
+                    os.close(results_fd)
+
+        return (
+            stdout_reader.chunks,
+            stderr_reader.chunks,
+            results_reader.chunks,
+            timed_out,
+        )
+
+    @staticmethod
+    def _write_input(selector, key):
+        """
+        Writes the next chunk of a process' stdin data, which the selector
+        reported it can take. The pipe is closed once all the data is
+        written, or if the process closed it.
+
+        :param selector: The selector the pipe is registered with.
+        :param key: The pipe's selector key, whose data is a memoryview of
+            the data left to write.
+        """
+        try:
+            # Writing up to PIPE_BUF bytes can't block once the pipe is
+            # reported writable.
+            written = os.write(key.fd, key.data[: select.PIPE_BUF])
+        except BrokenPipeError:
+            # The process doesn't read its stdin anymore.
+            written = len(key.data)
+
+        remaining = key.data[written:]
+        if remaining:
+            selector.modify(key.fileobj, selectors.EVENT_WRITE, remaining)
+        else:
+            Command._close_pipe(selector, key)
+
+    @staticmethod
+    def _close_pipe(selector, key):
+        """
+        Stops reading or writing one of the pipes of a process, and closes it.
+
+        :param selector: The selector the pipe is registered with.
+        :param key: The pipe's selector key, whose data is its
+            :class:`OutputReader`, or the stdin data left to write.
+        """
+        selector.unregister(key.fileobj)
+
+        if isinstance(key.fileobj, int):
+            os.close(key.fileobj)
+        else:
+            key.fileobj.close()
+
+        if isinstance(key.data, OutputReader):
+            key.data.close()
 
     @staticmethod
-    def _call_cmd_win32(args, env):
+    def _call_cmd_win32(
+        args, env, timeout=None, stdin_data=None, results_pipe=False, cancelled=None
+    ):
         """
         Runs a command in a separate process. Implementation for Windows.
 
         :param args: Command line tokens.
         :param env: Environment variables to set for the subprocess.
-
-        :returns: A tuple containing (exit code, stdout, stderr).
+        :param float timeout: Optional number of seconds after which the
+            process is killed, along with the processes it started.
+        :param bytes stdin_data: Optional data written to the process' stdin.
+        :param bool results_pipe: Whether to give the process a file to write
+            results to.
+        :param cancelled: Optional :class:`threading.Event` that kills the
+            process, along with the processes it started, once set.
+
+        :returns: A tuple containing (exit code, stdout, stderr, results).
         """
         stdout_lines = []
         stderr_lines = []
+        results = ""
+        temp_paths = []
         try:
             stdout_path = Command._create_temp_file()
+            temp_paths.append(stdout_path)
             stderr_path = Command._create_temp_file()
+            temp_paths.append(stderr_path)
 
             # On Windows, file descriptors like sockets can be inherited by child
             # process and are only closed when the main process and all child
@@ -217,6 +805,21 @@ class Command(object):
 
             args = args + ["1>", stdout_path, "2>", stderr_path]
 
+            # For the same reasons, the process' stdin and results go through
+            # files as well.
+            if stdin_data:
+                stdin_path = Command._create_temp_file()
+                temp_paths.append(stdin_path)
+                with open(stdin_path, "wb") as stdin_file:
+                    stdin_file.write(stdin_data)
+                args = args + ["<", stdin_path]
+
+            if results_pipe:
+                results_path = Command._create_temp_file()
+                temp_paths.append(results_path)
+                env = dict(env)
+                env[Command.RESULTS_ENV_VAR] = results_path
+
             # Prevents the cmd.exe dialog from appearing on Windows.
             startupinfo = subprocess.STARTUPINFO()
             startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
@@ -224,7 +827,42 @@ class Command(object):
             process = subprocess.Popen(
                 args, close_fds=True, startupinfo=startupinfo, env=env, shell=True
             )
-            process.wait()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            timed_out = False
+            while True:
+                wait = None
+                if deadline is not None:
+                    wait = max(0, deadline - time.monotonic())
+                if cancelled is not None:
+                    # We can't wait on both the process and the event.
+                    wait = (
+                        Command.CANCEL_POLL_INTERVAL
+                        if wait is None
+                        else min(wait, Command.CANCEL_POLL_INTERVAL)
+                    )
+
+                try:
+                    process.wait(wait)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+
+                if cancelled is not None and cancelled.is_set():
+                    logger.debug("Subprocess cancelled.")
+                elif deadline is not None and time.monotonic() >= deadline:
+                    logger.warning("Subprocess timed out after %s seconds.", timeout)
+                    timed_out = True
+                else:
+                    continue
+
+                # The process is the shell, so the whole tree has to go.
+                subprocess.call(
+                    ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                    close_fds=True,
+                    startupinfo=startupinfo,
+                )
+                process.wait()
+                break
 
             # Read back the output from the two.
             with open(stdout_path, "rt") as stdout_file:
@@ -233,6 +871,13 @@ class Command(object):
             with open(stderr_path) as stderr_file:
                 stderr_lines = [l for l in stderr_file]
 
+            if timed_out:
+                stderr_lines.append(Command.get_timeout_message(timeout))
+
+            if results_pipe:
+                with open(results_path, "rt") as results_file:
+                    results = results_file.read()
+
             # Track the result code.
             ret = process.returncode
 
@@ -244,13 +889,10 @@ class Command(object):
             stderr_lines.append("%s" % args)
 
         # Don't lose any sleep over temporary files that can't be deleted.
-        try:
-            os.remove(stdout_path)
-        except:
-            pass
-        try:
-            os.remove(stderr_path)
-        except:
-            pass
+        for path in temp_paths:
+            try:
+                os.remove(path)
+            except:
+                pass
 
-        return ret, stdout_lines, stderr_lines
+        return ret, stdout_lines, stderr_lines, results
@@ -34,7 +34,14 @@ class Message(object):
 
         [Optional]
         reply: Any Object
+
+        [Optional]
+        progress: Any Object
     }
+
+    Progress messages are only sent to clients that set "stream" to true in
+    the command of their request. They carry the id of the request and are
+    sent while it's being processed, before the message with its reply.
     """
 
     def __init__(self, id, protocol_version):
@@ -56,6 +63,13 @@ class Message(object):
         """
         self.data["reply"] = reply_data
 
+    def progress(self, progress_data):
+        """
+        Set progress data for this message
+        :param progress_data: Dictionary Data describing the progress of a request
+        """
+        self.data["progress"] = progress_data
+
     def error(self, error_message, error_data):
         """
         Add error content to this message
@@ -31,6 +31,31 @@ class MessageHost(object):
         self._host = host
         self._message = message  # Message context that initiated this communication
 
+    @property
+    def streaming(self):
+        """
+        Whether the client asked for progress messages, by setting "stream" to
+        true in the command of its message. Clients that don't expect them
+        would take the first one as the reply.
+        """
+        command = self._message.get("command")
+        return isinstance(command, dict) and bool(command.get("stream"))
+
+    def progress(self, data):
+        """
+        Send progress on the current message, while it's being processed.
+        Nothing is sent unless the client asked for progress messages.
+
+        :param data: Object to send
+        """
+        if not self.streaming:
+            return
+
+        message = Message(self._message["id"], self._host.protocol_version)
+        message.progress(data)
+
+        self._send_message(message.data)
+
     def reply(self, data):
         """
         Reply to current message.
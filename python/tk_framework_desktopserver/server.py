@@ -22,6 +22,7 @@ from autobahn.twisted.websocket import WebSocketServerFactory, listenWS
 
 from .errors import MissingCertificateError, PortBusyError
 from . import certificates
+from . import shotgun
 
 from .logger import get_logger
 
@@ -78,6 +79,7 @@ class Server(object):
         host_aliases,
         port=None,
         uses_intermediate_certificate_chain=False,
+        prewarm_projects=0,
     ):
         """
         Constructor.
@@ -89,6 +91,8 @@ class Server(object):
         :param user_id: Id of the user we're expecting requests from.
         :param host_aliases: List of aliases available for the current host.
         :param port: Port to listen for websocket requests from.
+        :param prewarm_projects: Number of recently accessed projects whose actions
+            are cached in the background once the server is started.
         :param low_level_debug: If True, wss traffic will be written to the console.
         """
         self._port = port or self._DEFAULT_PORT
@@ -97,6 +101,7 @@ class Server(object):
         self._user_id = user_id
         self._host_aliases = host_aliases
         self._uses_intermediate_certificate_chain = uses_intermediate_certificate_chain
+        self._prewarm_projects = prewarm_projects
 
         # If encryption is required, compute a server id and retrieve the secret associated to it.
         if encrypt:
@@ -195,6 +200,9 @@ class Server(object):
         self._start_server()
         self._start_reactor()
 
+        if self._prewarm_projects:
+            shotgun.start_prewarm(self._prewarm_projects)
+
     def is_running(self):
         """
         :returns: True if the server is up and running, False otherwise.
@@ -207,3 +215,4 @@ class Server(object):
         """
         reactor.callFromThread(reactor.stop)
         self._reactor_thread.join()
+        shotgun.tear_down()
@@ -8,15 +8,18 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import contextlib
 import datetime
 import json
+import traceback
 from urllib.parse import urlparse
 
 import OpenSSL
 import sgtk
 from autobahn.twisted.websocket import WebSocketServerProtocol
 from cryptography.fernet import Fernet
-from twisted.internet import error, reactor
+from twisted.internet import defer, error, reactor
+from twisted.python import failure
 
 from . import shotgun
 from .logger import get_logger
@@ -59,6 +62,7 @@ class ServerProtocol(WebSocketServerProtocol):
         super().__init__()
         self._process_manager = ProcessManager.create()
         self._protocol_version = 2
+        self._wss_key = None
         # When set, the message to and from the server will be encrypted.
         self._fernet = None
 
@@ -112,6 +116,10 @@ class ServerProtocol(WebSocketServerProtocol):
 
         logger.debug("Reason received for connection loss: %s", reason)
 
+        # The data cached for this connection won't be used again.
+        if self._wss_key is not None:
+            shotgun.release_connection(self._wss_key)
+
     def onConnect(self, response):
         """
         Called upon client connection to server. This is where we decide if we accept the connection
@@ -411,18 +419,51 @@ class ServerProtocol(WebSocketServerProtocol):
                 # is bootstrapping sgtk, which won't play well if multiple
                 # are occurring at the same time, all of which potentially
                 # copying/downloading files to disk in the same location.
+                #
+                # Methods that wait on a subprocess can return a Deferred
+                # instead of tying up this thread, in which case the request
+                # is in progress until the Deferred fires.
+                request = contextlib.ExitStack()
+                request.enter_context(shotgun.interactive_request())
                 try:
-                    func(data)
+                    result = func(data)
                 except Exception as e:
-                    import traceback
-
+                    request.close()
                     message_host.report_error(
                         "Method call failed for %s: %s"
                         % (cmd_name, traceback.format_exc())
                     )
+                else:
+                    if isinstance(result, defer.Deferred):
+                        # Deferreds can only be used from the reactor thread.
+                        reactor.callFromThread(
+                            result.addBoth,
+                            self._on_request_done,
+                            request,
+                            message_host,
+                            cmd_name,
+                        )
+                    else:
+                        request.close()
         else:
             message_host.report_error("Command %s is not supported." % cmd_name)
 
+    def _on_request_done(self, result, request, message_host, cmd_name):
+        """
+        Called once the Deferred returned by an API method fires.
+
+        :param result: The Deferred's result, or a Failure.
+        :param request: The ExitStack holding the request in progress.
+        :param message_host: The MessageHost of the request.
+        :param str cmd_name: The name of the API method.
+        """
+        request.close()
+
+        if isinstance(result, failure.Failure):
+            message_host.report_error(
+                "Method call failed for %s: %s" % (cmd_name, result.getTraceback())
+            )
+
     def report_error(self, message, data=None):
         """
         Report an error to the client.
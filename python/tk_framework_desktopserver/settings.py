@@ -26,14 +26,17 @@ class Settings(object):
     port=9000
     debug=1
     certificate_folder=/path/to/the/certificate
+    prewarm_projects=5
     """
 
     _DEFAULT_PORT = 9000
+    _DEFAULT_PREWARM_PROJECTS = 5
 
     _BROWSER_INTEGRATION = "BrowserIntegration"
     _PORT_SETTING = "port"
     _CERTIFICATE_FOLDER_SETTING = "certificate_folder"
     _ENABLED = "enabled"
+    _PREWARM_PROJECTS_SETTING = "prewarm_projects"
     _HOST_ALIASES = "HostAliases"
 
     def __init__(self, default_certificate_folder):
@@ -61,6 +64,9 @@ class Settings(object):
         integration_enabled = UserSettings().get_boolean_setting(
             self._BROWSER_INTEGRATION, self._ENABLED
         )
+        prewarm_projects = user_settings.get_integer_setting(
+            self._BROWSER_INTEGRATION, self._PREWARM_PROJECTS_SETTING
+        )
 
         raw_host_aliases = {}
         if UserSettings().get_section_settings(self._HOST_ALIASES):
@@ -74,6 +80,11 @@ class Settings(object):
             certificate_folder or self._default_certificate_folder
         )
         self._integration_enabled = integration_enabled
+        self._prewarm_projects = (
+            prewarm_projects
+            if prewarm_projects is not None
+            else self._DEFAULT_PREWARM_PROJECTS
+        )
 
         # Keep the raw aliases for support, but filter the settings for API users.
         self._raw_host_aliases = raw_host_aliases
@@ -115,6 +126,14 @@ class Settings(object):
         """
         return self._certificate_folder
 
+    @property
+    def prewarm_projects(self):
+        """
+        Number of recently accessed projects whose actions are cached in the
+        background when the browser integration starts. 0 disables prewarming.
+        """
+        return self._prewarm_projects
+
     @property
     def host_aliases(self):
         """
@@ -132,4 +151,5 @@ class Settings(object):
         logger.debug("Integration enabled: %s" % self.integration_enabled)
         logger.debug("Certificate folder: %s" % self.certificate_folder)
         logger.debug("Port: %d" % self.port)
+        logger.debug("Prewarmed projects: %d" % self.prewarm_projects)
         logger.debug("Host aliases: %s" % pprint.pformat(self._raw_host_aliases))
@@ -12,6 +12,11 @@
 # that the factory functuon below populates.
 from . import api_v1
 from . import api_v2
+from . import constants
+from . import prewarm
+from ..process_manager import ProcessManager
+
+_prewarmer = None
 
 
 def get_shotgun_api(protocol_version, host, process_manager, wss_key):
@@ -39,3 +44,54 @@ def get_shotgun_api(protocol_version, host, process_manager, wss_key):
         return api_v2.ShotgunAPI(host, process_manager, wss_key)
     else:
         raise RuntimeError("Unsupported protocol version: %s" % protocol_version)
+
+
+def tear_down():
+    """
+    Releases the resources shared by the rpc APIs, such as the processes they
+    keep running in the background. This is called when the server shuts down.
+    """
+    global _prewarmer
+    if _prewarmer is not None:
+        _prewarmer.stop()
+        _prewarmer = None
+
+    api_v2.ShotgunAPI.tear_down()
+
+
+def release_connection(wss_key):
+    """
+    Releases the data the rpc APIs cached for a WSS connection. This is
+    called when the connection is lost.
+
+    :param str wss_key: The unique key associated with a WSS connection.
+    """
+    api_v2.ShotgunAPI.release_connection(wss_key)
+
+
+def interactive_request():
+    """
+    Context manager that marks a request from a client as in progress, so
+    that background work such as prewarming waits for it.
+    """
+    return api_v2.ShotgunAPI.INTERACTIVE_REQUESTS.active()
+
+
+def start_prewarm(max_projects):
+    """
+    Starts populating the engine commands cache in the background, for the
+    projects the current user accessed most recently.
+
+    :param int max_projects: Maximum number of projects to prewarm.
+    """
+    global _prewarmer
+    process_manager = ProcessManager.create()
+
+    _prewarmer = prewarm.Prewarmer(
+        lambda host: api_v2.ShotgunAPI(host, process_manager, prewarm.WSS_KEY),
+        activity=api_v2.ShotgunAPI.INTERACTIVE_REQUESTS,
+        max_projects=max_projects,
+        time_budget=constants.PREWARM_TIME_BUDGET,
+        idle_time=constants.PREWARM_IDLE_TIME,
+    )
+    _prewarmer.start()
@@ -13,25 +13,31 @@ import os
 import re
 import sqlite3
 import json
-import tempfile
+import concurrent.futures
 import contextlib
 import datetime
-import copy
 import base64
 import glob
 import threading
-import hashlib
 import html
 import traceback
 import time
-import fnmatch
+import functools
+import types
 
 import sgtk
 import sgtk.util
 from sgtk import TankFileDoesNotExistError
 from sgtk.commands.clone_configuration import clone_pipeline_configuration_html
 from sgtk.authentication import serialize_user
+from . import caches
+from . import concurrency
+from . import config_watcher
+from . import connection_pool
 from . import constants
+from . import contents_hash
+from . import engine_workers
+from . import hook_cache
 from .. import command
 
 logger = sgtk.platform.get_logger(__name__)
@@ -61,14 +67,49 @@ class ShotgunAPI(object):
     CACHE_VALIDATED = dict()
     CACHE_VALIDATION_INTERVAL = 2.0  # Seconds
 
-    # Stores data persistently per wss connection.
-    WSS_KEY_CACHE = dict()
-    DATABASE_FORMAT_VERSION = 1
+    # Stores data per wss connection, until the connection is lost or the
+    # data expires or gets evicted.
+    CONNECTION_CACHES = caches.ConnectionCacheManager(
+        ttl=constants.CONNECTION_CACHE_TTL,
+        max_bytes=constants.CONNECTION_CACHE_MAX_BYTES,
+        size_interval=constants.CONNECTION_CACHE_SIZE_INTERVAL,
+    )
+    # Stores data shared by all the connections to a site, which the
+    # per-connection caches are populated from.
+    SHARED_CACHE = caches.SharedCache(
+        ttl=constants.SHARED_CACHE_TTL,
+        probe_interval=constants.SHARED_CACHE_PROBE_INTERVAL,
+    )
+    # The file version is part of the cache database's file name, and should
+    # only be bumped when existing databases can't be migrated. Schema changes
+    # are handled by bumping the format version, which is stored in the
+    # database's user_version, and adding a migration step.
+    DATABASE_FILE_VERSION = 1
+    DATABASE_FORMAT_VERSION = 3
     # When the layout of the cache in a cache entry changes, bump this version
     # so we invalidate all cached entries.
     CACHE_ENTRY_SCHEMA_VERSION = 1
     SOFTWARE_FIELDS = ["id", "code", "updated_at", "type", "engine", "projects"]
     TOOLKIT_MANAGER = None
+    ENGINE_WORKER_POOL = None
+    # Keeps the mtimes of mutable configs' yml files up to date.
+    CONFIG_WATCHER = None
+    # Pools of cache database connections, keyed by database path.
+    CONNECTION_POOLS = dict()
+    # Computes contents hashes, reusing the digests of unchanged inputs.
+    CONTENTS_HASHER = contents_hash.ContentsHasher(constants.CONTENTS_HASH_HISTORY_SIZE)
+    # Requests received from the clients, which background work yields to.
+    INTERACTIVE_REQUESTS = concurrency.ActivityTracker()
+    # Engine commands decoded from the cache database.
+    ACTIONS_CACHE = caches.ActionsCache(constants.ACTIONS_CACHE_SIZE)
+    # Revalidates the cached engine commands in the background. Its stats
+    # include the number of revalidations waiting to run.
+    REVALIDATION_QUEUE = None
+    # The most recent snapshot of Software entities, and its index of the
+    # projects they're available in.
+    SOFTWARE_INDEX = None
+    # Instance of the browser_integration hook, and its memoized cache keys.
+    BROWSER_INTEGRATION_HOOK = None
 
     # Keys for the in-memory cache.
     TASK_PARENT_TYPES = "task_parent_types"
@@ -78,16 +119,37 @@ class ShotgunAPI(object):
     SOFTWARE_ENTITIES = "software_entities"
     ENTITY_TYPE_WHITELIST = "entity_type_whitelist"
     LEGACY_PROJECT_ACTIONS = "legacy_project_actions"
-    YML_FILE_DATA = "yml_file_data"
     ENTITY_PARENT_PROJECTS = "entity_parent_projects"
     SHOTGUN_YML_FILES = "shotgun_yml_files"
-
-    # We need to protect against concurrent bootstraps happening.
-    # This is a reentrant lock because get_actions is recursive
-    # when caching occurs, so might need to lock multiple times
-    # within the same thread.
+    ENTITY_TYPE_NAMES = "entity_type_names"
+    PUBLISHED_FILE_LINKABLE_TYPES = "published_file_linkable_types"
+    BATCH_ENTITIES = "batch_entities"
+
+    # Protects the toolkit manager shared by all API instances, which is
+    # reconfigured every time pipeline configuration data is looked up.
+    # This is a reentrant lock because the methods holding it call each
+    # other, so might need to lock multiple times within the same thread.
     _LOCK = threading.RLock()
 
+    # Caching bootstraps are serialized per pipeline configuration, and
+    # per bundle cache when the bootstrap is going to download the config
+    # into it. Bootstraps for unrelated configs can run in parallel, up to
+    # the limit enforced by the caching semaphore.
+    _CONFIG_LOCKS = concurrency.KeyedLocks()
+    _BUNDLE_CACHE_LOCKS = concurrency.KeyedLocks()
+    _CACHING_SEMAPHORE = None
+    # Runs the caching jobs of the configurations missing from the cache for
+    # get_actions requests.
+    _CACHING_EXECUTOR = None
+    # Waits on the engine commands executed by engine workers, so that the
+    # threads serving requests don't have to.
+    _ENGINE_WORKER_EXECUTOR = None
+    # Caching jobs in progress, keyed by lookup hash and contents hash.
+    # Concurrent requests that miss the cache for the same entity type, and
+    # revalidation threads, wait for the job in progress instead of
+    # bootstrapping the config again.
+    _CACHING_FLIGHTS = concurrency.SingleFlight()
+
     def __init__(self, host, process_manager, wss_key):
         """
         API Constructor.
@@ -112,17 +174,83 @@ class ShotgunAPI(object):
             logger.debug("Legacy tank command pathway disabled.")
             self._allow_legacy_workaround = False
 
-        if self._wss_key not in self.WSS_KEY_CACHE:
-            self.WSS_KEY_CACHE[self._wss_key] = dict()
+        if constants.ENABLE_ENGINE_WORKERS in os.environ:
+            logger.debug(
+                "Engine commands will be listed and executed by engine workers."
+            )
+            self._use_engine_workers = True
+        else:
+            self._use_engine_workers = False
 
-        self._cache = self.WSS_KEY_CACHE[self._wss_key]
+        self._cache = self.CONNECTION_CACHES.get(self._wss_key)
 
         # Cache path on disk.
         self._cache_path = os.path.join(
             self._engine.cache_location,
-            "shotgun_engine_commands_v%s.sqlite" % self.DATABASE_FORMAT_VERSION,
+            "shotgun_engine_commands_v%s.sqlite" % self.DATABASE_FILE_VERSION,
         )
 
+    @classmethod
+    def tear_down(cls):
+        """
+        Releases the resources shared by all API instances. This is called
+        when the server shuts down.
+        """
+        if cls.ENGINE_WORKER_POOL is not None:
+            cls.ENGINE_WORKER_POOL.shutdown()
+            cls.ENGINE_WORKER_POOL = None
+
+        if cls.CONFIG_WATCHER is not None:
+            cls.CONFIG_WATCHER.close()
+            cls.CONFIG_WATCHER = None
+
+        if cls.REVALIDATION_QUEUE is not None:
+            cls.REVALIDATION_QUEUE.shutdown()
+            cls.REVALIDATION_QUEUE = None
+
+        with cls._LOCK:
+            executors = [cls._CACHING_EXECUTOR, cls._ENGINE_WORKER_EXECUTOR]
+            cls._CACHING_EXECUTOR = None
+            cls._ENGINE_WORKER_EXECUTOR = None
+
+        for executor in executors:
+            if executor is not None:
+                # The jobs in progress aren't waited for.
+                executor.shutdown(wait=False)
+
+        cls.BROWSER_INTEGRATION_HOOK = None
+        cls.SOFTWARE_INDEX = None
+
+        with cls._LOCK:
+            pools = list(cls.CONNECTION_POOLS.values())
+            cls.CONNECTION_POOLS.clear()
+
+        for pool in pools:
+            pool.close_all()
+
+        cls.CONNECTION_CACHES.clear()
+        cls.SHARED_CACHE.clear()
+
+    @classmethod
+    def release_connection(cls, wss_key):
+        """
+        Releases the data cached for a WSS connection. This is called when
+        the connection is lost.
+
+        :param str wss_key: The WSS connection's unique key.
+        """
+        cls.CONNECTION_CACHES.release(wss_key)
+        logger.debug(
+            "Released cached data for %s: %s", wss_key, cls.CONNECTION_CACHES.stats()
+        )
+
+        # Nobody is left to reply to, so the caching this connection was the
+        # only one waiting on is stopped. Caching other requests still wait
+        # on, including background revalidations, keeps going.
+        cancelled = cls._CACHING_FLIGHTS.release(wss_key)
+        if cancelled:
+            logger.debug("Cancelled %s caching jobs for %s", cancelled, wss_key)
+
     ###########################################################################
     # Properties
 
@@ -157,17 +285,10 @@ class ShotgunAPI(object):
         # if there was some kind of unhandled exception that there is a proper
         # reply to the client so that the Promise can be kept or broken, as is
         # appropriate.
-        try:
-            self._execute_action(data)
-        except Exception:
-            self.host.reply(
-                dict(
-                    err=self._get_exception_message(),
-                    retcode=constants.COMMAND_FAILED,
-                    out="",
-                ),
-            )
-            logger.exception(traceback.format_exc())
+        #
+        # The command's process might still be running when this returns, in
+        # which case the Deferred firing once it's done is returned.
+        return self._reply_errors(constants.COMMAND_FAILED, self._execute_action, data)
 
     def _execute_action(self, data):
         """
@@ -236,21 +357,6 @@ class ShotgunAPI(object):
 
                 return
 
-        args_file = self._get_arguments_file(
-            dict(
-                config=config_entity,
-                name=data["name"],
-                entities=entities,
-                project=project_entity,
-                sys_path=self._compute_sys_path(),
-                base_configuration=constants.BASE_CONFIG_URI,
-                engine_name=constants.ENGINE_NAME,
-                logging_prefix=constants.LOGGING_PREFIX,
-                bundle_cache_fallback_paths=self._engine.sgtk.bundle_cache_fallback_paths,
-                user=serialize_user(sgtk.get_authenticated_user()),
-            ),
-        )
-
         script = os.path.join(
             os.path.dirname(__file__), "scripts", "execute_command.py"
         )
@@ -273,14 +379,10 @@ class ShotgunAPI(object):
                 data,
             )
 
-        python_exe = self._get_python_interpreter(
-            all_pc_data[config_entity["id"]]["descriptor"]
-        )
+        descriptor = all_pc_data[config_entity["id"]]["descriptor"]
+        python_exe = self._get_python_interpreter(descriptor)
         logger.debug("Python executable: %s", python_exe)
 
-        args = [python_exe, script, args_file]
-        logger.debug("Subprocess arguments: %s", args)
-
         # Ensure the credentials are still valid before launching the command in
         # a separate process. We need do to this in advance because the process
         # that will be launched might not have PySide and as such won't be able
@@ -291,27 +393,163 @@ class ShotgunAPI(object):
         if sgtk.get_authenticated_user():
             sgtk.get_authenticated_user().refresh_credentials()
 
-        retcode, stdout, stderr = command.Command.call_cmd(args)
+        # Clients that asked for it get the command's log messages while it
+        # runs, rather than all at once when it's done.
+        line_callback = None
+        if self.host.streaming:
+            line_callback = self._stream_command_output
+
+        timeout = self._get_timeout(
+            constants.EXECUTE_TIMEOUT, constants.EXECUTE_TIMEOUT_ENV_VAR
+        )
+        arguments = self._encode_arguments(
+            dict(
+                config=config_entity,
+                name=data["name"],
+                entities=entities,
+                project=project_entity,
+                sys_path=self._compute_sys_path(),
+                base_configuration=constants.BASE_CONFIG_URI,
+                engine_name=constants.ENGINE_NAME,
+                logging_prefix=constants.LOGGING_PREFIX,
+                bundle_cache_fallback_paths=self._engine.sgtk.bundle_cache_fallback_paths,
+                user=serialize_user(sgtk.get_authenticated_user()),
+                # The script leads its own process group when it can time
+                # out, so that the processes it started are terminated
+                # along with it.
+                new_session=timeout is not None,
+            ),
+        )
+
+        args = [python_exe, script]
+
+        def reply_result(result, args=args):
+            return self._reply_errors(
+                constants.COMMAND_FAILED,
+                self._reply_command_result,
+                args,
+                *result,
+            )
+
+        def spawn():
+            # The reactor notices when the process exits, so no thread has to
+            # wait for it.
+            #
+            # The command keeps running if the connection is lost, since it
+            # was explicitly triggered by the user and is often meant to
+            # outlive the page, like a DCC launch.
+            logger.debug("Subprocess arguments: %s", args)
+            return command.Command.spawn_cmd(
+                args, line_callback, timeout, arguments
+            ).addCallback(reply_result)
+
+        if self._use_engine_workers:
+            worker_args = [python_exe, engine_workers.EngineWorker.SCRIPT]
+            execute_with_worker = functools.partial(
+                self._execute_with_engine_worker,
+                descriptor,
+                python_exe,
+                config_entity,
+                dict(
+                    command="execute",
+                    name=data["name"],
+                    entities=entities,
+                    project=project_entity,
+                ),
+                line_callback,
+            )
+
+            if concurrency.can_defer():
+                # The worker runs the command for as long as it takes, which
+                # the threads serving requests don't wait for. The command
+                # runs in a new process instead if the worker can't take it.
+                def on_worker_result(worker_result):
+                    if worker_result is None:
+                        return spawn()
+                    reply_result(worker_result, worker_args)
+
+                future = self._get_engine_worker_executor().submit(execute_with_worker)
+                return concurrency.call_in_reactor(
+                    lambda: concurrency.defer_future(future).addCallbacks(
+                        on_worker_result,
+                        lambda f: self._reply_errors(
+                            constants.COMMAND_FAILED, f.raiseException
+                        ),
+                    )
+                )
+
+            worker_result = execute_with_worker()
+            if worker_result is not None:
+                self._reply_command_result(worker_args, *worker_result)
+                return
+
+        if concurrency.can_defer():
+            return concurrency.call_in_reactor(spawn)
+
+        logger.debug("Subprocess arguments: %s", args)
+        retcode, stdout, stderr = command.Command.call_cmd(
+            args, line_callback, timeout, arguments
+        )
 
+        self._reply_command_result(args, retcode, stdout, stderr)
+
+    def _stream_command_output(self, name, line):
+        """
+        Sends a log message of an engine command to the client as a progress
+        frame, while the command is running.
+
+        :param str name: The name of the pipe the line was read from.
+        :param str line: A line of the command's output.
+        """
+        # This is called while the output is being read, which mustn't be
+        # interrupted by a line we can't make sense of.
+        try:
+            message = self._decode_command_output(line)
+        except Exception:
+            logger.debug("Unable to decode command output: %r", line, exc_info=True)
+            return
+
+        if message is not None:
+            self.host.progress(dict(out=message))
+
+    def _decode_command_output(self, line):
+        """
+        Decodes a line of an engine command's output, if it's a log message
+        written by the custom log handler of the execute_command script.
+
+        The log messages are base64 encoded and prefixed with a tag. The
+        encoding collapses multi-line log messages into a single line of text,
+        which is important since there's only one tag per log message.
+
+        :param str line: A line of the command's output.
+
+        :returns: The log message, or None if the line isn't one.
+        :rtype: str
+        """
+        line = line.rstrip("\r\n")
+        if not line.startswith(constants.LOGGING_PREFIX):
+            return None
+        return base64.b64decode(line[len(constants.LOGGING_PREFIX) :]).decode("utf-8")
+
+    def _reply_command_result(self, args, retcode, stdout, stderr):
+        """
+        Replies to the client with the output of an engine command.
+
+        :param list args: The command line the command was executed with.
+        :param int retcode: The exit code of the command's process.
+        :param str stdout: The process' stdout.
+        :param str stderr: The process' stderr.
+        """
         # We need to filter stdout before we send it to the client.
         # We look for lines that we know came from the custom log
-        # handler that the execute_command script builds, and we
-        # remove that header from those lines and keep them so that
-        # they're passed up to the client.
-        tag = constants.LOGGING_PREFIX
-        tag_length = len(tag)
+        # handler that the execute_command script builds, in both stdout
+        # and stderr, and only pass their log messages up to the client.
+        # Clients streaming the output already got them as progress frames,
+        # but still get them all in the result.
         filtered_output = []
-
-        # We check both stdout and stderr. We identify lines that start with
-        # our tag, and if we find one, we remove the tag, and then base64
-        # decode the rest of the message. The message is encoded this way
-        # because it collapses multi-line log messages into a single line
-        # of text. This is important, because there's only one tag per log
-        # message, and we would otherwise filter out everything in the log
-        # message that wasn't on the first line of text before any newlines.
         for line in stdout.split("\n") + stderr.split("\n"):
-            if line.startswith(tag):
-                decoded = base64.b64decode(line[tag_length:]).decode("utf-8")
+            decoded = self._decode_command_output(line)
+            if decoded is not None:
                 filtered_output.append(decoded)
 
         filtered_output_string = "\n".join(filtered_output)
@@ -354,17 +592,10 @@ class ShotgunAPI(object):
         # if there was some kind of unhandled exception that there is a proper
         # reply to the client so that the Promise can be kept or broken, as is
         # appropriate.
-        try:
-            self._get_actions(data)
-        except Exception:
-            self.host.reply(
-                dict(
-                    err=self._get_exception_message(),
-                    retcode=constants.CACHING_ERROR,
-                    out="",
-                ),
-            )
-            logger.exception(traceback.format_exc())
+        #
+        # The caching might still be running when this returns, in which case
+        # the Deferred firing once the reply is sent is returned.
+        return self._reply_errors(constants.CACHING_ERROR, self._get_actions, data)
 
     def _get_actions(self, data):
         """
@@ -430,6 +661,7 @@ class ShotgunAPI(object):
         # off the list.
         project_entity, entities = self._get_entities_from_payload(data)
         entity = entities[0]
+        self._prefetch_task_parent_entity_types(entities)
         manager = self._get_toolkit_manager()
 
         with self._LOCK:
@@ -442,6 +674,12 @@ class ShotgunAPI(object):
                 data,
             )
 
+        # The config data is a snapshot shared with other requests, and we're
+        # going to add to it below, so we work on shallow copies.
+        all_pc_data = dict(
+            (pc_id, dict(pc_data)) for pc_id, pc_data in all_pc_data.items()
+        )
+
         # The first thing we do is check to see if we're dealing with a
         # classic PTR setup. In that case, we're going to short-circuit
         # the get_actions call and go into a legacy setup that makes use
@@ -455,7 +693,9 @@ class ShotgunAPI(object):
             legacy_config_data = dict()
 
             for config_id, config_data in all_pc_data.items():
-                config = config_data["entity"]
+                # The legacy pathway alters the config entity before sending
+                # it to the client, so it gets its own copy.
+                config = dict(config_data["entity"])
 
                 if config["descriptor"].required_storages:
                     # We're using os.path.dirname to chop the last directory off
@@ -492,7 +732,7 @@ class ShotgunAPI(object):
                 )
                 did_legacy_lookup = True
 
-        # We will process the configs in 3 passes. The first pass decides whether a config should be process
+        # We will process the configs in 5 passes. The first pass decides whether a config should be process
         # or not. We need to keep a list of the ids that the later passes will need to skip
         config_ids_to_skip = set()
 
@@ -579,109 +819,173 @@ class ShotgunAPI(object):
             pc_data["lookup_hash"] = lookup_hash
             pc_data["descriptor"] = pc_descriptor
 
-        # Pass 2: Read the cached values from the database and store them in memory
-        with self._db_connect() as (connection, cursor):
-            for pc_id, pc_data in all_pc_data.items():
+        # Pass 2: Look up the commands already decoded in memory, or read the
+        # cached values from the database and store them in memory
+        pc_ids_to_query = []
+        for pc_id, pc_data in all_pc_data.items():
 
-                # If the config doesn't support the current entity_type we don't need to cache it
-                if pc_id in config_ids_to_skip:
-                    continue
+            # If the config doesn't support the current entity_type we don't need to cache it
+            if pc_id in config_ids_to_skip:
+                continue
 
-                lookup_hash = pc_data.get("lookup_hash")
-                logger.debug("Querying: %s", lookup_hash)
+            pc_data["cached_data"] = []
+            cached = self.ACTIONS_CACHE.get(pc_data["lookup_hash"])
 
-                pc_data["cached_data"] = []
-                try:
-                    cursor.execute(
-                        "SELECT commands, contents_hash FROM engine_commands WHERE lookup_hash=?",
-                        (lookup_hash,),
-                    )
-                    pc_data["cached_data"] = list(cursor.fetchone() or [])
-                except sqlite3.OperationalError:
-                    # This means the sqlite database hasn't been setup at all.
-                    # In that case, we just continue on with cached_data set
-                    # to an empty list, which will cause the caching subprocess
-                    # to be spawned, which will setup the database and populate
-                    # with the data we need. The behavior as a result of this
-                    # is the same as if we ended up with a cache miss or an
-                    # invalidated result due to a contents_hash mismatch.
-                    logger.debug(
-                        "Cache query failed for pipeline configuration id %s. Likely due to a missing table. "
-                        "Will Triggering caching subprocess..." % (pc_id,)
-                    )
+            if cached is not None:
+                contents_hash, commands = cached
+                pc_data["cached_data"] = [None, contents_hash]
+                pc_data["commands"] = commands
+            else:
+                pc_ids_to_query.append(pc_id)
+
+        if pc_ids_to_query:
+            with self._db_connect() as (connection, cursor):
+                for pc_id in pc_ids_to_query:
+                    pc_data = all_pc_data[pc_id]
+                    lookup_hash = pc_data.get("lookup_hash")
+                    logger.debug("Querying: %s", lookup_hash)
+
+                    try:
+                        cursor.execute(
+                            "SELECT commands, contents_hash FROM engine_commands WHERE lookup_hash=?",
+                            (lookup_hash,),
+                        )
+                        pc_data["cached_data"] = list(cursor.fetchone() or [])
+                    except sqlite3.OperationalError:
+                        # This means the sqlite database hasn't been setup at all.
+                        # In that case, we just continue on with cached_data set
+                        # to an empty list, which will cause the caching subprocess
+                        # to be spawned, which will setup the database and populate
+                        # with the data we need. The behavior as a result of this
+                        # is the same as if we ended up with a cache miss or an
+                        # invalidated result due to a contents_hash mismatch.
+                        logger.debug(
+                            "Cache query failed for pipeline configuration id %s. Likely due to a missing table. "
+                            "Will Triggering caching subprocess..." % (pc_id,)
+                        )
 
-        # Pass 3: Decode cached data or trigger the caching process
+        # Pass 3: Decode cached data, and collect the configs whose commands
+        # aren't cached yet
+        pc_ids_to_cache = []
         for pc_id, pc_data in all_pc_data.items():
 
             # If the config doesn't support the current entity_type we don't need to cache it
             if pc_id in config_ids_to_skip:
                 continue
 
-            try:
-                cached_data = pc_data["cached_data"]
-                lookup_hash = pc_data.get("lookup_hash")
-                pipeline_config = pc_data["entity"]
-                decoded_data = None
-
-                if cached_data:
-                    # The value will be bytes
-                    # ensure_str doesn't accept a buffer as input
-                    string_data = cached_data[0]
-                    if isinstance(string_data, bytes):
-                        string_data = string_data.decode("utf-8")
-                    try:
-                        decoded_data = sgtk.util.json.loads(string_data)
-                    except Exception:
-                        # Couldn't decode the data. This happens when loading an old pickled cache.
-                        # We've switch to JSON for the Python 3 port.
-                        pass
+            cached_data = pc_data["cached_data"]
+            lookup_hash = pc_data.get("lookup_hash")
+            commands = pc_data.get("commands")
 
+            if commands is None and cached_data:
+                decoded_data = self._decode_commands(cached_data[0])
                 if decoded_data is not None:
-                    # Cache hit.
-                    cached_contents_hash = cached_data[1]
-
-                    # We check the validity of the cache asynchronously in this
-                    # situation. We want to go ahead and return the list of actions
-                    # that we have cached, but in the background check to see whether
-                    # the cache should be updated. This gives us the situation where
-                    # this one invokation of get_actions returns old data, but all
-                    # future requests will be correct until the next time the cache
-                    # must be invalidated.
-                    self._async_check_and_cache_actions(
-                        data,
-                        pc_data,
-                        cached_contents_hash,
+                    commands = self._set_cached_commands(
+                        lookup_hash, cached_data[1], decoded_data
                     )
 
-                    logger.debug("Cached contents hash is %s", cached_contents_hash)
-                    logger.debug("Cache key was %s", lookup_hash)
+            if commands is None:
+                pc_ids_to_cache.append(pc_id)
+                continue
 
-                    actions = self._process_commands(
-                        commands=decoded_data,
-                        project=project_entity,
-                        entities=entities,
-                    )
+            # Cache hit.
+            cached_contents_hash = cached_data[1]
+
+            # We check the validity of the cache asynchronously in this
+            # situation. We want to go ahead and return the list of actions
+            # that we have cached, but in the background check to see whether
+            # the cache should be updated. This gives us the situation where
+            # this one invokation of get_actions returns old data, but all
+            # future requests will be correct until the next time the cache
+            # must be invalidated.
+            self._async_check_and_cache_actions(
+                data,
+                pc_data,
+                cached_contents_hash,
+            )
 
-                    logger.debug("Actions found in cache: %s", actions)
+            logger.debug("Cached contents hash is %s", cached_contents_hash)
+            logger.debug("Cache key was %s", lookup_hash)
+            logger.debug("Commands found in cache: %s", commands)
+
+            pc_data["commands"] = commands
+
+        # Pass 4: Cache the commands of all the configs that missed the cache.
+        # We don't have anything to give to the client until it's done, so the
+        # reply is only sent once all the configs are cached, using the
+        # commands they returned.
+        futures = []
+        if pc_ids_to_cache:
+            logger.debug("Commands not found in cache, caching now...")
+            futures = self._cache_missing_actions(
+                data, [all_pc_data[pc_id] for pc_id in pc_ids_to_cache]
+            )
 
-                    all_actions[pipeline_config["name"]] = dict(
-                        actions=self._filter_by_project(
-                            actions,
-                            self._get_software_entities(),
-                            project_entity,
-                        ),
-                        config=pipeline_config,
-                    )
-                    logger.debug("Actions after project filtering: %s", actions)
-                else:
-                    # Cache miss.
-                    logger.debug("Commands not found in cache, caching now...")
-                    # Caching is performed synchronously in this situation. We don't
-                    # have anything to give to the client until it's done, so we do
-                    # it in the main thread and wait for it to complete.
-                    self._cache_actions(data, pc_data)
-                    self._get_actions(data)
-                    return
+        reply_args = (
+            all_pc_data,
+            config_ids_to_skip,
+            dict(zip(pc_ids_to_cache, futures)),
+            all_actions,
+            config_names,
+            project_entity,
+            entities,
+        )
+
+        if futures and concurrency.can_defer():
+            # The thread serving this request doesn't need to wait for the
+            # caching, the reply is sent from another one once it's done.
+            return concurrency.defer_until_done(
+                futures,
+                functools.partial(
+                    self._reply_errors,
+                    constants.CACHING_ERROR,
+                    self._reply_actions,
+                    *reply_args,
+                ),
+            )
+
+        concurrent.futures.wait(futures)
+        self._reply_actions(*reply_args)
+
+    def _reply_actions(
+        self,
+        all_pc_data,
+        config_ids_to_skip,
+        caching_futures,
+        all_actions,
+        config_names,
+        project_entity,
+        entities,
+    ):
+        """
+        Replies to the client with the actions of all the pipeline
+        configurations, once the ones that missed the cache are cached.
+
+        :param dict all_pc_data: The data of the pipeline configurations, keyed
+            by id, with the project actions of those that hit the cache.
+        :param set config_ids_to_skip: The ids of the configurations that don't
+            support the entity type.
+        :param dict caching_futures: The futures of the caching jobs, keyed by
+            the id of the configuration they cache.
+        :param dict all_actions: The actions found so far, keyed by
+            configuration name.
+        :param list config_names: The names of the configurations handled by
+            the legacy pathway.
+        :param dict project_entity: The project entity.
+        :param list entities: The entities the actions were requested for.
+        """
+        entity = entities[0]
+
+        # Pass 4, continued: Use the commands returned by the caching jobs
+        for pc_id, future in caching_futures.items():
+            pc_data = all_pc_data[pc_id]
+
+            try:
+                cached = future.result()
+            except TankCachingCancelled as exc:
+                # The connection is gone, nobody will see the reply.
+                logger.debug(exc)
+                continue
             except TankCachingSubprocessFailed as exc:
                 logger.error(str(exc))
                 raise
@@ -693,11 +997,53 @@ class ShotgunAPI(object):
                     "The Flow Production Tracking engine failed to initialize in the caching "
                     "subprocess. This most likely corresponds to a configuration "
                     "problem in the config %r as it relates to entity type %s."
-                    % (pc_descriptor, entity["type"])
+                    % (pc_data["descriptor"], entity["type"])
                 )
                 logger.debug(exc)
                 continue
 
+            if cached is None or cached[1] is None:
+                logger.debug("No commands were cached for %s.", pc_data["lookup_hash"])
+                continue
+
+            contents_hash, commands = cached
+            pc_data["commands"] = self._set_cached_commands(
+                pc_data["lookup_hash"], contents_hash, commands
+            )
+
+        # Pass 5: Process the commands of every config for the selected
+        # entities, and filter the result for the project
+        sw_entities = None
+        for pc_id, pc_data in all_pc_data.items():
+            commands = pc_data.get("commands")
+            if pc_id in config_ids_to_skip or commands is None:
+                continue
+
+            pipeline_config = pc_data["entity"]
+
+            # The hook is given the entities selected in the client, so
+            # its result can't be cached. The cached commands are frozen,
+            # so we give it shallow copies that it's free to alter. The
+            # commands the hook adds or alters are filtered like the others.
+            if sw_entities is None:
+                sw_entities = self._get_software_entities()
+
+            actions = self._filter_by_project(
+                self._process_commands(
+                    commands=[dict(command) for command in commands],
+                    project=project_entity,
+                    entities=entities,
+                ),
+                sw_entities,
+                project_entity,
+            )
+
+            all_actions[pipeline_config["name"]] = dict(
+                actions=actions,
+                config=pipeline_config,
+            )
+            logger.debug("Actions after processing: %s", actions)
+
         # Combine the config names processed by the v2 flow with those handled
         # by the legacy pathway.
         config_names = config_names + [
@@ -798,10 +1144,74 @@ class ShotgunAPI(object):
     @contextlib.contextmanager
     def _db_connect(self):
         """
-        Context manager that initializes a DB connection on enter and
-        disconnects on exit.
+        Context manager that provides the current thread's pooled DB
+        connection. The transaction is committed on exit, or rolled back if
+        an exception was raised.
+        """
+        with contextlib.ExitStack() as stack:
+            try:
+                connection = self._get_connection_pool().get()
+            except sqlite3.Error:
+                # Readers treat a missing table as a cache miss, and writers
+                # will try again the next time they connect.
+                logger.warning(
+                    "Unable to setup the cache database %s.",
+                    self._cache_path,
+                    exc_info=True,
+                )
+                connection = stack.enter_context(
+                    contextlib.closing(self._open_database(self._cache_path))
+                )
+
+            with connection:
+                with contextlib.closing(connection.cursor()) as cursor:
+                    yield (connection, cursor)
+
+    @contextlib.contextmanager
+    def _caching_lock(self, config_data):
+        """
+        Context manager that must be held while bootstrapping the given
+        pipeline configuration to cache its engine commands. Bootstraps of the
+        same config are serialized, and so are bootstraps that will download a
+        config into the same bundle cache. The total number of concurrent
+        bootstraps is limited by the caching semaphore.
+
+        :param dict config_data: A dictionary that contains, at a minimum,
+            "descriptor" and "entity" keys.
+        """
+        descriptor = config_data["descriptor"]
+
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(
+                self._CONFIG_LOCKS.lock(
+                    (config_data["entity"]["id"], descriptor.get_uri())
+                )
+            )
+
+            if not descriptor.exists_local():
+                logger.debug(
+                    "Config %r is not cached locally, locking the bundle cache.",
+                    descriptor,
+                )
+                stack.enter_context(
+                    self._BUNDLE_CACHE_LOCKS.lock(self._get_bundle_cache_path())
+                )
+
+            stack.enter_context(self._get_caching_semaphore())
+            yield
+
+    @classmethod
+    def _open_database(cls, path):
+        """
+        Opens a connection to the cache database.
+
+        :param str path: The path to the cache database.
+
+        :returns: A :class:`sqlite3.Connection` object.
         """
-        connection = sqlite3.connect(self._cache_path)
+        # The connection is pooled, and the pool closes it from whichever
+        # thread tears it down.
+        connection = sqlite3.connect(path, check_same_thread=False)
 
         # This is to handle unicode properly - make sure that sqlite returns
         # str objects for TEXT fields rather than unicode. Note that any unicode
@@ -812,9 +1222,127 @@ class ShotgunAPI(object):
         # will always be unicode.
         connection.text_factory = str
 
-        with connection:
-            with contextlib.closing(connection.cursor()) as cursor:
-                yield (connection, cursor)
+        return connection
+
+    @classmethod
+    def _connect_database(cls, path):
+        """
+        Opens a connection to the cache database and makes sure its schema is
+        up to date. This is what the connection pools use to open connections.
+
+        :param str path: The path to the cache database.
+
+        :returns: A :class:`sqlite3.Connection` object.
+        """
+        connection = cls._open_database(path)
+
+        try:
+            cls._setup_database(connection)
+        except Exception:
+            connection.close()
+            raise
+
+        return connection
+
+    @classmethod
+    def _setup_database(cls, connection):
+        """
+        Creates the cache database's schema, or migrates it in place, so that
+        it matches DATABASE_FORMAT_VERSION. The database is also switched to
+        WAL journal mode so that readers aren't blocked by writers.
+
+        :param connection: An open sqlite3 connection to the cache database.
+        """
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+
+        if version == cls.DATABASE_FORMAT_VERSION:
+            return
+        elif version > cls.DATABASE_FORMAT_VERSION:
+            logger.debug(
+                "Cache database format version %s is newer than %s, leaving it as is.",
+                version,
+                cls.DATABASE_FORMAT_VERSION,
+            )
+            return
+
+        # The journal mode can't be changed from within a transaction, and is
+        # persisted in the database, so we only need to do this once.
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError:
+            logger.debug("Unable to switch the cache database to WAL mode.")
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Another thread or process might have setup the database while
+            # we were waiting for the write lock.
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+
+            if version < 2:
+                logger.debug("Migrating cache database to format version 2.")
+                cls._migrate_database_to_v2(connection)
+
+            if version < 3:
+                logger.debug("Migrating cache database to format version 3.")
+                cls._migrate_database_to_v3(connection)
+
+            if version < cls.DATABASE_FORMAT_VERSION:
+                connection.execute(
+                    "PRAGMA user_version=%d" % cls.DATABASE_FORMAT_VERSION
+                )
+
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    @classmethod
+    def _migrate_database_to_v2(cls, connection):
+        """
+        Migrates the cache database to a table keyed by lookup hash. Version 1
+        of the table had no primary key, which meant that lookups were full
+        table scans and that concurrent writers could insert duplicate rows.
+
+        :param connection: An open sqlite3 connection to the cache database,
+            with a write transaction in progress.
+        """
+        table_names = [
+            row[0]
+            for row in connection.execute(
+                "SELECT name FROM main.sqlite_master WHERE type='table'"
+            )
+        ]
+
+        connection.execute(
+            "CREATE TABLE engine_commands_v2 "
+            "(lookup_hash TEXT PRIMARY KEY, contents_hash TEXT, commands BLOB)"
+        )
+
+        if "engine_commands" in table_names:
+            # When there are duplicate rows, the most recently inserted
+            # one wins.
+            connection.execute(
+                "INSERT OR REPLACE INTO engine_commands_v2 "
+                "SELECT lookup_hash, contents_hash, commands FROM engine_commands "
+                "WHERE lookup_hash IS NOT NULL ORDER BY rowid"
+            )
+            connection.execute("DROP TABLE engine_commands")
+
+        connection.execute("ALTER TABLE engine_commands_v2 RENAME TO engine_commands")
+
+    @classmethod
+    def _migrate_database_to_v3(cls, connection):
+        """
+        Adds the table that Task parent entity types are persisted in, so
+        that they don't have to be queried again by every new connection.
+
+        :param connection: An open sqlite3 connection to the cache database,
+            with a write transaction in progress.
+        """
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS task_parent_types "
+            "(task_id INTEGER PRIMARY KEY, entity_type TEXT, updated_at REAL)"
+        )
 
     def _compute_sys_path(self):
         """
@@ -864,22 +1392,53 @@ class ShotgunAPI(object):
                 )
                 return
 
-        self.CACHE_VALIDATED[lookup_hash] = now
-
-        logger.debug("Cache actions executing asynchronously...")
-        thread = threading.Thread(
-            target=self._cache_actions,
-            args=(
-                data,
-                config_data,
-                cached_contents_hash,
+        # Revalidations of the same lookup hash are deduplicated by the
+        # queue, and dropped when it's full, in which case the next request
+        # for these actions will try again.
+        revalidation_queue = self._get_revalidation_queue()
+        queued = revalidation_queue.submit(
+            lookup_hash,
+            functools.partial(
+                self._cache_actions, data, config_data, cached_contents_hash
             ),
         )
-        thread.start()
-        logger.debug("Cache actions thread started.")
+
+        if queued:
+            self.CACHE_VALIDATED[lookup_hash] = now
+            logger.debug(
+                "Cache actions queued for asynchronous execution: %s",
+                revalidation_queue.stats(),
+            )
+        else:
+            logger.debug(
+                "Recaching of data for %s was not queued: %s",
+                lookup_hash,
+                revalidation_queue.stats(),
+            )
+
+    def _cache_missing_actions(self, data, all_config_data):
+        """
+        Caches the engine commands of the given configurations in parallel,
+        on the threads shared by all requests. The number of bootstraps
+        running at once is still bound by the caching locks.
+
+        :param dict data: The data passed down from the wss client.
+        :param list all_config_data: The config data dictionaries of the
+            configurations to cache, as expected by :meth:`_cache_actions`.
+
+        :returns: A list of :class:`concurrent.futures.Future`, one per
+            configuration and in the same order, whose result is the value
+            returned by :meth:`_cache_actions`. They might not be done yet.
+        :rtype: list
+        """
+        executor = self._get_caching_executor()
+        return [
+            executor.submit(self._cache_actions, data, config_data, owner=self._wss_key)
+            for config_data in all_config_data
+        ]
 
     @sgtk.LogManager.log_timing
-    def _cache_actions(self, data, config_data, cached_contents_hash=None):
+    def _cache_actions(self, data, config_data, cached_contents_hash=None, owner=None):
         """
         Triggers the caching or recaching of engine commands.
 
@@ -893,12 +1452,19 @@ class ShotgunAPI(object):
             work. This represents the situation where we've been asked to
             re-cache actions, but we then prove that the existing cached data
             is still valid.
+        :param str owner: The key of the WSS connection waiting on the caching,
+            which is cancelled once no connection waits on it anymore. None
+            for background caching, which is never cancelled.
+
+        :returns: A tuple of the contents hash and the list of commands cached
+            for the configuration's lookup hash, or None if the cached data
+            was validated. The commands are None if they couldn't be cached.
+        :rtype: tuple
+        :raises TankCachingCancelled: If the caching was cancelled.
         """
         logger.debug("Caching engine commands...")
         descriptor = config_data["descriptor"]
 
-        script = os.path.join(os.path.dirname(__file__), "scripts", "get_commands.py")
-
         contents_hash = self._get_contents_hash(
             descriptor,
             self._get_site_state_data(),
@@ -914,10 +1480,66 @@ class ShotgunAPI(object):
                 "The data already cached has been validated and is not out of date. "
                 "New data will not be cached as a result."
             )
-            return
+            return None
+        elif cached_contents_hash:
+            # Knowing what changed helps figuring out why a cache keeps
+            # getting rebuilt.
+            changes = self.CONTENTS_HASHER.diff(cached_contents_hash, contents_hash)
+            logger.debug(
+                "The cached data is out of date (%s). Recaching...",
+                ", ".join(changes) if changes else "changes unknown",
+            )
         else:
             logger.debug("The cached data is out of date. Recaching...")
 
+        flight_key = (config_data["lookup_hash"], contents_hash)
+        if self._CACHING_FLIGHTS.in_flight(flight_key):
+            logger.debug(
+                "Caching of %s is already in progress, waiting for it...",
+                config_data["lookup_hash"],
+            )
+
+        commands = self._CACHING_FLIGHTS.do(
+            flight_key,
+            lambda: self._run_caching_job(
+                data,
+                config_data,
+                contents_hash,
+                self._CACHING_FLIGHTS.cancellation(flight_key),
+            ),
+            owner=owner,
+        )
+        return (contents_hash, commands)
+
+    def _run_caching_job(self, data, config_data, contents_hash, cancellation):
+        """
+        Bootstraps the configuration to get its engine commands, and writes
+        them to the cache database.
+
+        :param dict data: The data passed down from the wss client.
+        :param dict config_data: A dictionary that contains, at a minimum,
+            "lookup_hash", "contents_hash", "descriptor", and "entity" keys.
+        :param str contents_hash: The contents hash to cache the commands for.
+        :param cancellation: The :class:`concurrency.Cancellation` of the job.
+
+        :returns: The list of commands cached for the configuration's lookup
+            hash, or None if they couldn't be read back.
+        :rtype: list
+        :raises TankCachingCancelled: If the job was cancelled.
+        """
+        # A job for the same commands might have completed between our cache
+        # miss and the start of this one, in which case there's nothing left
+        # to do.
+        commands = self._get_cached_commands(config_data["lookup_hash"], contents_hash)
+        if commands is not None:
+            logger.debug(
+                "The commands for %s were cached by another request.",
+                config_data["lookup_hash"],
+            )
+            return commands
+
+        descriptor = config_data["descriptor"]
+        script = os.path.join(os.path.dirname(__file__), "scripts", "get_commands.py")
         logger.debug("Executing script: %s", script)
 
         # We'll need the Python executable when we shell out. We want to make sure
@@ -930,33 +1552,70 @@ class ShotgunAPI(object):
             contents_hash=contents_hash,
             entity=config_data["entity"],
         )
+        caching_args = dict(
+            data=data,
+            sys_path=self._compute_sys_path(),
+            base_configuration=constants.BASE_CONFIG_URI,
+            engine_name=constants.ENGINE_NAME,
+            config_data=arg_config_data,
+            config_is_mutable=(descriptor.is_immutable() is False),
+            bundle_cache_fallback_paths=self._engine.sgtk.bundle_cache_fallback_paths,
+            user=serialize_user(sgtk.get_authenticated_user()),
+            batch=self._get_batch_entities(data, config_data, contents_hash),
+        )
+        logger.debug("Batching caching of: %s", caching_args["batch"])
 
-        # Create a temp file for the script to write the command data into
-        actions_file = tempfile.mktemp()
-        args_file = self._get_arguments_file(
-            dict(
-                cache_file=self._cache_path,
-                output_file=actions_file,
-                data=data,
-                sys_path=self._compute_sys_path(),
-                base_configuration=constants.BASE_CONFIG_URI,
-                engine_name=constants.ENGINE_NAME,
-                config_data=arg_config_data,
-                config_is_mutable=(descriptor.is_immutable() is False),
-                bundle_cache_fallback_paths=self._engine.sgtk.bundle_cache_fallback_paths,
-                user=serialize_user(sgtk.get_authenticated_user()),
-            )
+        timeout = self._get_timeout(
+            constants.CACHING_TIMEOUT, constants.CACHING_TIMEOUT_ENV_VAR
         )
 
-        args = [python_exe, script, args_file]
-        logger.debug("Command arguments: %s", args)
+        # We lock here because we cannot allow concurrent bootstraps of the
+        # same config to occur. We potentially have other threads wanting to
+        # cache, so we protect ourselves from spawning concurrent caching
+        # subprocesses that might end up stepping on each other.
+        with self._caching_lock(config_data):
+            # We might have waited on the lock for a while.
+            if cancellation.cancelled:
+                raise TankCachingCancelled(
+                    "Caching of %s was cancelled." % config_data["lookup_hash"]
+                )
 
-        # We lock here because we cannot allow concurrent bootstraps to
-        # occur. We potentially have other threads wanting to cache, so
-        # we protect ourselves from spawning concurrent caching subprocesses
-        # that might end up stepping on each other.
-        with self._LOCK:
-            retcode, stdout, stderr = command.Command.call_cmd(args)
+            worker_result = None
+            if self._use_engine_workers:
+                worker_result = self._get_commands_from_engine_worker(
+                    descriptor,
+                    python_exe,
+                    caching_args,
+                    timeout,
+                    cancellation,
+                )
+
+            if worker_result is not None:
+                retcode, stdout, results = worker_result
+                stderr = ""
+                args = [python_exe, engine_workers.EngineWorker.SCRIPT]
+            else:
+                args = [python_exe, script]
+                logger.debug("Command arguments: %s", args)
+
+                # This thread still waits for the process, but it's one of
+                # ours, rather than one of the threads serving requests. The
+                # script writes the commands to a pipe of its own.
+                retcode, stdout, stderr, results = command.Command.call_cmd_from_thread(
+                    args,
+                    timeout=timeout,
+                    cancellation=cancellation,
+                    stdin_data=self._encode_arguments(
+                        dict(cache_file=self._cache_path, **caching_args)
+                    ),
+                    results_pipe=True,
+                )
+
+        # The process was terminated, unless it completed before that.
+        if retcode != 0 and cancellation.cancelled:
+            raise TankCachingCancelled(
+                "Caching of %s was cancelled." % config_data["lookup_hash"]
+            )
 
         if retcode == 0:
             logger.debug("Command stdout: %s", stdout)
@@ -982,70 +1641,376 @@ class ShotgunAPI(object):
             logger.error("Failed command retcode: %s", retcode)
             raise TankCachingSubprocessFailed("%s\n\n%s" % (stdout, stderr))
 
-        with open(actions_file, "rt") as f:
-            commands = json.load(f)
+        if worker_result is None:
+            try:
+                results = json.loads(results)
+            except ValueError:
+                raise TankCachingSubprocessFailed(
+                    "The caching subprocess didn't send back any commands.\n\n%s\n\n%s"
+                    % (stdout, stderr)
+                )
 
-        # Clean up the temp file
-        os.remove(actions_file)
+        # The first result is always the one for the requested entity, which
+        # succeeded if we got here. The rest of the batch is best effort: an
+        # entity type that fails to resolve will be cached on its own the
+        # first time it's requested, and report its error then.
+        rows = []
+        for result in results:
+            if result["retcode"] == 0:
+                rows.append((result["lookup_hash"], result["commands"]))
+            else:
+                logger.debug(
+                    "Batched caching of %s failed: %s",
+                    result["lookup_hash"],
+                    result["output"],
+                )
 
-        self._write_commands_to_db(commands, config_data, contents_hash)
+        self._write_commands_to_db(rows, contents_hash)
         logger.debug("Caching complete.")
 
-    def _write_commands_to_db(self, commands, config_data, contents_hash):
+        return dict(rows).get(config_data["lookup_hash"])
+
+    def _get_cached_commands(self, lookup_hash, contents_hash):
         """
-        Writes the commands dictionary to the cache database
+        Reads the commands cached for the given lookup hash and contents hash
+        from the cache database.
 
-        :param dict commands: Dictionary containing information about toolkit commands
-        :param dict config_data: Dictionary containing information about the pipeline configuration
-        :param str contents_hash: The hash to be stored in the database
+        :param str lookup_hash: The lookup hash of the commands.
+        :param str contents_hash: The contents hash of the commands.
 
-        :returns: List of entity software available for the given project.
+        :returns: The list of commands, or None if they aren't cached.
+        :rtype: list
         """
         with self._db_connect() as (connection, cursor):
-            self._engine.log_debug("Inserting commands into cache...")
-
-            # First, let's make sure that the database is actually setup with
-            # the table we're expecting. If it isn't, then we can do that here.
-            with contextlib.closing(connection.cursor()) as c:
-                # Get a list of tables in the current database.
-                ret = c.execute(
-                    "SELECT name FROM main.sqlite_master WHERE type='table';"
+            try:
+                cursor.execute(
+                    "SELECT commands FROM engine_commands WHERE lookup_hash=? AND contents_hash=?",
+                    (lookup_hash, contents_hash),
                 )
-                table_names = [x[0] for x in ret.fetchall()]
+                row = cursor.fetchone()
+            except sqlite3.OperationalError:
+                # The database hasn't been setup yet, so nothing is cached.
+                return None
+
+        return self._decode_commands(row[0]) if row else None
+
+    def _decode_commands(self, cached_commands):
+        """
+        Decodes the commands read from the cache database.
+
+        :param cached_commands: The commands column of an engine_commands row.
+
+        :returns: The list of commands, or None if they couldn't be decoded.
+        :rtype: list
+        """
+        # The value will be bytes
+        # ensure_str doesn't accept a buffer as input
+        if isinstance(cached_commands, bytes):
+            cached_commands = cached_commands.decode("utf-8")
+        try:
+            return sgtk.util.json.loads(cached_commands)
+        except Exception:
+            # Couldn't decode the data. This happens when loading an old pickled cache.
+            # We've switch to JSON for the Python 3 port.
+            return None
+
+    def _set_cached_commands(self, lookup_hash, contents_hash, commands):
+        """
+        Keeps decoded commands in memory for the following requests.
+
+        :param str lookup_hash: The lookup hash of the commands.
+        :param str contents_hash: The contents hash of the commands.
+        :param list commands: The commands, as cached for all projects.
+
+        :returns: The frozen list of commands.
+        :rtype: tuple
+        """
+        commands = caches.freeze(commands)
+        self.ACTIONS_CACHE.set(lookup_hash, contents_hash, commands)
+        return commands
+
+    def _get_batch_entities(self, data, config_data, contents_hash):
+        """
+        Gets the entities whose engine commands can be cached from the same
+        bootstrap as the entity in the given payload. We pick a representative
+        entity for every entity type that has a shotgun_<entity_type>.yml
+        environment in the config, skipping the entity types whose cached
+        commands are already up to date. The representative entities are kept
+        in the connection's cache, so that only the first caching job for a
+        project queries them.
 
-                if not table_names:
-                    self._engine.log_debug("Creating schema in sqlite db.")
+        :param dict data: The data passed down from the wss client.
+        :param dict config_data: A dictionary that contains, at a minimum,
+            "lookup_hash", "descriptor", and "entity" keys.
+        :param str contents_hash: The current contents hash of the config.
+
+        :returns: A list of dictionaries containing "data" and "lookup_hash"
+            keys, where "data" has the same layout as the client's payload.
+        :rtype: list
+        """
+        project_id = data.get("project_id")
 
-                    # We have a brand new database. Create all tables and indices.
-                    cursor.executescript("""
-                        CREATE TABLE engine_commands (lookup_hash text, contents_hash text, commands blob);
-                    """)
+        if project_id is None:
+            return []
 
-                    connection.commit()
+        descriptor = config_data["descriptor"]
+        project = dict(type="Project", id=project_id)
+        entity_type_names = self._get_entity_type_names(project_id)
+        match_re = re.compile(r".+shotgun_([^.]+)[.]yml$")
+        entity_types = dict()
+
+        for yml_file in self._get_shotgun_yml_files(descriptor):
+            match = re.match(match_re, yml_file)
+            if not match:
+                continue
 
-            commands_blob = sqlite3.Binary(json.dumps(commands).encode("utf-8"))
+            entity_type = entity_type_names.get(match.group(1))
 
-            # Since we're likely to be updating out-of-date cached data more
-            # often than we're going to be inserting new rows into the cache,
-            # we'll try an update first. If no rows were affected by the update,
-            # we move on to an insert.
-            cursor.execute(
-                "UPDATE engine_commands SET contents_hash=?, commands=? WHERE lookup_hash=?",
-                (contents_hash, commands_blob, config_data["lookup_hash"]),
+            # The lookup hash of a Task depends on the entity it's linked to,
+            # so we can't cache Tasks on behalf of the whole entity type.
+            if entity_type is None or entity_type == "Task":
+                continue
+
+            lookup_hash = self._get_lookup_hash(
+                descriptor.get_uri(), project, entity_type, None
             )
 
-            if cursor.rowcount == 0:
-                self._engine.log_debug(
-                    "Update did not result in any rows altered, inserting..."
-                )
+            if lookup_hash != config_data["lookup_hash"]:
+                entity_types[lookup_hash] = entity_type
+
+        if not entity_types:
+            return []
+
+        up_to_date = set()
+        with self._db_connect() as (connection, cursor):
+            try:
                 cursor.execute(
-                    "INSERT INTO engine_commands VALUES (?, ?, ?)",
-                    (
-                        config_data["lookup_hash"],
-                        contents_hash,
-                        commands_blob,
+                    "SELECT lookup_hash FROM engine_commands WHERE contents_hash=?",
+                    (contents_hash,),
+                )
+                up_to_date.update(row[0] for row in cursor.fetchall())
+            except sqlite3.OperationalError:
+                # The database hasn't been setup yet, so nothing is cached.
+                pass
+
+        batch = []
+        batch_entities = self._cache.setdefault(self.BATCH_ENTITIES, dict())
+        for lookup_hash, entity_type in entity_types.items():
+            if lookup_hash in up_to_date:
+                continue
+
+            if entity_type == "Project":
+                entity = project
+            elif (project_id, entity_type) in batch_entities:
+                entity = batch_entities[(project_id, entity_type)]
+            else:
+                entity = self._engine.shotgun.find_one(
+                    entity_type,
+                    [["project", "is", project]],
+                )
+                batch_entities[(project_id, entity_type)] = entity
+
+            if entity is None:
+                logger.debug(
+                    "No %s entity exists in project %s, not batching it.",
+                    entity_type,
+                    project_id,
+                )
+                continue
+
+            batch.append(
+                dict(
+                    lookup_hash=lookup_hash,
+                    data=dict(
+                        entity_type=entity_type,
+                        entity_id=entity["id"],
+                        project_id=project_id,
                     ),
                 )
+            )
+
+        return batch
+
+    def _get_commands_from_engine_worker(
+        self, descriptor, python_exe, caching_args, timeout=None, cancellation=None
+    ):
+        """
+        Lists engine commands using the resident engine worker associated with
+        the given pipeline configuration, rather than bootstrapping in a new
+        process.
+
+        A worker whose request times out or is cancelled is killed and
+        discarded, and the request fails the same way it would have if it had
+        been made by the caching subprocess.
+
+        :param descriptor: The descriptor object for the pipeline config.
+        :param str python_exe: The Python interpreter the worker runs with.
+        :param dict caching_args: The arguments that would otherwise be given
+            to the get_commands.py script.
+        :param float timeout: Optional number of seconds after which the
+            request is abandoned.
+        :param cancellation: Optional :class:`concurrency.Cancellation` of the
+            request.
+
+        :returns: A tuple containing (return code, output, results), or None
+            if the engine worker could not process the request. The results
+            have the same layout as the output of the get_commands.py script.
+        :rtype: tuple
+        """
+        config_data = caching_args["config_data"]
+        key = (config_data["entity"]["id"], descriptor.get_uri())
+        pool = self._get_engine_worker_pool()
+
+        try:
+            result = pool.request(
+                key,
+                python_exe,
+                config_data["contents_hash"],
+                self._get_engine_worker_init_data(config_data["entity"]),
+                dict(
+                    command="get_commands",
+                    data=caching_args["data"],
+                    lookup_hash=config_data["lookup_hash"],
+                    batch=caching_args["batch"],
+                    config_is_mutable=caching_args["config_is_mutable"],
+                ),
+                timeout=timeout,
+                cancellation=cancellation,
+            )
+        except engine_workers.EngineWorkerInterruptedError as e:
+            logger.debug("%s", e)
+            if e.cancelled:
+                return (1, "The process was cancelled.\n", None)
+            return (1, command.Command.get_timeout_message(timeout), None)
+        except (engine_workers.EngineWorkerError, OSError):
+            logger.exception(
+                "Engine worker unavailable, falling back to the caching subprocess:"
+            )
+            return None
+
+        if result["retcode"] == constants.ENGINE_INIT_ERROR_EXIT_CODE:
+            # We don't know what state the worker was left in, so the next
+            # request will get a freshly bootstrapped one.
+            pool.discard(key, python_exe)
+
+        return (result["retcode"], result.get("output", ""), result.get("results"))
+
+    def _execute_with_engine_worker(
+        self, descriptor, python_exe, config_entity, request, line_callback=None
+    ):
+        """
+        Executes an engine command using the resident engine worker associated
+        with the given pipeline configuration, rather than bootstrapping in a
+        new process.
+
+        :param descriptor: The descriptor object for the pipeline config.
+        :param str python_exe: The Python interpreter the worker runs with.
+        :param dict config_entity: The pipeline configuration entity.
+        :param dict request: The execute request to send to the worker.
+        :param line_callback: Optional callable taking the name of the pipe
+            and a line of output, called as the worker sends each line back.
+
+        :returns: A tuple containing (return code, stdout, stderr), where stdout
+            contains the log lines sent back by the worker, or None if the
+            engine worker could not process the request.
+        :rtype: tuple
+        """
+        key = (config_entity["id"], descriptor.get_uri())
+        pool = self._get_engine_worker_pool()
+        contents_hash = self._get_contents_hash(
+            descriptor,
+            self._get_site_state_data(),
+        )
+        output = []
+
+        def on_output(line):
+            output.append(line)
+            if line_callback is not None:
+                line_callback("stdout", line)
+
+        try:
+            # If the worker is busy, we don't want the user to wait for it,
+            # so we run the command in a new process instead.
+            result = pool.request(
+                key,
+                python_exe,
+                contents_hash,
+                self._get_engine_worker_init_data(config_entity),
+                request,
+                on_output=on_output,
+                blocking=False,
+            )
+        except engine_workers.EngineWorkerBusyError:
+            # The worker is running another command, which is expected.
+            logger.debug(
+                "Engine worker busy, falling back to the execution subprocess."
+            )
+            return None
+        except (engine_workers.EngineWorkerError, OSError):
+            logger.exception(
+                "Engine worker unavailable, falling back to the execution subprocess:"
+            )
+            return None
+
+        if result["retcode"] == constants.ENGINE_INIT_ERROR_EXIT_CODE:
+            # The worker failed outside of the command itself, so we don't
+            # know what state it was left in. A command that failed on its own
+            # doesn't affect the worker, which stays warm for the next one.
+            logger.debug("Engine worker failed to process the request: %s", result)
+            pool.discard(key, python_exe)
+
+        return (result["retcode"], "\n".join(output), result.get("output", ""))
+
+    def _get_engine_worker_init_data(self, config_entity):
+        """
+        Builds the initialization data given to new engine workers.
+
+        :param dict config_entity: The pipeline configuration entity.
+
+        :returns: The initialization data.
+        :rtype: dict
+        """
+        return dict(
+            sys_path=self._compute_sys_path(),
+            base_configuration=constants.BASE_CONFIG_URI,
+            engine_name=constants.ENGINE_NAME,
+            config_data=dict(entity=config_entity),
+            logging_prefix=constants.LOGGING_PREFIX,
+            bundle_cache_fallback_paths=self._engine.sgtk.bundle_cache_fallback_paths,
+            user=serialize_user(sgtk.get_authenticated_user()),
+        )
+
+    def _write_commands_to_db(self, rows, contents_hash):
+        """
+        Writes commands to the cache database. All rows are written in a
+        single transaction.
+
+        :param list rows: List of (lookup_hash, commands) tuples, where commands
+            is the list of toolkit command dictionaries for that lookup hash.
+        :param str contents_hash: The hash to be stored in the database
+        """
+        with self._db_connect() as (connection, cursor):
+            self._engine.log_debug("Inserting commands into cache...")
+
+            # The table is keyed by lookup hash, so this either inserts a new
+            # row or replaces the out-of-date one.
+            cursor.executemany(
+                "INSERT OR REPLACE INTO engine_commands "
+                "(lookup_hash, contents_hash, commands) VALUES (?, ?, ?)",
+                [
+                    (
+                        lookup_hash,
+                        contents_hash,
+                        sqlite3.Binary(json.dumps(commands).encode("utf-8")),
+                    )
+                    for lookup_hash, commands in rows
+                ],
+            )
+
+        # Now that the new commands are committed, the actions cached in memory
+        # for the previous contents hash are out of date.
+        for lookup_hash, commands in rows:
+            self.ACTIONS_CACHE.invalidate(lookup_hash, contents_hash)
 
     def _get_python_interpreter(self, descriptor):
         """
@@ -1096,33 +2061,10 @@ class ShotgunAPI(object):
             sgtk.pipelineconfig_utils.is_localized(data["pc_root_path"]),
         )
 
-        # Once the config is cloned, we need to invalidate the in-memory cache
-        # that contains the PipelineConfiguration entities queried from PTR.
+        # Once the config is cloned, we need to invalidate the in-memory caches
+        # that contain the PipelineConfiguration entities queried from PTR.
         del self._cache[self.PIPELINE_CONFIGS]
-
-    def _filter_software_entities_by_project(self, sw_entities, project):
-        """
-        Filter software entities such that only the ones accessible
-        from the given project will be returned.
-
-        :param list sw_entities: List of entity software dictionaries
-        :param dict project: Entity dictionary of the project to select for.
-
-        :returns: List of entity software available for the given project.
-        """
-        project_software = []
-
-        for sw in sw_entities:
-            # Create a list of ids for the project restriction of this software.
-            sw_project_ids = [sw_project["id"] for sw_project in sw.get("projects", [])]
-
-            # If a software has no project restriction it will not filter out an action.
-            # If it does and the current project is not part of the restricted
-            # list of projects then it will be filtered out.
-            if not sw_project_ids or project["id"] in sw_project_ids:
-                project_software.append(sw)
-
-        return project_software
+        self.SHARED_CACHE.invalidate(self._get_site_key(), self.PIPELINE_CONFIGS)
 
     @sgtk.LogManager.log_timing
     def _filter_by_project(self, actions, sw_entities, project):
@@ -1147,12 +2089,7 @@ class ShotgunAPI(object):
         :rtype: list
         """
         project_actions = []
-
-        sw_entities = self._filter_software_entities_by_project(sw_entities, project)
-
-        logger.debug(
-            "Software available for project %s: %s, ", project["id"], sw_entities
-        )
+        sw_index = self._get_software_index(sw_entities)
 
         for action in actions:
             # The engine_name property of an engine command is defined by
@@ -1171,8 +2108,8 @@ class ShotgunAPI(object):
                 # If the action comes from one of the available software, we're good to go!
                 # Also, if the software entity id is missing, this means this a legacy instance
                 # of the launch app.
-                if action["software_entity_id"] is None or any(
-                    action["software_entity_id"] == sw["id"] for sw in sw_entities
+                if action["software_entity_id"] is None or sw_index.allows_software(
+                    action["software_entity_id"], project["id"]
                 ):
                     project_actions.append(action)
                 else:
@@ -1191,7 +2128,7 @@ class ShotgunAPI(object):
                 #
                 # We're only interested in entities that are referring to the
                 # same engine as is recorded in the action dict.
-                if any(s["engine"] == action["engine_name"] for s in sw_entities):
+                if sw_index.allows_engine(action["engine_name"], project["id"]):
                     project_actions.append(action)
                 else:
                     logger.debug(
@@ -1201,21 +2138,37 @@ class ShotgunAPI(object):
 
         return project_actions
 
-    def _get_arguments_file(self, args_data):
+    def _get_software_index(self, sw_entities):
         """
-        Dumps out a temporary file containing the provided data structure.
+        Gets the index of the projects the given Software entities are
+        available in. The index is built once per snapshot of the Software
+        entities.
 
-        :param args_data: The data to serialize to disk.
+        :param sw_entities: The Software entity dictionaries.
 
-        :returns: File path
-        :rtype: str
+        :returns: A :class:`caches.SoftwareIndex` object.
         """
-        args_file = tempfile.mkstemp()[1]
+        # The snapshots are immutable, and shared by all the connections to
+        # a site, so the index of the most recent one is all we need.
+        snapshot = self.SOFTWARE_INDEX
+        if snapshot is not None and snapshot[0] is sw_entities:
+            return snapshot[1]
 
-        with open(args_file, "wt") as fh:
-            json.dump(args_data, fh, ensure_ascii=True)
+        sw_index = caches.SoftwareIndex(sw_entities)
+        ShotgunAPI.SOFTWARE_INDEX = (sw_entities, sw_index)
+        return sw_index
 
-        return args_file
+    def _encode_arguments(self, args_data):
+        """
+        Serializes the arguments of one of our scripts, which reads them from
+        its stdin.
+
+        :param args_data: The data to serialize.
+
+        :returns: The serialized data.
+        :rtype: bytes
+        """
+        return json.dumps(args_data, ensure_ascii=True).encode("utf-8")
 
     @sgtk.LogManager.log_timing
     def _get_contents_hash(self, config_descriptor, entities):
@@ -1223,45 +2176,27 @@ class ShotgunAPI(object):
         Computes an md5 hashsum for the given pipeline configuration. This
         hash includes the state of all fields for all Software entities in
         the current Shotgun site, and if the given pipeline configuration
-        is mutable, the modtimes of all yml files in the config.
+        is mutable, the modtimes of all yml files in the config. The hash is
+        built as a tree, so only the entities and files that changed since
+        the last computation are hashed again.
 
         :param config_descriptor: The descriptor object for the pipeline config.
         :param list entities: A list of entity dictionaries to be included in the
             hash computation.
 
         :returns: hash value
-        :rtype: int
+        :rtype: str
         """
-        # We dump the entities out as json, sorting on keys to ensure
-        # consistent ordering of data.
-        hashable_data = dict(
-            entities=entities,
-            modtimes="",
-        )
+        modtimes = dict()
 
         if config_descriptor and config_descriptor.is_immutable() is False:
-            yml_files = self._get_yml_file_data(config_descriptor)
-
-            if yml_files is not None:
-                hashable_data["modtimes"] = yml_files
-
-        # Dict objects aren't hashable directly by way of hash() or the md5
-        # module, so we need to create a stable string representation of the
-        # data structure. The quickest way to do that is to json encode
-        # everything, sorting on keys to stabilize the results.
-        json_data = json.dumps(
-            hashable_data,
-            sort_keys=True,
-            default=self.__json_default,
-        )
-
-        logger.debug("Contents data to be used in hash generation: %s", json_data)
+            modtimes = self._get_yml_file_data(config_descriptor)
 
-        hash_data = hashlib.md5()
-        hash_data.update(json_data.encode("utf-8"))
-        # Base64 encode the digest, will is a binary string
-        # in Python 3. This ensures we can always encode it to a str.
-        return base64.b64encode(hash_data.digest()).decode("utf-8")
+        return self.CONTENTS_HASHER.compute(
+            entities,
+            modtimes,
+            json_default=self.__json_default,
+        )
 
     def _get_entities_from_payload(self, data):
         """
@@ -1336,31 +2271,27 @@ class ShotgunAPI(object):
 
             for entity in data["entity_ids"]:
                 # Did we get an entity list, or a list of entity ids?
-                if isinstance(entity, dict):
-                    # If we were passed a usable project entity from the web app, we
-                    # can trust that and add it to our entity. If we didn't, then we'll
-                    # have to query it.
-                    if entity.get("project") is None:
-                        if project_entity is None:
-                            entity["project"] = self._get_entity_parent_project(entity)
-                        else:
-                            entity["project"] = project_entity
-
-                    entities.append(entity)
-                else:
+                if not isinstance(entity, dict):
                     entity = dict(
                         type=data["entity_type"],
                         id=entity,
                     )
-                    # If we were passed a usable project entity from the web app, we
-                    # can trust that and add it to our entity. If we didn't, then we'll
-                    # have to query it.
-                    if project_entity is None:
-                        entity["project"] = self._get_entity_parent_project(entity)
-                    else:
-                        entity["project"] = project_entity
 
-                    entities.append(entity)
+                # If we were passed a usable project entity from the web app, we
+                # can trust that and add it to our entity. If we didn't, then we'll
+                # have to query it.
+                if entity.get("project") is None and project_entity is not None:
+                    entity["project"] = project_entity
+
+                entities.append(entity)
+
+            # The projects we have to query are queried all at once, rather
+            # than one entity at a time.
+            missing = [entity for entity in entities if entity.get("project") is None]
+            if missing:
+                projects = self._get_entity_parent_projects(missing)
+                for entity in missing:
+                    entity["project"] = projects[(entity["type"], entity["id"])]
 
             # If we were not given a usable project entity, we can pull it from an
             # entity we've just extracted. This doesn't cover the case of receiving
@@ -1377,7 +2308,6 @@ class ShotgunAPI(object):
         else:
             raise RuntimeError("Unable to determine an entity from data: %s" % data)
 
-    @sgtk.LogManager.log_timing
     def _get_entity_parent_project(self, entity):
         """
         Gets the project entity that the given entity is linked to.
@@ -1387,31 +2317,61 @@ class ShotgunAPI(object):
         :returns: A standard Shotgun Project entity.
         :rtype: dict
         """
-        logger.debug("Attempting lookup of project from entity: %s", entity)
+        return self._get_entity_parent_projects([entity])[
+            (entity["type"], entity["id"])
+        ]
+
+    @sgtk.LogManager.log_timing
+    def _get_entity_parent_projects(self, entities):
+        """
+        Gets the project entities that the given entities are linked to. The
+        projects that aren't cached yet are queried with a single find per
+        entity type.
 
-        if entity.get("project") is not None:
-            return entity["project"]
+        :param list entities: Standard Shotgun entity dictionaries.
 
-        if entity["type"] == "Project":
-            return entity
+        :returns: A dictionary of standard Shotgun Project entities, or None
+            when the project couldn't be determined, keyed by entity type and
+            id.
+        :rtype: dict
+        """
+        logger.debug("Attempting lookup of project from entities: %s", entities)
 
         project_cache = self._cache.setdefault(self.ENTITY_PARENT_PROJECTS, dict())
+        projects = dict()
+        missing_ids = dict()
+
+        for entity in entities:
+            key = (entity["type"], entity["id"])
+
+            if entity.get("project") is not None:
+                projects[key] = entity["project"]
+            elif entity["type"] == "Project":
+                projects[key] = entity
+            elif key in project_cache:
+                projects[key] = project_cache[key]
+            else:
+                missing_ids.setdefault(entity["type"], set()).add(entity["id"])
 
-        if entity["id"] not in project_cache:
-            project = None
+        for entity_type, entity_ids in missing_ids.items():
+            found = dict()
             try:
-                sg_entity = self._engine.shotgun.find_one(
-                    entity["type"],
-                    [["id", "is", entity["id"]]],
+                sg_entities = self._engine.shotgun.find(
+                    entity_type,
+                    [["id", "in", sorted(entity_ids)]],
                     fields=["project"],
                 )
             except Exception:
                 pass
             else:
-                project = sg_entity["project"]
+                for sg_entity in sg_entities:
+                    found[sg_entity["id"]] = sg_entity["project"]
 
-            project_cache[entity["id"]] = project
-        return project_cache[entity["id"]]
+            for entity_id in entity_ids:
+                key = (entity_type, entity_id)
+                projects[key] = project_cache[key] = found.get(entity_id)
+
+        return projects
 
     @sgtk.LogManager.log_timing
     def _get_entity_type_whitelist(self, project_id, config_descriptor):
@@ -1432,7 +2392,7 @@ class ShotgunAPI(object):
             have an associated shotgun_{entity_type}.yml file.
 
         :returns: A set of lowercased string entity types.
-        :rtype: set
+        :rtype: frozenset
         """
         if project_id is None:
             logger.debug("Project id is None, looking up site schema.")
@@ -1442,12 +2402,15 @@ class ShotgunAPI(object):
             logger.debug("Looking up schema for project %s", project_entity)
 
         config_root = config_descriptor.get_path()
-        cache_is_initialized = self.ENTITY_TYPE_WHITELIST in self._cache
-        config_in_cache = config_root in self._cache.get(
-            self.ENTITY_TYPE_WHITELIST, dict()
+
+        # The whitelist is dropped from the cache when the config's yml files
+        # change, which can happen from another thread at any time. As such,
+        # we only look it up once.
+        type_whitelist = self._cache.get(self.ENTITY_TYPE_WHITELIST, dict()).get(
+            config_root
         )
 
-        if not cache_is_initialized or not config_in_cache:
+        if type_whitelist is None:
             # We're storing lowercased type names because we have the possibility
             # of also merging in types defined as shotgun_xxx.yml files in a config's
             # environment. Those files contain entity type names that are lower cased,
@@ -1456,27 +2419,16 @@ class ShotgunAPI(object):
                 [t.lower() for t in constants.BASE_ENTITY_TYPE_ALLOW_LIST]
             )
 
-            # This will only ever happen once per unique connection. That means
-            # on page refresh it happens, but not every time menu actions are
-            # requested.
-            #
-            # The conditional here is simply for the case of test suites. At this
-            # time, Mockgun's schema_field_read method doesn't accept a project_entity
-            # argument, and when running unit tests it's really not needed anyway.
-            if project_entity is not None:
-                schema = self._engine.shotgun.schema_field_read(
-                    constants.PUBLISHED_FILE_ENTITY,
-                    field_name="entity",
-                    project_entity=project_entity,
-                )
-            else:
-                schema = self._engine.shotgun.schema_field_read(
-                    constants.PUBLISHED_FILE_ENTITY,
-                    field_name="entity",
-                )
-            linkable_types = schema["entity"]["properties"]["valid_types"]["value"]
-            linkable_types = [t.lower() for t in linkable_types]
-            type_whitelist = type_whitelist.union(set(linkable_types))
+            # The schema is shared by all the connections to the site, so it's
+            # only queried when first needed, or when it has changed.
+            linkable_types = self._get_shared_data(
+                self.PUBLISHED_FILE_LINKABLE_TYPES,
+                project_id,
+                functools.partial(
+                    self._get_published_file_linkable_types, project_entity
+                ),
+            )
+            type_whitelist = type_whitelist.union(linkable_types)
 
             # It's less likely that an immutable config will contain legacy shotgun_xxx.yml
             # environment files that we need to take into account. However, it's possible
@@ -1511,14 +2463,87 @@ class ShotgunAPI(object):
             logger.debug(
                 "Entity-type whitelist for project %s: %s", project_id, type_whitelist
             )
+            type_whitelist = frozenset(type_whitelist)
             self._cache.setdefault(self.ENTITY_TYPE_WHITELIST, dict())[
                 config_root
             ] = type_whitelist
 
-        # We'll copy the data out of the cache, as we do elsewhere. This is
-        # just to isolate the cache from any changes to the returned data
-        # after it's returned.
-        return copy.deepcopy(self._cache[self.ENTITY_TYPE_WHITELIST][config_root])
+        return type_whitelist
+
+    def _get_published_file_linkable_types(self, project_entity):
+        """
+        Gets the entity types that a PublishedFile entity can link to, per
+        the site's schema.
+
+        :param dict project_entity: The project to query the schema for, as
+            project-level masking of the linkable types is possible. If None,
+            the site-level schema is queried instead.
+
+        :returns: A set of lowercased string entity types.
+        :rtype: frozenset
+        """
+        # The conditional here is simply for the case of test suites. At this
+        # time, Mockgun's schema_field_read method doesn't accept a project_entity
+        # argument, and when running unit tests it's really not needed anyway.
+        if project_entity is not None:
+            schema = self._engine.shotgun.schema_field_read(
+                constants.PUBLISHED_FILE_ENTITY,
+                field_name="entity",
+                project_entity=project_entity,
+            )
+        else:
+            schema = self._engine.shotgun.schema_field_read(
+                constants.PUBLISHED_FILE_ENTITY,
+                field_name="entity",
+            )
+        linkable_types = schema["entity"]["properties"]["valid_types"]["value"]
+        return frozenset(t.lower() for t in linkable_types)
+
+    def _get_entity_type_names(self, project_id):
+        """
+        Gets a mapping of lowercased entity type names to the entity type names
+        used by the API, as found in the project's schema. This is used to get
+        back to the actual entity type from the name of a shotgun_xxx.yml file.
+
+        :param int project_id: The associated project entity id.
+
+        :returns: A read-only mapping of entity type names, keyed by
+            lowercased name.
+        :rtype: types.MappingProxyType
+        """
+        type_names = self._cache.setdefault(self.ENTITY_TYPE_NAMES, dict())
+
+        if project_id not in type_names:
+            schema = self._engine.shotgun.schema_entity_read(
+                project_entity=dict(type="Project", id=project_id),
+            )
+            type_names[project_id] = caches.freeze(dict((t.lower(), t) for t in schema))
+
+        return type_names[project_id]
+
+    def _reply_errors(self, retcode, func, *args):
+        """
+        Calls a function, and replies to the client with the exception it
+        raised, if any.
+
+        :param int retcode: The return code to reply with when the function
+            raises.
+        :param func: The function to call.
+        :param args: The function's arguments.
+
+        :returns: The function's result, or None if it raised.
+        """
+        try:
+            return func(*args)
+        except Exception:
+            self.host.reply(
+                dict(
+                    err=self._get_exception_message(),
+                    retcode=retcode,
+                    out="",
+                ),
+            )
+            logger.exception(traceback.format_exc())
 
     def _get_exception_message(self):
         """
@@ -1552,8 +2577,10 @@ class ShotgunAPI(object):
         :returns: The computed lookup hash.
         :rtype: str
         """
-        cache_key = self._bundle.execute_hook_method(
-            "browser_integration_hook",
+        # The cache key only depends on the hook's arguments, so it's computed
+        # once until the hook changes.
+        cache_key = self._get_browser_integration_hook().execute_memoized(
+            (config_uri, project["id"], entity_type),
             "get_cache_key",
             config_uri=config_uri,
             project=project,
@@ -1592,10 +2619,10 @@ class ShotgunAPI(object):
         :param dict project_entity: The Project entity dict.
         :param dict data: The payload from the client.
 
-        :returns: A dictionary, keyed by PipelineConfiguration entity id, that
-            contains dictionaries with "contents_hash", "lookup_hash",
-            "descriptor", and "entity" keys.
-        :rtype: dict
+        :returns: A read-only mapping, keyed by PipelineConfiguration entity
+            id, that contains read-only mappings with "contents_hash",
+            "lookup_hash", "descriptor", and "entity" keys.
+        :rtype: types.MappingProxyType
         """
         entity_type = data["entity_type"]
         cache = self._cache
@@ -1634,6 +2661,7 @@ class ShotgunAPI(object):
 
             for pipeline_config in pipeline_configs:
                 logger.debug("Processing config: %s", pipeline_config)
+                pipeline_config = dict(pipeline_config)
 
                 # We're not going to need the project field in the config
                 # entity, since we already know what Project we're dealing
@@ -1692,19 +2720,22 @@ class ShotgunAPI(object):
 
             # If we already have cached other entity types, we'll have the
             # config_data key already present in the cache. In that case, we
-            # just need to update it's contents with the new data. Otherwise,
-            # we populate it from scratch.
-            cache.setdefault(self.CONFIG_DATA, dict())
-            cache[self.CONFIG_DATA].setdefault(entity_type, dict())
-            cache[self.CONFIG_DATA][entity_type].setdefault(
-                project_entity["id"],
-                dict(),
-            ).update(config_data)
-
-        # We'll deepcopy the data before returning it. That will ensure that
-        # any destructive operations on the contents won't bubble up to the
-        # cache.
-        return copy.deepcopy(cache[self.CONFIG_DATA][entity_type][project_entity["id"]])
+            # just need to merge its contents with the new data. Otherwise,
+            # we populate it from scratch. The cached data is frozen, so that
+            # it can be shared with the callers without being copied. The
+            # descriptor objects are shared as they are.
+            project_config_data = cache.setdefault(self.CONFIG_DATA, dict()).setdefault(
+                entity_type, dict()
+            )
+            merged_config_data = dict(
+                project_config_data.get(project_entity["id"], dict())
+            )
+            merged_config_data.update(config_data)
+            project_config_data[project_entity["id"]] = caches.freeze(
+                merged_config_data
+            )
+
+        return cache[self.CONFIG_DATA][entity_type][project_entity["id"]]
 
     @sgtk.LogManager.log_timing
     def _get_pipeline_configurations(self, manager, project):
@@ -1715,8 +2746,8 @@ class ShotgunAPI(object):
         :type bsm: :class:`~sgtk.bootstrap.ToolkitManager`
         :param dict project: The project entity.
 
-        :returns: A list of PipelineConfiguration entity dictionaries.
-        :rtype: list
+        :returns: A tuple of read-only PipelineConfiguration entity mappings.
+        :rtype: tuple
         """
         # The in-memory cache is keyed by the wss_key that is unique to each
         # wss connection. If we've already queried and cached pipeline configs
@@ -1732,18 +2763,93 @@ class ShotgunAPI(object):
         pc_data = self._cache[self.PIPELINE_CONFIGS]
 
         if project["id"] not in pc_data:
-            pc_data[project["id"]] = manager.get_pipeline_configurations(
-                project=project,
+            pc_data[project["id"]] = self._get_shared_data(
+                self.PIPELINE_CONFIGS,
+                project["id"],
+                lambda: caches.freeze(
+                    manager.get_pipeline_configurations(
+                        project=project,
+                    )
+                ),
             )
         else:
             logger.debug(
                 "Cached PipelineConfiguration entities found for %s", self._wss_key
             )
 
-        # We'll deepcopy the data before returning it. That will ensure that
-        # any destructive operations on the contents won't bubble up to the
-        # cache.
-        return copy.deepcopy(pc_data[project["id"]])
+        return pc_data[project["id"]]
+
+    def _get_shared_data(self, name, project_id, fetch):
+        """
+        Gets data from the cache shared by all the connections to the site,
+        fetching it if needed. The site's event log is checked for changes
+        first, which drops the shared data if it's stale.
+
+        :param str name: The name of the data, one of the in-memory cache keys.
+        :param int project_id: The id of the project the data belongs to, or
+            None for site-wide data.
+        :param fetch: Callable that takes no argument and returns the data.
+            The data is shared, so it should be immutable.
+
+        :returns: The cached data.
+        """
+        site_key = self._get_site_key()
+        self.SHARED_CACHE.check_events(site_key, self._get_latest_site_event_id)
+        return self.SHARED_CACHE.get((site_key, name, project_id), fetch)
+
+    def _get_site_key(self):
+        """
+        Gets the key identifying the current site and user in the shared cache.
+        The user is part of the key because the pipeline configurations
+        returned depend on it.
+
+        :returns: A tuple containing (site url, user login).
+        :rtype: tuple
+        """
+        user = sgtk.get_authenticated_user()
+        return (self._engine.shotgun.base_url, getattr(user, "login", None))
+
+    def _get_latest_site_event_id(self, last_event_id):
+        """
+        Probes the site's event log for changes to the data held in the
+        shared cache.
+
+        :param int last_event_id: The id of the last event seen, or None
+            on the first probe.
+
+        :returns: On the first probe, the id of the latest event. Otherwise,
+            the id of the latest event affecting the shared data since the
+            given one, or None if there is none.
+        :rtype: int
+        """
+        if last_event_id is None:
+            filters = []
+        else:
+            filters = [
+                ["id", "greater_than", last_event_id],
+                ["event_type", "in", constants.SHARED_CACHE_EVENT_TYPES],
+            ]
+
+        try:
+            event = self._engine.shotgun.find_one(
+                "EventLogEntry",
+                filters,
+                ["id"],
+                order=[dict(field_name="id", direction="desc")],
+            )
+        except Exception:
+            # We can't tell whether anything changed, so the shared data
+            # will be refreshed when it expires.
+            logger.debug("Unable to probe the event log.", exc_info=True)
+            return None
+
+        if event is None:
+            return None
+
+        if last_event_id is not None:
+            logger.debug("Shared cache data changed per event %s", event["id"])
+
+        return event["id"]
 
     @sgtk.LogManager.log_timing
     def _get_site_state_data(self):
@@ -1756,39 +2862,38 @@ class ShotgunAPI(object):
         time. This means that this data is queried from Shotgun only once per
         unique WSS connection.
 
-        :returns: A list of Shotgun entity dictionaries.
-        :rtype: list
+        :returns: A tuple of read-only Shotgun entity mappings.
+        :rtype: tuple
         """
         if self.SITE_STATE_DATA not in self._cache:
-            self._cache[self.SITE_STATE_DATA] = self._get_software_entities()
+            site_state_data = list(self._get_software_entities())
 
-            requested_data_specs = self._bundle.execute_hook_method(
-                "browser_integration_hook",
+            requested_data_specs = self._get_browser_integration_hook().execute(
                 "get_site_state_data",
             )
 
             for spec in requested_data_specs:
                 entities = self._engine.shotgun.find(**spec)
-                self._cache[self.SITE_STATE_DATA].extend(entities)
+                site_state_data.extend(entities)
+
+            self._cache[self.SITE_STATE_DATA] = caches.freeze(site_state_data)
         else:
             logger.debug("Cached site state data found for %s", self._wss_key)
 
-        # We'll deepcopy the data before returning it. That will ensure that
-        # any destructive operations on the contents won't bubble up to the
-        # cache.
-        return copy.deepcopy(self._cache[self.SITE_STATE_DATA])
+        return self._cache[self.SITE_STATE_DATA]
 
     @sgtk.LogManager.log_timing
     def _get_software_entities(self):
         """
         Gets all Software entities from the Shotgun client site. Included are
         all existing fields. This data is cached per WSS connection key that
-        was provided to the API's constructor at instantiation time. This means
-        that this data is queried from SHotgun only once per unique WSS
-        connection.
+        was provided to the API's constructor at instantiation time, on top of
+        the cache shared by all the connections to the site. This means that
+        this data is queried from SHotgun only when first needed, or when it
+        has changed.
 
-        :returns: A list of Software entity dictionaries.
-        :rtype: list
+        :returns: A tuple of read-only Software entity mappings.
+        :rtype: tuple
         """
         cache = self._cache
 
@@ -1797,20 +2902,22 @@ class ShotgunAPI(object):
                 "Software entities have not been cached for this connection, querying..."
             )
 
-            cache[self.SOFTWARE_ENTITIES] = self._engine.shotgun.find(
-                "Software",
-                [],
-                fields=self.SOFTWARE_FIELDS,
+            cache[self.SOFTWARE_ENTITIES] = self._get_shared_data(
+                self.SOFTWARE_ENTITIES,
+                None,
+                lambda: caches.freeze(
+                    self._engine.shotgun.find(
+                        "Software",
+                        [],
+                        fields=self.SOFTWARE_FIELDS,
+                    )
+                ),
             )
         else:
             logger.debug("Cached software entities found for %s", self._wss_key)
 
-        # We'll deepcopy the data before returning it. That will ensure that
-        # any destructive operations on the contents won't bubble up to the
-        # cache.
-        return copy.deepcopy(cache[self.SOFTWARE_ENTITIES])
+        return cache[self.SOFTWARE_ENTITIES]
 
-    @sgtk.LogManager.log_timing
     def _get_task_parent_entity_type(self, task_id):
         """
         Gets the Task entity's parent entity type.
@@ -1820,24 +2927,128 @@ class ShotgunAPI(object):
         :returns: The Task's parent entity type.
         :rtype: str
         """
-        cache = self._cache
+        entity_type = self._get_task_parent_entity_types([task_id]).get(task_id)
 
-        if self.TASK_PARENT_TYPES in cache and task_id in cache[self.TASK_PARENT_TYPES]:
-            logger.debug("Parent entity type found in cache for Task %s.", task_id)
-        else:
-            context = sgtk.context.from_entity(
-                self._engine.sgtk,
-                "Task",
-                task_id,
-            )
+        if entity_type is None:
+            raise TankTaskNotLinkedError("Task is not linked to an entity.")
 
-            if context.entity is None:
-                raise TankTaskNotLinkedError("Task is not linked to an entity.")
+        return entity_type
+
+    def _prefetch_task_parent_entity_types(self, entities):
+        """
+        Resolves the parent entity types of all the Tasks in a payload at
+        once. The lookup hashes are then computed from the connection's
+        cache, and the other selected Tasks are already resolved when their
+        own actions are requested.
+
+        :param list entities: The entities extracted from the payload.
+        """
+        task_ids = [entity["id"] for entity in entities if entity["type"] == "Task"]
+
+        if task_ids:
+            self._get_task_parent_entity_types(task_ids)
+
+    @sgtk.LogManager.log_timing
+    def _get_task_parent_entity_types(self, task_ids):
+        """
+        Gets the parent entity types of the given Task entities. They are
+        looked up in the connection's cache, then in the cache database, and
+        the remaining ones are queried with a single find. Parent entity types
+        found in the cache database are only used until they are older than
+        TASK_PARENT_TYPES_TTL.
+
+        :param list task_ids: The ids of the Task entities.
+
+        :returns: A dictionary of parent entity types keyed by Task id. Tasks
+            that aren't linked to an entity are left out.
+        :rtype: dict
+        """
+        cache = self._cache.setdefault(self.TASK_PARENT_TYPES, dict())
+        entity_types = dict()
+        missing_ids = set()
+
+        for task_id in task_ids:
+            if task_id in cache:
+                entity_types[task_id] = cache[task_id]
             else:
-                entity_type = context.entity["type"]
-            cache.setdefault(self.TASK_PARENT_TYPES, dict())[task_id] = entity_type
+                missing_ids.add(task_id)
+
+        if not missing_ids:
+            logger.debug("Parent entity types found in cache for Tasks %s.", task_ids)
+            return entity_types
+
+        now = time.time()
+        rows = []
+
+        with self._db_connect() as (connection, cursor):
+            try:
+                for chunk in self._chunks(sorted(missing_ids)):
+                    cursor.execute(
+                        "SELECT task_id, entity_type FROM task_parent_types "
+                        "WHERE updated_at > ? AND task_id IN (%s)"
+                        % ", ".join("?" * len(chunk)),
+                        [now - constants.TASK_PARENT_TYPES_TTL] + chunk,
+                    )
+                    rows.extend(cursor.fetchall())
+            except sqlite3.OperationalError:
+                # The database hasn't been setup yet, so nothing is cached.
+                pass
+
+        for task_id, entity_type in rows:
+            entity_types[task_id] = cache[task_id] = entity_type
+            missing_ids.discard(task_id)
+
+        if not missing_ids:
+            return entity_types
+
+        tasks = self._engine.shotgun.find(
+            "Task",
+            [["id", "in", sorted(missing_ids)]],
+            fields=["entity"],
+        )
+
+        rows = []
+        for task in tasks:
+            # Tasks that aren't linked to an entity aren't cached, since
+            # the user is asked to link them and refresh.
+            if task.get("entity") is None:
+                continue
+
+            entity_types[task["id"]] = cache[task["id"]] = task["entity"]["type"]
+            rows.append((task["id"], task["entity"]["type"], now))
+
+        if rows:
+            with self._db_connect() as (connection, cursor):
+                try:
+                    cursor.executemany(
+                        "INSERT OR REPLACE INTO task_parent_types "
+                        "(task_id, entity_type, updated_at) VALUES (?, ?, ?)",
+                        rows,
+                    )
+                    cursor.execute(
+                        "DELETE FROM task_parent_types WHERE updated_at <= ?",
+                        (now - constants.TASK_PARENT_TYPES_TTL,),
+                    )
+                except sqlite3.OperationalError:
+                    # The database couldn't be setup, we'll query these again
+                    # from the next connection.
+                    logger.debug("Unable to cache Task parent entity types.")
+
+        return entity_types
 
-        return cache[self.TASK_PARENT_TYPES][task_id]
+    @staticmethod
+    def _chunks(values, size=500):
+        """
+        Splits a list into chunks, so that queries stay under SQLite's limit
+        on the number of bound parameters.
+
+        :param list values: The values to split.
+        :param int size: The maximum size of a chunk.
+
+        :returns: A generator of lists.
+        """
+        for index in range(0, len(values), size):
+            yield values[index : index + size]
 
     def _get_toolkit_manager(self):
         """
@@ -1855,6 +3066,236 @@ class ShotgunAPI(object):
 
         return self.TOOLKIT_MANAGER
 
+    def _get_bundle_cache_path(self):
+        """
+        Gets the path to the bundle cache bootstraps download configs and
+        bundles into.
+
+        :returns: The bundle cache path.
+        :rtype: str
+        """
+        # This mirrors how tk-core resolves the bundle cache location.
+        bundle_cache_path = os.environ.get("SHOTGUN_BUNDLE_CACHE_PATH")
+
+        if not bundle_cache_path:
+            bundle_cache_path = os.path.join(
+                sgtk.util.LocalFileStorageManager.get_global_root(
+                    sgtk.util.LocalFileStorageManager.CACHE
+                ),
+                "bundle_cache",
+            )
+
+        return os.path.expanduser(os.path.expandvars(bundle_cache_path))
+
+    def _get_caching_semaphore(self):
+        """
+        Gets the semaphore that limits the number of concurrent caching
+        bootstraps, shared by all API instances.
+
+        :returns: A :class:`threading.BoundedSemaphore` object.
+        """
+        with self._LOCK:
+            if ShotgunAPI._CACHING_SEMAPHORE is None:
+                max_concurrent_caching = constants.MAX_CONCURRENT_CACHING
+                if constants.MAX_CONCURRENT_CACHING_ENV_VAR in os.environ:
+                    try:
+                        max_concurrent_caching = max(
+                            1,
+                            int(os.environ[constants.MAX_CONCURRENT_CACHING_ENV_VAR]),
+                        )
+                    except ValueError:
+                        logger.warning(
+                            "Invalid value for %s, using %s instead.",
+                            constants.MAX_CONCURRENT_CACHING_ENV_VAR,
+                            max_concurrent_caching,
+                        )
+
+                logger.debug(
+                    "Up to %s caching bootstraps will run concurrently.",
+                    max_concurrent_caching,
+                )
+                ShotgunAPI._CACHING_SEMAPHORE = threading.BoundedSemaphore(
+                    max_concurrent_caching
+                )
+
+        return ShotgunAPI._CACHING_SEMAPHORE
+
+    def _get_caching_executor(self):
+        """
+        Gets the executor the missing engine commands are cached by, shared
+        by all API instances.
+
+        :returns: A :class:`concurrent.futures.ThreadPoolExecutor` object.
+        """
+        with self._LOCK:
+            if ShotgunAPI._CACHING_EXECUTOR is None:
+                ShotgunAPI._CACHING_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=constants.MAX_CACHING_THREADS,
+                    thread_name_prefix="ActionsCaching",
+                )
+
+        return ShotgunAPI._CACHING_EXECUTOR
+
+    def _get_engine_worker_executor(self):
+        """
+        Gets the executor waiting on the engine commands executed by engine
+        workers, shared by all API instances.
+
+        :returns: A :class:`concurrent.futures.ThreadPoolExecutor` object.
+        """
+        with self._LOCK:
+            if ShotgunAPI._ENGINE_WORKER_EXECUTOR is None:
+                ShotgunAPI._ENGINE_WORKER_EXECUTOR = (
+                    concurrent.futures.ThreadPoolExecutor(
+                        max_workers=constants.MAX_ENGINE_WORKER_THREADS,
+                        thread_name_prefix="EngineWorkerExecute",
+                    )
+                )
+
+        return ShotgunAPI._ENGINE_WORKER_EXECUTOR
+
+    @staticmethod
+    def _get_timeout(default, env_var):
+        """
+        Gets the timeout of a kind of subprocess.
+
+        :param float default: The default timeout, in seconds, or None.
+        :param str env_var: The environment variable that overrides it.
+
+        :returns: The number of seconds after which the subprocess is
+            terminated, or None if it has no timeout.
+        :rtype: float
+        """
+        timeout = default
+        if env_var in os.environ:
+            try:
+                timeout = float(os.environ[env_var])
+            except ValueError:
+                logger.warning(
+                    "Invalid value for %s, using %s instead.", env_var, timeout
+                )
+            else:
+                # No timeout is configured with 0.
+                timeout = timeout if timeout > 0 else None
+
+        return timeout
+
+    def _get_browser_integration_hook(self):
+        """
+        Gets the browser_integration hook, shared by all API instances.
+
+        :returns: A :class:`hook_cache.HookCache` object.
+        """
+        with self._LOCK:
+            if ShotgunAPI.BROWSER_INTEGRATION_HOOK is None:
+                ShotgunAPI.BROWSER_INTEGRATION_HOOK = hook_cache.HookCache(
+                    self._bundle,
+                    "browser_integration_hook",
+                    constants.HOOK_MEMO_SIZE,
+                )
+
+        return ShotgunAPI.BROWSER_INTEGRATION_HOOK
+
+    def _get_revalidation_queue(self):
+        """
+        Gets the queue the cached engine commands are revalidated by, shared
+        by all API instances.
+
+        :returns: A :class:`concurrency.WorkQueue` object.
+        """
+        with self._LOCK:
+            if ShotgunAPI.REVALIDATION_QUEUE is None:
+                max_workers = constants.MAX_REVALIDATION_WORKERS
+                if constants.MAX_REVALIDATION_WORKERS_ENV_VAR in os.environ:
+                    try:
+                        max_workers = max(
+                            1,
+                            int(os.environ[constants.MAX_REVALIDATION_WORKERS_ENV_VAR]),
+                        )
+                    except ValueError:
+                        logger.warning(
+                            "Invalid value for %s, using %s instead.",
+                            constants.MAX_REVALIDATION_WORKERS_ENV_VAR,
+                            max_workers,
+                        )
+
+                logger.debug(
+                    "Up to %s cache revalidations will run concurrently.",
+                    max_workers,
+                )
+                ShotgunAPI.REVALIDATION_QUEUE = concurrency.WorkQueue(
+                    max_workers,
+                    constants.MAX_QUEUED_REVALIDATIONS,
+                    "ActionsRevalidation",
+                )
+
+        return ShotgunAPI.REVALIDATION_QUEUE
+
+    def _get_connection_pool(self):
+        """
+        Gets the pool of connections to the cache database, shared by all API
+        instances.
+
+        :returns: A :class:`connection_pool.ConnectionPool` object.
+        """
+        with self._LOCK:
+            pool = ShotgunAPI.CONNECTION_POOLS.get(self._cache_path)
+            if pool is None:
+                pool = connection_pool.ConnectionPool(
+                    functools.partial(ShotgunAPI._connect_database, self._cache_path)
+                )
+                ShotgunAPI.CONNECTION_POOLS[self._cache_path] = pool
+
+        return pool
+
+    def _get_config_watcher(self):
+        """
+        Gets the config watcher shared by all API instances.
+
+        :returns: A :class:`config_watcher.ConfigWatcher` object.
+        """
+        with self._LOCK:
+            if ShotgunAPI.CONFIG_WATCHER is None:
+                ShotgunAPI.CONFIG_WATCHER = config_watcher.ConfigWatcher(
+                    poll_interval=constants.CONFIG_WATCHER_POLL_INTERVAL,
+                    force_polling=constants.POLL_CONFIG_CHANGES in os.environ,
+                )
+                ShotgunAPI.CONFIG_WATCHER.add_listener(ShotgunAPI._on_config_changed)
+
+        return ShotgunAPI.CONFIG_WATCHER
+
+    @classmethod
+    def _on_config_changed(cls, env_path):
+        """
+        Drops the data derived from a config's yml files from all connection
+        caches. This is called by the config watcher when the files change.
+
+        :param str env_path: The config's "env" directory.
+        """
+        for cache in cls.CONNECTION_CACHES.values():
+            for key in (cls.SHOTGUN_YML_FILES, cls.ENTITY_TYPE_WHITELIST):
+                for root_path in list(cache.get(key, dict())):
+                    if root_path is not None and env_path in (
+                        os.path.join(root_path, "config", "env"),
+                        os.path.join(root_path, "env"),
+                    ):
+                        cache[key].pop(root_path, None)
+
+    def _get_engine_worker_pool(self):
+        """
+        Gets the engine worker pool shared by all API instances.
+
+        :returns: An :class:`engine_workers.EngineWorkerPool` object.
+        """
+        with self._LOCK:
+            if ShotgunAPI.ENGINE_WORKER_POOL is None:
+                ShotgunAPI.ENGINE_WORKER_POOL = engine_workers.EngineWorkerPool(
+                    idle_timeout=constants.ENGINE_WORKER_IDLE_TIMEOUT,
+                    reap_interval=constants.ENGINE_WORKER_REAP_INTERVAL,
+                )
+
+        return ShotgunAPI.ENGINE_WORKER_POOL
+
     @sgtk.LogManager.log_timing
     def _get_shotgun_yml_files(self, config_descriptor):
         """
@@ -1875,12 +3316,13 @@ class ShotgunAPI(object):
         :rtype: list
         """
         root_path = config_descriptor.get_path()
-        cache_initialized = self.SHOTGUN_YML_FILES in self._cache
 
-        if (
-            not cache_initialized
-            or root_path not in self._cache[self.SHOTGUN_YML_FILES]
-        ):
+        # The list is dropped from the cache when the config's yml files
+        # change, which can happen from another thread at any time. As such,
+        # we only look it up once.
+        sg_yml_files = self._cache.get(self.SHOTGUN_YML_FILES, dict()).get(root_path)
+
+        if sg_yml_files is None:
             sg_yml_files = list()
 
             if root_path is not None:
@@ -1902,65 +3344,47 @@ class ShotgunAPI(object):
         else:
             logger.debug("Cache shotgun yml file data found for %r.", config_descriptor)
 
-        return self._cache[self.SHOTGUN_YML_FILES].get(root_path)
+        return sg_yml_files
 
     @sgtk.LogManager.log_timing
     def _get_yml_file_data(self, config_descriptor):
         """
         Gets environment yml file paths and their associated mtimes for the
-        given pipeline configuration descriptor object. The data will be looked
-        up once per unique wss connection and cached.
+        given pipeline configuration descriptor object. The config's "env"
+        directory is watched from then on, so the data is always current
+        without walking the directory again.
 
         ..Example:
             {
-                "/shotgun/my_project/config": {
-                    "/shotgun/my_project/config/env/project.yml": 1234567,
-                    ...
-                },
+                "/shotgun/my_project/config/env/project.yml": 1234567,
                 ...
             }
 
         :param config_descriptor: The descriptor object for the config to get
             yml file data for.
 
-        :returns: A dictionary keyed by yml file path, set to the file's mtime
-            at the time the data was cached.
-        :rtype: dict
+        :returns: A read-only mapping keyed by yml file path, set to the
+            file's mtime.
+        :rtype: types.MappingProxyType
         """
         root_path = config_descriptor.get_path()
 
-        if (
-            self.YML_FILE_DATA not in self._cache
-            or root_path not in self._cache[self.YML_FILE_DATA]
-        ):
-            yml_files = dict()
-
-            if root_path is not None:
-                config_path = self._get_config_env_root(root_path)
-
-                logger.debug(
-                    "Config %s is mutable -- environment file mtimes will be used to determine cache validity.",
-                    config_path,
-                )
-
-                # We do a deep scan of from the config's "env" root down to
-                # its bottom.
-                for root, dir_names, file_names in os.walk(config_path):
-                    for file_name in fnmatch.filter(file_names, "*.yml"):
-                        full_path = os.path.join(root, file_name)
-                        yml_files[full_path] = os.path.getmtime(full_path)
+        if root_path is None:
+            return types.MappingProxyType(dict())
 
-            logger.debug(
-                "Contents hash computed using %s yml files.",
-                len(yml_files),
-            )
+        config_path = self._get_config_env_root(root_path)
 
-            logger.debug("Files checked for mtime: %s", sorted(yml_files.keys()))
-            self._cache.setdefault(self.YML_FILE_DATA, dict())[root_path] = yml_files
-        else:
-            logger.debug("Cached yml file data found for %r.", config_descriptor)
+        logger.debug(
+            "Config %s is mutable -- environment file mtimes will be used to determine cache validity.",
+            config_path,
+        )
 
-        return self._cache[self.YML_FILE_DATA].get(root_path)
+        yml_files = self._get_config_watcher().get_mtimes(config_path)
+        logger.debug(
+            "Contents hash computed using %s yml files.",
+            len(yml_files),
+        )
+        return yml_files
 
     def _get_config_env_root(self, config_root_path):
         """
@@ -2001,8 +3425,8 @@ class ShotgunAPI(object):
             directory of each pipeline configuration to get actions for.
 
         :returns: All commands for all shotgun_xxx environments for all
-            requested pipeline configs.
-        :rtype: dict
+            requested pipeline configs, as a read-only mapping.
+        :rtype: types.MappingProxyType
         """
         # The in-memory cache is keyed by the wss_key that is unique to each
         # wss connection.
@@ -2014,16 +3438,13 @@ class ShotgunAPI(object):
         project_not_cached = project_id not in self._cache[self.LEGACY_PROJECT_ACTIONS]
 
         if project_not_cached:
-            self._cache[self.LEGACY_PROJECT_ACTIONS][project_id] = (
+            self._cache[self.LEGACY_PROJECT_ACTIONS][project_id] = caches.freeze(
                 self.process_manager.get_project_actions(
                     config_paths,
                 )
             )
 
-        # We'll deepcopy the data before returning it. That will ensure that
-        # any destructive operations on the contents won't bubble up to the
-        # cache.
-        return copy.deepcopy(self._cache[self.LEGACY_PROJECT_ACTIONS][project_id])
+        return self._cache[self.LEGACY_PROJECT_ACTIONS][project_id]
 
     def _legacy_process_configs(
         self, config_data, entity_type, project_id, all_actions, config_names
@@ -2199,8 +3620,7 @@ class ShotgunAPI(object):
             else:
                 logger.debug("Command %s filtered out for browser integration.", cmd)
 
-        return self._bundle.execute_hook_method(
-            "browser_integration_hook",
+        return self._get_browser_integration_hook().execute(
             "process_commands",
             commands=filtered,
             project=project,
@@ -2221,6 +3641,8 @@ class ShotgunAPI(object):
         """
         if isinstance(item, datetime.datetime):
             return item.isoformat()
+        elif isinstance(item, types.MappingProxyType):
+            return dict(item)
         raise TypeError("Item cannot be serialized: %s" % item)
 
 
@@ -2244,6 +3666,15 @@ class TankCachingSubprocessFailed(sgtk.TankError):
     pass
 
 
+class TankCachingCancelled(sgtk.TankError):
+    """
+    Raised when the caching of toolkit actions is cancelled because none of the
+    connections that requested it is waiting on it anymore.
+    """
+
+    pass
+
+
 class TankCachingEngineBootstrapError(sgtk.TankError):
     """
     Raised when the caching subprocess reports that the engine failed to initialize
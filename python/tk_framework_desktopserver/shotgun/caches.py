@@ -0,0 +1,581 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import collections
+import sys
+import threading
+import time
+import types
+
+from . import concurrency
+
+
+def freeze(value):
+    """
+    Builds an immutable snapshot of the given value, so that it can be shared
+    between callers without being copied. Dictionaries become read-only
+    mappings, lists and tuples become tuples, and sets become frozensets,
+    recursively. Any other object is shared as is.
+
+    :param value: The value to freeze.
+
+    :returns: The frozen value.
+    """
+    if isinstance(value, (dict, types.MappingProxyType)):
+        return types.MappingProxyType(dict((k, freeze(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+def estimate_size(value):
+    """
+    Estimates the memory used by a value and everything it contains, in
+    bytes. Containers are walked recursively, and any other object only
+    counts for its own size. Objects reachable more than once are counted
+    once.
+
+    :param value: The value to measure.
+
+    :returns: The estimated size, in bytes.
+    :rtype: int
+    """
+    size = 0
+    seen = set()
+    pending = [value]
+
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, (dict, types.MappingProxyType)):
+            # A read-only mapping is tiny, but it holds onto a dictionary
+            # that isn't reachable otherwise.
+            items = list(item.items())
+            size += sys.getsizeof(dict(items))
+            for key, child in items:
+                pending.append(key)
+                pending.append(child)
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            size += sys.getsizeof(item)
+            pending.extend(list(item))
+        else:
+            size += sys.getsizeof(item)
+
+    return size
+
+
+class LRUCache(object):
+    """
+    Thread-safe dictionary holding a bounded number of entries. When full,
+    the least recently used entry is evicted to make room for a new one.
+    """
+
+    def __init__(self, max_size):
+        """
+        :param int max_size: The maximum number of entries.
+        """
+        self._max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        Gets the value associated with the given key, marking it as the most
+        recently used entry.
+
+        :param key: Hashable key.
+        :param default: The value to return if the key isn't in the cache.
+
+        :returns: The cached value, or the default.
+        """
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return default
+            return self._entries[key]
+
+    def set(self, key, value):
+        """
+        Stores a value, evicting the least recently used entry if needed.
+
+        :param key: Hashable key.
+        :param value: The value to store.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def discard_if(self, predicate):
+        """
+        Removes all entries whose key matches the given predicate.
+
+        :param predicate: Callable that receives a key and returns ``True``
+            if its entry should be removed.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class ActionsCache(object):
+    """
+    In-memory cache of the engine commands decoded from the engine commands
+    database. Entries are keyed by lookup hash and contents hash, and the
+    contents hash most recently read or written for each lookup hash is
+    tracked. This allows warm requests to find their commands without
+    reading the database. Both are bounded, and evict their least recently
+    used entries.
+
+    The commands are cached as they were stored, for all projects, since the
+    browser_integration hook has to process them for every request before
+    they're filtered for the request's project.
+    """
+
+    def __init__(self, max_size):
+        """
+        :param int max_size: The maximum number of command lists held, and of
+            lookup hashes tracked.
+        """
+        self._commands = LRUCache(max_size)
+        self._contents_hashes = LRUCache(max_size)
+        self._lock = threading.Lock()
+
+    def get(self, lookup_hash):
+        """
+        Gets the commands cached for the current contents hash of the given
+        lookup hash.
+
+        :param str lookup_hash: The lookup hash of the engine commands.
+
+        :returns: A tuple containing (contents hash, commands), or None if
+            nothing is cached.
+        :rtype: tuple
+        """
+        with self._lock:
+            contents_hash = self._contents_hashes.get(lookup_hash)
+
+        if contents_hash is None:
+            return None
+
+        commands = self._commands.get((lookup_hash, contents_hash))
+
+        if commands is None:
+            return None
+
+        return (contents_hash, commands)
+
+    def set(self, lookup_hash, contents_hash, commands):
+        """
+        Caches commands read from the database. Nothing is cached if a newer
+        contents hash has been written for the lookup hash in the meantime.
+
+        :param str lookup_hash: The lookup hash of the engine commands.
+        :param str contents_hash: The contents hash read from the database.
+        :param commands: The decoded commands.
+        """
+        with self._lock:
+            current_hash = self._contents_hashes.get(lookup_hash)
+            if current_hash is None:
+                current_hash = contents_hash
+                self._contents_hashes.set(lookup_hash, contents_hash)
+
+        if current_hash == contents_hash:
+            self._commands.set((lookup_hash, contents_hash), commands)
+
+    def invalidate(self, lookup_hash, contents_hash):
+        """
+        Records that new engine commands have been written for a lookup hash,
+        and drops the commands cached for its previous contents hashes.
+
+        :param str lookup_hash: The lookup hash of the engine commands.
+        :param str contents_hash: The contents hash that was written.
+        """
+        with self._lock:
+            self._contents_hashes.set(lookup_hash, contents_hash)
+
+        self._commands.discard_if(
+            lambda key: key[0] == lookup_hash and key[1] != contents_hash
+        )
+
+    def clear(self):
+        """
+        Removes all cached commands.
+        """
+        with self._lock:
+            self._contents_hashes.clear()
+
+        self._commands.clear()
+
+
+class ConnectionCacheManager(object):
+    """
+    Holds the in-memory cache dictionary of each websocket connection.
+
+    Entries expire once they're older than their time to live, and are
+    released explicitly when their connection is lost. When the estimated
+    size of all entries goes over the memory budget, the least recently used
+    entries are evicted. Estimating sizes means walking the cached data, so
+    an entry's size is only estimated again once a given interval has passed.
+
+    Dropping an entry is always safe: the next request on that connection
+    gets an empty cache, and looks its data up again.
+    """
+
+    _Entry = collections.namedtuple("_Entry", ["data", "created", "size", "sized"])
+
+    def __init__(self, ttl, max_bytes, size_interval):
+        """
+        :param float ttl: Number of seconds an entry is kept for.
+        :param int max_bytes: Memory budget for all entries, in bytes.
+        :param float size_interval: Minimum number of seconds between two
+            size estimates of the same entry.
+        """
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._size_interval = size_interval
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._releases = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        """
+        Gets the cache dictionary associated with a connection, creating an
+        empty one if needed.
+
+        :param key: The connection's unique key.
+
+        :returns: The connection's cache dictionary.
+        :rtype: dict
+        """
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._misses += 1
+                entry = self._entries[key] = self._Entry(dict(), now, 0, now)
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+
+            self._enforce_budget(now)
+            return entry.data
+
+    def values(self):
+        """
+        Gets the cache dictionaries of all connections.
+
+        :returns: A list of cache dictionaries.
+        :rtype: list
+        """
+        with self._lock:
+            return [entry.data for entry in self._entries.values()]
+
+    def release(self, key):
+        """
+        Drops the cache associated with a connection, if any.
+
+        :param key: The connection's unique key.
+        """
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._releases += 1
+
+    def clear(self):
+        """
+        Drops all the cached data.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Gets the counters describing the activity of the cache.
+
+        :returns: A dictionary with "hits", "misses", "evictions",
+            "expirations", "releases", "entries" and "estimated_bytes" keys.
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                releases=self._releases,
+                entries=len(self._entries),
+                estimated_bytes=sum(e.size for e in self._entries.values()),
+            )
+
+    def _expire(self, now):
+        """
+        Drops the entries that are older than their time to live.
+
+        :param float now: The current time.
+        """
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if now - entry.created >= self._ttl
+        ]
+
+        for key in expired:
+            del self._entries[key]
+
+        self._expirations += len(expired)
+
+    def _enforce_budget(self, now):
+        """
+        Evicts the least recently used entries until the estimated size of
+        the remaining ones fits in the memory budget. The most recently used
+        entry is never evicted.
+
+        :param float now: The current time.
+        """
+        total = 0
+
+        for key, entry in list(self._entries.items()):
+            if now - entry.sized >= self._size_interval:
+                try:
+                    size = estimate_size(entry.data)
+                except RuntimeError:
+                    # The data was changed by another thread while we were
+                    # walking it. We'll keep the previous estimate for now.
+                    size = entry.size
+                entry = self._entries[key] = entry._replace(size=size, sized=now)
+            total += entry.size
+
+        while total > self._max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.size
+            self._evictions += 1
+
+
+class SharedCache(object):
+    """
+    Process-wide cache of data that is the same for all the connections to
+    a site, such as Software entities or the schema. Entries are keyed by a
+    tuple whose first item identifies the site.
+
+    Entries are fetched again once they're older than their time to live.
+    All of a site's entries are also dropped when the site's event log shows
+    that relevant data changed. The event log is probed by a callable given
+    by the caller, at most once per probe interval.
+    """
+
+    _Entry = collections.namedtuple("_Entry", ["value", "fetched"])
+
+    def __init__(self, ttl, probe_interval):
+        """
+        :param float ttl: Number of seconds an entry is kept for.
+        :param float probe_interval: Minimum number of seconds between two
+            probes of a site's event log.
+        """
+        self._ttl = ttl
+        self._probe_interval = probe_interval
+        self._entries = dict()
+        self._last_event_ids = dict()
+        self._last_probes = dict()
+        self._lock = threading.Lock()
+        self._fetch_locks = concurrency.KeyedLocks()
+
+    def get(self, key, fetch):
+        """
+        Gets the value associated with the given key, fetching it if it isn't
+        cached or has expired. Concurrent requests for the same key wait for
+        a single fetch.
+
+        :param tuple key: The key, whose first item identifies the site.
+        :param fetch: Callable that takes no argument and returns the value.
+            The value is shared by all callers, so it should be immutable.
+
+        :returns: The cached value.
+        """
+        with self._fetch_locks.lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+
+            if entry is not None and time.time() - entry.fetched < self._ttl:
+                return entry.value
+
+            value = fetch()
+
+            with self._lock:
+                self._entries[key] = self._Entry(value, time.time())
+
+            return value
+
+    def check_events(self, site, probe):
+        """
+        Drops the site's entries if its event log shows relevant changes
+        since the last probe.
+
+        :param site: Hashable site identifier.
+        :param probe: Callable that takes the id of the last event seen, or
+            None on the first probe. On the first probe, it returns the id of
+            the latest event. Otherwise, it returns the id of the latest
+            relevant event after the given one, or None if there is none.
+        """
+        now = time.time()
+
+        with self._lock:
+            if now - self._last_probes.get(site, 0) < self._probe_interval:
+                return
+            self._last_probes[site] = now
+            last_event_id = self._last_event_ids.get(site)
+
+        event_id = probe(last_event_id)
+
+        if event_id is None:
+            return
+
+        with self._lock:
+            self._last_event_ids[site] = event_id
+
+        if last_event_id is not None:
+            self.invalidate(site)
+
+    def invalidate(self, site, name=None):
+        """
+        Drops a site's entries.
+
+        :param site: Hashable site identifier.
+        :param name: If given, only the entries whose key's second item
+            matches are dropped.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == site and (name is None or key[1] == name):
+                    del self._entries[key]
+
+    def clear(self):
+        """
+        Drops all the cached data.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._last_event_ids.clear()
+            self._last_probes.clear()
+
+
+class SoftwareIndex(object):
+    """
+    Index of the projects each Software entity is available in, by Software
+    id and by engine name. A Software entity without any project restriction
+    is available in all projects.
+
+    Several Software entities can share an engine, in which case the engine
+    is available in any project one of them is available in.
+    """
+
+    def __init__(self, sw_entities):
+        """
+        :param sw_entities: The Software entity dictionaries.
+        """
+        self._by_id = self._build(sw_entities, "id")
+        self._by_engine = self._build(sw_entities, "engine")
+
+    def allows_software(self, sw_id, project_id):
+        """
+        Tells whether a Software entity is available in a project.
+
+        :param int sw_id: The Software entity's id.
+        :param int project_id: The project's id.
+
+        :rtype: bool
+        """
+        return self._allows(self._by_id, sw_id, project_id)
+
+    def allows_engine(self, engine_name, project_id):
+        """
+        Tells whether a Software entity for the given engine is available in
+        a project.
+
+        :param str engine_name: The engine's name, such as tk-maya.
+        :param int project_id: The project's id.
+
+        :rtype: bool
+        """
+        return self._allows(self._by_engine, engine_name, project_id)
+
+    @staticmethod
+    def _build(sw_entities, field):
+        """
+        Maps the values of a Software field to the projects they're available
+        in.
+
+        :param sw_entities: The Software entity dictionaries.
+        :param str field: The field to index by.
+
+        :returns: A dictionary of project id sets, or None when available in
+            all projects, keyed by field value.
+        :rtype: dict
+        """
+        index = dict()
+
+        for sw in sw_entities:
+            key = sw.get(field)
+            project_ids = [project["id"] for project in sw.get("projects") or []]
+
+            if not project_ids:
+                index[key] = None
+            elif key not in index:
+                index[key] = set(project_ids)
+            elif index[key] is not None:
+                index[key].update(project_ids)
+
+        return index
+
+    @staticmethod
+    def _allows(index, key, project_id):
+        """
+        Tells whether an indexed value is available in a project.
+
+        :param dict index: The index.
+        :param key: The indexed value.
+        :param int project_id: The project's id.
+
+        :rtype: bool
+        """
+        if key not in index:
+            return False
+
+        project_ids = index[key]
+        return project_ids is None or project_id in project_ids
@@ -0,0 +1,511 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import collections
+import contextlib
+import threading
+import time
+
+import sgtk
+from twisted.internet import defer, reactor, threads
+from twisted.python import failure, threadable
+
+logger = sgtk.platform.get_logger(__name__)
+
+
+def can_defer():
+    """
+    Tells whether the current thread can hand work over to the reactor, and
+    return a Deferred instead of waiting for it. This is the case from the
+    threads serving requests, once the reactor is running.
+
+    :rtype: bool
+    """
+    return bool(reactor.running) and not threadable.isInIOThread()
+
+
+def call_in_reactor(func, *args, **kwargs):
+    """
+    Calls a function from the reactor thread, and returns its result without
+    waiting for it if it's a Deferred. Deferreds aren't thread safe, so the
+    function should add its callbacks to the Deferreds it creates itself, and
+    the caller can only add its own from the reactor thread.
+
+    :param func: The function to call.
+    :param args: The function's positional arguments.
+    :param kwargs: The function's keyword arguments.
+
+    :returns: The function's result.
+    """
+    # A Deferred result would be waited for, so we wrap it.
+    return threads.blockingCallFromThread(reactor, lambda: [func(*args, **kwargs)])[0]
+
+
+def defer_until_done(futures, func):
+    """
+    Calls a function from one of the reactor's threads once the given
+    futures are done, without waiting for them in the current thread.
+
+    :param list futures: :class:`concurrent.futures.Future` objects.
+    :param func: Callable that takes no arguments.
+
+    :returns: A Deferred firing with the function's result, or failing with
+        its exception.
+    """
+    deferred = defer.Deferred()
+    # The callbacks are added before the Deferred can fire, from the reactor
+    # thread, once the last future is done.
+    deferred.addCallback(lambda _: threads.deferToThread(func))
+
+    remaining = [len(futures)]
+    guard = threading.Lock()
+
+    def on_done(future):
+        with guard:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        reactor.callFromThread(deferred.callback, None)
+
+    if not futures:
+        reactor.callFromThread(deferred.callback, None)
+
+    for future in futures:
+        future.add_done_callback(on_done)
+
+    return deferred
+
+
+def defer_future(future):
+    """
+    Wraps a future in a Deferred, without waiting for it in the current
+    thread. The caller should add its callbacks from the reactor thread, see
+    :func:`call_in_reactor`.
+
+    :param future: A :class:`concurrent.futures.Future` object.
+
+    :returns: A Deferred firing from the reactor thread with the future's
+        result, or failing with its exception.
+    """
+    deferred = defer.Deferred()
+
+    def on_done(future):
+        try:
+            result = future.result()
+        except BaseException:
+            reactor.callFromThread(deferred.errback, failure.Failure())
+        else:
+            reactor.callFromThread(deferred.callback, result)
+
+    future.add_done_callback(on_done)
+    return deferred
+
+
+class KeyedLocks(object):
+    """
+    Collection of reentrant locks, one per key. This allows work on unrelated
+    keys to run in parallel while work on the same key is serialized.
+    """
+
+    def __init__(self):
+        self._locks = dict()
+        self._guard = threading.Lock()
+
+    def get(self, key):
+        """
+        Gets the lock associated with the given key, creating it if needed.
+
+        :param key: Hashable key.
+
+        :returns: A :class:`threading.RLock` instance.
+        """
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.RLock()
+            return lock
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """
+        Context manager that holds the lock associated with the given key.
+
+        :param key: Hashable key.
+        """
+        with self.get(key):
+            yield
+
+
+class ActivityTracker(object):
+    """
+    Keeps track of the requests in progress, so that background work can
+    wait for a quiet moment before running.
+    """
+
+    def __init__(self):
+        self._active = 0
+        # Startup counts as activity, so that background work doesn't
+        # compete with it.
+        self._last_activity = time.time()
+        self._condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def active(self):
+        """
+        Context manager that marks a request as in progress.
+        """
+        with self._condition:
+            self._active += 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._last_activity = time.time()
+                self._condition.notify_all()
+
+    def wait_until_idle(self, idle_time, stop_event):
+        """
+        Blocks until no request has been in progress for the given time.
+
+        :param float idle_time: Number of seconds without any request in
+            progress.
+        :param stop_event: A :class:`threading.Event`. Waiting is abandoned
+            when it's set.
+
+        :returns: Whether the tracker became idle, as opposed to waiting
+            being abandoned.
+        :rtype: bool
+        """
+        with self._condition:
+            while not stop_event.is_set():
+                if self._active:
+                    remaining = idle_time
+                else:
+                    remaining = self._last_activity + idle_time - time.time()
+                    if remaining <= 0:
+                        return True
+                # We wake up regularly to check whether we've been stopped.
+                self._condition.wait(min(remaining, 1.0))
+
+        return False
+
+
+class Cancellation(object):
+    """
+    Cancellation state of work that several owners, such as WSS connections,
+    can be waiting on. The work is cancelled once all its owners released it,
+    unless it's also needed regardless of any owner, such as background work.
+    """
+
+    def __init__(self):
+        self._owners = set()
+        self._pinned = False
+        self._cancelled = False
+        self._callbacks = []
+        self._guard = threading.Lock()
+
+    @property
+    def cancelled(self):
+        """
+        Whether the work was cancelled.
+
+        :rtype: bool
+        """
+        with self._guard:
+            return self._cancelled
+
+    def add_owner(self, owner):
+        """
+        Adds an owner to the work.
+
+        :param owner: Hashable owner, or None if the work is needed
+            regardless of any owner, in which case it can't be cancelled.
+        """
+        with self._guard:
+            if owner is None:
+                self._pinned = True
+            else:
+                self._owners.add(owner)
+
+    def release(self, owner):
+        """
+        Removes an owner from the work, and cancels it if it was the last one.
+
+        :param owner: Hashable owner.
+
+        :returns: Whether the work was cancelled.
+        :rtype: bool
+        """
+        with self._guard:
+            if owner not in self._owners:
+                return False
+
+            self._owners.discard(owner)
+            if self._owners or self._pinned or self._cancelled:
+                return False
+
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            callback()
+        return True
+
+    def on_cancel(self, callback):
+        """
+        Registers a callback called once the work is cancelled, right away if
+        it already was. The callback is called from the thread that cancels
+        the work, so it should be quick.
+
+        :param callback: Callable that takes no arguments.
+        """
+        with self._guard:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+class SingleFlight(object):
+    """
+    Runs a single call at a time per key. Callers asking for a key while a
+    call is already in progress for it don't make their own call: they wait
+    for the one in progress and share its result, or its error.
+
+    Each call has a :class:`Cancellation`, owned by the callers waiting on
+    it, so that it can be cancelled once none of them needs it anymore.
+    """
+
+    class _Call(object):
+        """
+        A call in progress, and its outcome once it's done.
+        """
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+            self.cancellation = Cancellation()
+
+    def __init__(self):
+        self._calls = dict()
+        self._guard = threading.Lock()
+
+    def do(self, key, func, owner=None):
+        """
+        Calls the given function, unless a call is already in progress for
+        the given key, in which case its outcome is waited for instead.
+
+        :param key: Hashable key.
+        :param func: Callable that takes no arguments. It can get the
+            call's :class:`Cancellation` with :meth:`cancellation`.
+        :param owner: Hashable owner of the call, which can release it with
+            :meth:`release`. The call is never cancelled if any of its
+            callers gives no owner.
+
+        :returns: The value returned by the call.
+        :raises: The exception raised by the call, if any.
+        """
+        with self._guard:
+            call = self._calls.get(key)
+            # A cancelled call is on its way out, and its outcome isn't
+            # something new callers want.
+            leader = call is None or call.cancellation.cancelled
+            if leader:
+                call = self._calls[key] = self._Call()
+            call.cancellation.add_owner(owner)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Callers arriving from now on make a new call, since the outcome
+            # of this one might not reflect their state anymore.
+            with self._guard:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def cancellation(self, key):
+        """
+        Gets the :class:`Cancellation` of the call in progress for the given
+        key.
+
+        :param key: Hashable key.
+
+        :returns: A :class:`Cancellation` object, or None if no call is in
+            progress for the key.
+        """
+        with self._guard:
+            call = self._calls.get(key)
+            return call.cancellation if call is not None else None
+
+    def release(self, owner):
+        """
+        Removes an owner from all the calls in progress. The calls that no
+        other caller needs anymore are cancelled.
+
+        :param owner: Hashable owner.
+
+        :returns: The number of calls that were cancelled.
+        :rtype: int
+        """
+        # Releasing under the guard makes sure callers don't join a call
+        # that's being cancelled.
+        with self._guard:
+            return sum(
+                1 for call in self._calls.values() if call.cancellation.release(owner)
+            )
+
+    def in_flight(self, key):
+        """
+        Tells whether a call is in progress for the given key.
+
+        :param key: Hashable key.
+
+        :rtype: bool
+        """
+        with self._guard:
+            return key in self._calls
+
+
+class WorkQueue(object):
+    """
+    Runs work items in a fixed number of background threads. Each item has a
+    key, and an item whose key is already queued or running is dropped, as
+    it would duplicate that work. Items are also dropped when the queue is
+    full, rather than blocking the caller or growing without bounds.
+    """
+
+    def __init__(self, max_workers, max_queued, name):
+        """
+        :param int max_workers: Number of threads running the items.
+        :param int max_queued: Maximum number of items waiting to run.
+        :param str name: Name given to the threads.
+        """
+        self._max_workers = max_workers
+        self._max_queued = max_queued
+        self._name = name
+        self._queued = collections.OrderedDict()
+        self._running = set()
+        self._workers = []
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._counts = dict(
+            submitted=0, deduplicated=0, dropped=0, completed=0, failed=0
+        )
+
+    def __len__(self):
+        """
+        :returns: The number of items waiting to run.
+        """
+        with self._condition:
+            return len(self._queued)
+
+    def submit(self, key, func):
+        """
+        Queues a work item, unless one with the same key is already queued or
+        running, or the queue is full.
+
+        :param key: Hashable key identifying the work.
+        :param func: Callable that takes no arguments.
+
+        :returns: Whether the item was queued.
+        :rtype: bool
+        """
+        with self._condition:
+            if self._shutdown:
+                return False
+
+            if key in self._queued or key in self._running:
+                self._counts["deduplicated"] += 1
+                return False
+
+            if len(self._queued) >= self._max_queued:
+                self._counts["dropped"] += 1
+                return False
+
+            self._queued[key] = func
+            self._counts["submitted"] += 1
+
+            # Threads are started as they become needed.
+            if len(self._workers) < self._max_workers:
+                worker = threading.Thread(
+                    target=self._work,
+                    name="%s-%d" % (self._name, len(self._workers)),
+                    daemon=True,
+                )
+                self._workers.append(worker)
+                worker.start()
+
+            self._condition.notify()
+            return True
+
+    def stats(self):
+        """
+        Gets the state of the queue, and the number of items submitted,
+        deduplicated, dropped, completed and failed so far.
+
+        :returns: A dictionary of counts, including the "queued" and
+            "running" number of items.
+        :rtype: dict
+        """
+        with self._condition:
+            stats = dict(self._counts)
+            stats.update(queued=len(self._queued), running=len(self._running))
+            return stats
+
+    def shutdown(self):
+        """
+        Drops the items waiting to run, and stops the threads once they're
+        done with the items they're running. This doesn't wait for them.
+        """
+        with self._condition:
+            self._shutdown = True
+            self._queued.clear()
+            self._condition.notify_all()
+
+    def _work(self):
+        """
+        Runs queued items until the queue is shut down.
+        """
+        while True:
+            with self._condition:
+                while not self._queued and not self._shutdown:
+                    self._condition.wait()
+
+                if self._shutdown:
+                    return
+
+                key, func = self._queued.popitem(last=False)
+                self._running.add(key)
+
+            try:
+                func()
+                outcome = "completed"
+            except Exception:
+                logger.exception("Work item %s failed.", key)
+                outcome = "failed"
+
+            with self._condition:
+                self._running.discard(key)
+                self._counts[outcome] += 1
@@ -0,0 +1,567 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import os
+import re
+import select
+import struct
+import sys
+import threading
+import time
+
+import sgtk
+
+from . import caches
+
+logger = sgtk.platform.get_logger(__name__)
+
+# Flags from sys/inotify.h.
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+_FILE_EVENTS = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE
+
+# Inotify only reports the changes made from the local host, so directories
+# on these filesystems are polled.
+_NETWORK_FILESYSTEMS = (
+    "nfs",
+    "nfs4",
+    "cifs",
+    "smbfs",
+    "smb3",
+    "afs",
+    "ceph",
+    "glusterfs",
+    "lustre",
+    "gpfs",
+    "fuse.sshfs",
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class ConfigWatcher(object):
+    """
+    Keeps a live index of the mtimes of the yml files found under watched
+    directories, typically the env directories of mutable configs.
+
+    On Linux, the directories are watched with inotify, and the index is
+    updated from its events. Elsewhere, or when inotify can't be used, the
+    directories are polled instead: the files are stat'ed again, and a
+    directory is only walked again when its mtime changed.
+
+    Listeners are notified from a background thread when a watched directory
+    changes, so that data derived from it can be dropped eagerly.
+    """
+
+    def __init__(self, poll_interval, force_polling=False):
+        """
+        :param float poll_interval: Number of seconds between two polls of
+            the directories that aren't watched with inotify.
+        :param bool force_polling: Whether to poll all directories, even
+            when inotify is available.
+        """
+        self._poll_interval = poll_interval
+        self._trees = dict()
+        self._watches = dict()
+        self._listeners = []
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        self._inotify = None
+
+        if not force_polling:
+            self._inotify = _Inotify.create()
+
+        if self._inotify is None:
+            logger.debug("Config changes will be detected by polling.")
+
+        self._thread = threading.Thread(
+            target=self._run, name="ConfigWatcher", daemon=True
+        )
+        self._thread.start()
+
+    def add_listener(self, callback):
+        """
+        Registers a callable to be notified when a watched directory changes.
+
+        :param callback: Callable that takes the path of the directory, as
+            given to :meth:`get_mtimes`.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def get_mtimes(self, path):
+        """
+        Gets the mtimes of the yml files found under the given directory,
+        which is watched from now on.
+
+        :param str path: The directory to index.
+
+        :returns: A read-only mapping of yml file paths to their mtimes.
+        :rtype: types.MappingProxyType
+        """
+        with self._lock:
+            tree = self._trees.get(path)
+
+            if tree is None:
+                tree = self._trees[path] = _Tree(
+                    path,
+                    polling=self._inotify is None or _is_network_filesystem(path),
+                )
+                self._scan(tree)
+                changed = []
+            else:
+                changed = self._update(tree)
+
+            mtimes = tree.get_snapshot()
+
+        self._notify(changed)
+        return mtimes
+
+    def refresh(self):
+        """
+        Brings the index of all watched directories up to date, rather than
+        waiting for the next poll.
+        """
+        with self._lock:
+            changed = set(self._read_events())
+            changed.update(
+                path
+                for path, tree in list(self._trees.items())
+                if tree.polling and self._poll(tree)
+            )
+
+        self._notify(changed)
+
+    def close(self):
+        """
+        Stops watching all directories.
+        """
+        self._closed.set()
+        self._thread.join()
+
+        with self._lock:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            self._trees.clear()
+            self._watches.clear()
+
+    def _run(self):
+        """
+        Applies changes to the index as they happen, and notifies the
+        listeners. This runs in a background thread.
+        """
+        last_poll = time.time()
+
+        while not self._closed.is_set():
+            if self._inotify is not None:
+                try:
+                    select.select([self._inotify.fd], [], [], 1.0)
+                except (OSError, ValueError):
+                    # The file descriptor was closed while we were waiting.
+                    break
+            else:
+                self._closed.wait(1.0)
+
+            with self._lock:
+                changed = set(self._read_events())
+
+                if time.time() - last_poll >= self._poll_interval:
+                    last_poll = time.time()
+                    changed.update(
+                        path
+                        for path, tree in list(self._trees.items())
+                        if tree.polling and self._poll(tree)
+                    )
+
+            self._notify(changed)
+
+    def _notify(self, paths):
+        """
+        Notifies the listeners that the given directories changed.
+
+        :param paths: The paths of the directories that changed.
+        """
+        with self._lock:
+            listeners = list(self._listeners)
+
+        for path in paths:
+            logger.debug("Config changes detected in %s", path)
+            for callback in listeners:
+                try:
+                    callback(path)
+                except Exception:
+                    logger.exception("Config change listener failed.")
+
+    def _update(self, tree):
+        """
+        Brings a tree up to date before reading it. Pending inotify events are
+        applied, and a polled tree is polled if it wasn't recently.
+
+        :param tree: The tree to update.
+
+        :returns: The paths of the trees that changed.
+        :rtype: list
+        """
+        changed = self._read_events()
+
+        if tree.polling and time.time() - tree.polled >= self._poll_interval:
+            if self._poll(tree):
+                changed.append(tree.path)
+
+        return changed
+
+    def _scan(self, tree):
+        """
+        Indexes a tree from scratch, watching its directories with inotify
+        if possible.
+
+        :param tree: The tree to scan.
+        """
+        self._unwatch(tree)
+        tree.reset()
+
+        for root, dir_names, file_names in os.walk(tree.path):
+            if not tree.polling:
+                # The directory is watched before its files are stat'ed, so
+                # that changes made while we're scanning aren't missed.
+                wd = self._inotify.add_watch(root)
+                if wd is None:
+                    logger.debug("Unable to watch %s, falling back to polling.", root)
+                    self._unwatch(tree)
+                    tree.polling = True
+                else:
+                    self._watches[wd] = (tree, root)
+
+            tree.dirs[root] = _get_mtime(root)
+
+            for file_name in fnmatch.filter(file_names, "*.yml"):
+                full_path = os.path.join(root, file_name)
+                mtime = _get_mtime(full_path)
+                if mtime is not None:
+                    tree.files[full_path] = mtime
+
+        tree.polled = time.time()
+
+    def _poll(self, tree):
+        """
+        Checks a tree for changes without inotify. The tree is walked again
+        if the mtime of any of its directories changed, which happens when
+        files are added, removed or renamed. Otherwise, its files are stat'ed.
+
+        :param tree: The tree to poll.
+
+        :returns: Whether the tree changed.
+        :rtype: bool
+        """
+        tree.polled = time.time()
+
+        if any(_get_mtime(d) != mtime for d, mtime in tree.dirs.items()):
+            files = dict(tree.files)
+            self._scan(tree)
+            return files != tree.files
+
+        changed = False
+        for path, mtime in list(tree.files.items()):
+            changed |= tree.set_mtime(path, _get_mtime(path))
+        return changed
+
+    def _read_events(self):
+        """
+        Applies the pending inotify events to the index.
+
+        :returns: The paths of the trees that changed.
+        :rtype: list
+        """
+        if self._inotify is None:
+            return []
+
+        changed = set()
+        dirty = set()
+
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, so we can't trust any of the watched
+                # trees anymore.
+                logger.debug("Inotify event queue overflowed.")
+                dirty.update(t for t in self._trees.values() if not t.polling)
+                continue
+
+            tree, directory = self._watches.get(wd, (None, None))
+            if tree is None:
+                continue
+
+            if mask & IN_IGNORED:
+                del self._watches[wd]
+
+            if name and not mask & IN_ISDIR and mask & _FILE_EVENTS:
+                if fnmatch.fnmatch(name, "*.yml"):
+                    full_path = os.path.join(directory, name)
+                    if tree.set_mtime(full_path, _get_mtime(full_path)):
+                        changed.add(tree)
+            else:
+                # Files or directories were added, removed or renamed. That
+                # is rare enough that we just scan the whole tree again.
+                dirty.add(tree)
+
+        for tree in dirty:
+            files = dict(tree.files)
+            self._scan(tree)
+            if files != tree.files:
+                changed.add(tree)
+
+        return [tree.path for tree in changed]
+
+    def _unwatch(self, tree):
+        """
+        Stops watching a tree's directories with inotify.
+
+        :param tree: The tree to stop watching.
+        """
+        for wd, (watched_tree, _) in list(self._watches.items()):
+            if watched_tree is tree:
+                del self._watches[wd]
+                self._inotify.rm_watch(wd)
+
+
+class _Tree(object):
+    """
+    Index of the yml files found under a directory.
+    """
+
+    def __init__(self, path, polling):
+        """
+        :param str path: The indexed directory.
+        :param bool polling: Whether the directory is polled rather than
+            watched with inotify.
+        """
+        self.path = path
+        self.polling = polling
+        self.polled = 0
+        self.files = dict()
+        self.dirs = dict()
+        self._snapshot = None
+
+    def reset(self):
+        """
+        Empties the index.
+        """
+        self.files.clear()
+        self.dirs.clear()
+        self._snapshot = None
+
+    def set_mtime(self, path, mtime):
+        """
+        Records the mtime of a file.
+
+        :param str path: The file's path.
+        :param float mtime: The file's mtime, or None if it doesn't exist.
+
+        :returns: Whether the index changed.
+        :rtype: bool
+        """
+        if self.files.get(path) == mtime:
+            return False
+
+        if mtime is None:
+            del self.files[path]
+        else:
+            self.files[path] = mtime
+
+        self._snapshot = None
+        return True
+
+    def get_snapshot(self):
+        """
+        Gets a read-only copy of the index, which is only built again once
+        the index changed.
+
+        :returns: A read-only mapping of yml file paths to their mtimes.
+        :rtype: types.MappingProxyType
+        """
+        if self._snapshot is None:
+            self._snapshot = caches.freeze(self.files)
+        return self._snapshot
+
+
+class _Inotify(object):
+    """
+    Minimal wrapper around the Linux inotify API.
+    """
+
+    @classmethod
+    def create(cls):
+        """
+        Creates an inotify instance.
+
+        :returns: An :class:`_Inotify` object, or None if inotify isn't
+            available on this system.
+        """
+        if not sys.platform.startswith("linux"):
+            return None
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            logger.debug("Inotify is not available.", exc_info=True)
+            return None
+
+        if fd < 0:
+            logger.debug(
+                "Unable to initialize inotify: %s",
+                os.strerror(ctypes.get_errno()),
+            )
+            return None
+
+        return cls(libc, fd)
+
+    def __init__(self, libc, fd):
+        """
+        :param libc: The C library.
+        :param int fd: The inotify file descriptor.
+        """
+        self._libc = libc
+        self.fd = fd
+
+    def add_watch(self, path):
+        """
+        Starts watching a directory.
+
+        :param str path: The directory to watch.
+
+        :returns: The watch descriptor, or None if the directory can't be
+            watched, such as when the limit of watches is reached.
+        :rtype: int
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            return None
+        return wd
+
+    def rm_watch(self, wd):
+        """
+        Stops watching a directory.
+
+        :param int wd: The watch descriptor.
+        """
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """
+        Reads the pending events, without blocking.
+
+        :returns: A list of (watch descriptor, mask, file name) tuples.
+        :rtype: list
+        """
+        events = []
+
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except OSError as exc:
+                if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return events
+                raise
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self):
+        """
+        Closes the inotify instance, which removes all its watches.
+        """
+        os.close(self.fd)
+
+
+def _get_mtime(path):
+    """
+    Gets the mtime of a file or directory.
+
+    :param str path: The path to check.
+
+    :returns: The mtime, or None if the path doesn't exist.
+    :rtype: float
+    """
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _is_network_filesystem(path):
+    """
+    Checks whether a path is on a network filesystem, per the mount table.
+
+    :param str path: The path to check.
+
+    :returns: Whether the path is on a known network filesystem.
+    :rtype: bool
+    """
+    path = os.path.realpath(path)
+    mount_point = ""
+    fs_type = None
+
+    try:
+        # The mount points are read as bytes and decoded the same way as the
+        # paths they are compared to.
+        with open("/proc/self/mounts", "rb") as fh:
+            for line in fh:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces and other special characters are octal-escaped.
+                point = os.fsdecode(
+                    re.sub(
+                        rb"\\([0-7]{3})",
+                        lambda m: bytes([int(m.group(1), 8)]),
+                        fields[1],
+                    )
+                )
+                if (path == point or path.startswith(point.rstrip("/") + "/")) and len(
+                    point
+                ) >= len(mount_point):
+                    mount_point, fs_type = point, fields[2].decode("ascii", "replace")
+    except (IOError, OSError):
+        return False
+
+    return fs_type in _NETWORK_FILESYSTEMS
@@ -0,0 +1,77 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import threading
+
+
+class ConnectionPool(object):
+    """
+    Pool of sqlite connections to a single database, holding one connection
+    per thread. Keeping the connections open means we only pay for opening
+    the database and reading its schema once per thread, and that sqlite's
+    per-connection cache of prepared statements stays warm between requests.
+    """
+
+    def __init__(self, connect):
+        """
+        :param connect: Callable that opens and returns a new connection. The
+            connection must be created with ``check_same_thread=False``, so
+            that the pool can close it from another thread.
+        """
+        self._connect = connect
+        self._local = threading.local()
+        self._connections = dict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Gets the connection associated with the current thread, opening one
+        if needed.
+
+        :returns: A :class:`sqlite3.Connection` object.
+        """
+        # Connections handed out before close_all was called have been
+        # closed, so we can't reuse them.
+        if getattr(self._local, "generation", None) == self._generation:
+            return self._local.connection
+
+        connection = self._connect()
+
+        with self._lock:
+            self._connections[threading.current_thread()] = connection
+            self._local.connection = connection
+            self._local.generation = self._generation
+
+        self._close_dead_thread_connections()
+        return connection
+
+    def close_all(self):
+        """
+        Closes all the connections in the pool.
+        """
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+            self._generation += 1
+
+        for connection in connections:
+            connection.close()
+
+    def _close_dead_thread_connections(self):
+        """
+        Closes the connections owned by threads that have exited.
+        """
+        with self._lock:
+            dead_threads = [t for t in self._connections if not t.is_alive()]
+            connections = [self._connections.pop(t) for t in dead_threads]
+
+        for connection in connections:
+            connection.close()
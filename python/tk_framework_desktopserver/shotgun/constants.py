@@ -60,3 +60,108 @@ LOGGING_PREFIX = "PTR:"
 LEGACY_CONFIG_ROOT = "_legacy_config_root"
 LEGACY_EXEMPT_ACTIONS = ["__core_info", "__upgrade_check"]
 ENABLE_LEGACY_WORKAROUND = "SHOTGUN_ENABLE_LEGACY_BROWSER_INTEGRATION_WORKAROUND"
+
+# When this environment variable is set, engine commands are listed by
+# long-lived worker processes that keep each pipeline configuration
+# bootstrapped, rather than by a new get_commands.py process per request.
+ENABLE_ENGINE_WORKERS = "SHOTGUN_ENABLE_BROWSER_INTEGRATION_ENGINE_WORKERS"
+ENGINE_WORKER_IDLE_TIMEOUT = 600.0  # Seconds
+ENGINE_WORKER_REAP_INTERVAL = 60.0  # Seconds
+
+# Maximum number of caching bootstraps that can run at the same time for
+# unrelated pipeline configurations. It can be overridden by setting the
+# environment variable below.
+MAX_CONCURRENT_CACHING = 4
+MAX_CONCURRENT_CACHING_ENV_VAR = "SHOTGUN_BROWSER_INTEGRATION_MAX_CONCURRENT_CACHING"
+
+# Number of threads, shared by all requests, that cache the engine commands
+# missing for get_actions requests. It's larger than the number of concurrent
+# bootstraps, so that the caching jobs that don't need to bootstrap aren't
+# stuck behind the ones that do.
+MAX_CACHING_THREADS = 8
+
+# Maximum number of threads waiting on the engine commands executed by
+# engine workers. A command is only handed to a worker that isn't busy, so
+# this is the number of configurations that can run commands at once before
+# the next ones wait.
+MAX_ENGINE_WORKER_THREADS = 8
+
+# Caching subprocesses are terminated, along with the processes they started,
+# once they've been running for longer than their timeout, so that a hung
+# bootstrap doesn't keep the requests waiting on it forever. Engine commands
+# have no timeout by default, since some of them legitimately run for a long
+# time. Both can be overridden by setting the environment variables below to
+# a number of seconds, 0 meaning no timeout.
+CACHING_TIMEOUT = 600.0  # Seconds
+CACHING_TIMEOUT_ENV_VAR = "SHOTGUN_BROWSER_INTEGRATION_CACHING_TIMEOUT"
+EXECUTE_TIMEOUT = None
+EXECUTE_TIMEOUT_ENV_VAR = "SHOTGUN_BROWSER_INTEGRATION_EXECUTE_TIMEOUT"
+
+# Cached engine commands are revalidated in the background by a fixed number
+# of threads, which can be overridden by setting the environment variable
+# below. Revalidations requested while the queue is full are dropped, and
+# requested again by a later get_actions request.
+MAX_REVALIDATION_WORKERS = 2
+MAX_REVALIDATION_WORKERS_ENV_VAR = (
+    "SHOTGUN_BROWSER_INTEGRATION_MAX_REVALIDATION_WORKERS"
+)
+MAX_QUEUED_REVALIDATIONS = 64
+
+# The parent entity types of Tasks are persisted in the cache database, and
+# queried again once older than their time to live, in case a Task was linked
+# to another entity.
+TASK_PARENT_TYPES_TTL = 24 * 60 * 60.0  # Seconds
+
+# Maximum number of browser_integration hook results, such as cache keys,
+# that are memoized until the hook files change.
+HOOK_MEMO_SIZE = 1024
+
+# Maximum number of decoded command lists that are kept in memory to answer
+# get_actions requests without reading the cache database.
+ACTIONS_CACHE_SIZE = 256
+
+# The in-memory cache of each websocket connection is dropped once it's
+# older than its time to live, or when the connection is lost. When the
+# estimated size of all the connection caches goes over the memory budget,
+# the least recently used ones are dropped. Sizes are estimated again at
+# most once per interval, since it means walking all the cached data.
+CONNECTION_CACHE_TTL = 3600.0  # Seconds
+CONNECTION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CONNECTION_CACHE_SIZE_INTERVAL = 30.0  # Seconds
+
+# Software entities, the schema and pipeline configurations are cached for
+# all the connections to a site. They are queried again once older than the
+# time to live, or when the event log shows that they changed. The event log
+# is checked at most once per probe interval.
+SHARED_CACHE_TTL = 900.0  # Seconds
+SHARED_CACHE_PROBE_INTERVAL = 30.0  # Seconds
+SHARED_CACHE_EVENT_TYPES = [
+    "Shotgun_Software_New",
+    "Shotgun_Software_Change",
+    "Shotgun_Software_Retirement",
+    "Shotgun_Software_Revival",
+    "Shotgun_PipelineConfiguration_New",
+    "Shotgun_PipelineConfiguration_Change",
+    "Shotgun_PipelineConfiguration_Retirement",
+    "Shotgun_PipelineConfiguration_Revival",
+    "Shotgun_DisplayColumn_New",
+    "Shotgun_DisplayColumn_Change",
+    "Shotgun_DisplayColumn_Retirement",
+]
+
+# The yml files of mutable configs are watched with inotify on Linux, and
+# polled elsewhere. Setting the environment variable below forces polling,
+# which can be needed for configs on network filesystems, since inotify
+# doesn't report changes made from other hosts.
+CONFIG_WATCHER_POLL_INTERVAL = 5.0  # Seconds
+POLL_CONFIG_CHANGES = "SHOTGUN_BROWSER_INTEGRATION_POLL_CONFIG_CHANGES"
+
+# Number of contents hashes whose inputs are remembered, so that we can log
+# what changed when a cache entry gets rebuilt.
+CONTENTS_HASH_HISTORY_SIZE = 64
+
+# Prewarming of the engine commands cache at startup stops once the time
+# budget is spent, and each project waits until no request has been received
+# from the clients for the idle time.
+PREWARM_TIME_BUDGET = 600.0  # Seconds
+PREWARM_IDLE_TIME = 10.0  # Seconds
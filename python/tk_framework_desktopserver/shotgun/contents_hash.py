@@ -0,0 +1,208 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import base64
+import hashlib
+import json
+import threading
+
+from . import caches
+
+ENTITIES = "entities"
+MODTIMES = "modtimes"
+
+
+class ContentsHasher(object):
+    """
+    Computes the contents hash of a pipeline configuration as a hash tree.
+
+    Each entity and each yml file is a leaf, with its own digest. The leaves
+    are combined per group, entities and modtimes, and the groups are combined
+    into the root hash. The digest of an entity is only computed again when
+    it's given a new entity object, which happens when the entity was queried
+    again, and the digest of a file only when its mtime changed. Combining
+    the leaves only means hashing their digests.
+
+    The leaves of the most recent hashes are remembered, so that the inputs
+    that changed between two hashes can be reported.
+    """
+
+    def __init__(self, history_size):
+        """
+        :param int history_size: Number of hashes whose leaves are remembered.
+        """
+        self._entity_digests = dict()
+        self._file_digests = dict()
+        self._history = caches.LRUCache(history_size)
+        self._lock = threading.Lock()
+
+    def compute(self, entities, modtimes, json_default):
+        """
+        Computes the contents hash of the given inputs.
+
+        :param entities: The entity dictionaries to include in the hash.
+        :param modtimes: Dictionary of yml file paths to their mtimes.
+        :param json_default: Fallback serializer for the values that the
+            json library doesn't support.
+
+        :returns: The base64-encoded hash.
+        :rtype: str
+        """
+        leaves = {
+            ENTITIES: self._get_entity_leaves(entities, json_default),
+            MODTIMES: self._get_file_leaves(modtimes),
+        }
+
+        root = hashlib.md5()
+        for group in (ENTITIES, MODTIMES):
+            root.update(_combine(leaves[group]))
+
+        # The digest is binary, so we base64 encode it to get a str.
+        contents_hash = base64.b64encode(root.digest()).decode("utf-8")
+        self._history.set(contents_hash, leaves)
+        return contents_hash
+
+    def diff(self, old_hash, new_hash):
+        """
+        Describes the inputs that changed between two hashes computed by this
+        object.
+
+        :param str old_hash: The previous hash.
+        :param str new_hash: The current hash.
+
+        :returns: A list of descriptions, such as "changed Software 12", or
+            None if the leaves of either hash aren't known anymore.
+        :rtype: list
+        """
+        old_leaves = self._history.get(old_hash)
+        new_leaves = self._history.get(new_hash)
+
+        if old_leaves is None or new_leaves is None:
+            return None
+
+        changes = []
+        for group in (ENTITIES, MODTIMES):
+            old_group = old_leaves[group]
+            new_group = new_leaves[group]
+
+            for key in sorted(set(old_group) | set(new_group), key=repr):
+                if key not in old_group:
+                    change = "added"
+                elif key not in new_group:
+                    change = "removed"
+                elif old_group[key] != new_group[key]:
+                    change = "changed"
+                else:
+                    continue
+                changes.append("%s %s" % (change, _describe(key)))
+
+        return changes
+
+    def _get_entity_leaves(self, entities, json_default):
+        """
+        Gets the digests of the given entities, keyed by entity type and id.
+
+        :param entities: The entity dictionaries.
+        :param json_default: Fallback serializer for the json library.
+
+        :returns: A dictionary of digests.
+        :rtype: dict
+        """
+        leaves = dict()
+
+        for entity in entities:
+            key = (entity.get("type"), entity.get("id"))
+
+            # The same entity can be queried more than once to build the
+            # site state, so we make sure each occurrence is a leaf.
+            occurrence = 0
+            while key + (occurrence,) in leaves:
+                occurrence += 1
+            key += (occurrence,)
+
+            with self._lock:
+                cached = self._entity_digests.get(key)
+
+            if cached is not None and cached[0] is entity:
+                leaves[key] = cached[1]
+                continue
+
+            digest = hashlib.md5(
+                json.dumps(entity, sort_keys=True, default=json_default).encode("utf-8")
+            ).digest()
+
+            with self._lock:
+                # Entities are matched by identity, which holds because the
+                # cached entities are immutable snapshots. Entities queried
+                # again are new objects, and get a new digest.
+                self._entity_digests[key] = (entity, digest)
+
+            leaves[key] = digest
+
+        return leaves
+
+    def _get_file_leaves(self, modtimes):
+        """
+        Gets the digests of the given files, keyed by path.
+
+        :param modtimes: Dictionary of file paths to their mtimes.
+
+        :returns: A dictionary of digests.
+        :rtype: dict
+        """
+        leaves = dict()
+
+        for path, mtime in modtimes.items():
+            with self._lock:
+                cached = self._file_digests.get(path)
+
+            if cached is not None and cached[0] == mtime:
+                leaves[path] = cached[1]
+                continue
+
+            digest = hashlib.md5(json.dumps([path, mtime]).encode("utf-8")).digest()
+
+            with self._lock:
+                self._file_digests[path] = (mtime, digest)
+
+            leaves[path] = digest
+
+        return leaves
+
+
+def _combine(leaves):
+    """
+    Combines the digests of a group of leaves, in a stable order.
+
+    :param dict leaves: The digests, keyed by leaf.
+
+    :returns: The digest of the group.
+    :rtype: bytes
+    """
+    node = hashlib.md5()
+    for key in sorted(leaves, key=repr):
+        node.update(repr(key).encode("utf-8"))
+        node.update(leaves[key])
+    return node.digest()
+
+
+def _describe(key):
+    """
+    Describes a leaf for logging.
+
+    :param key: The leaf's key.
+
+    :returns: The description.
+    :rtype: str
+    """
+    if isinstance(key, tuple):
+        entity_type, entity_id, occurrence = key
+        return "%s %s" % (entity_type, entity_id)
+    return key
@@ -0,0 +1,462 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import json
+import subprocess
+import threading
+import time
+
+import sgtk
+from .. import command
+
+logger = sgtk.platform.get_logger(__name__)
+
+
+class EngineWorker(object):
+    """
+    Handle on a scripts/engine_worker.py process that keeps a pipeline
+    configuration bootstrapped between requests.
+    """
+
+    SCRIPT = os.path.join(os.path.dirname(__file__), "scripts", "engine_worker.py")
+
+    def __init__(self, python_exe, init_data, contents_hash):
+        """
+        Starts the worker process.
+
+        :param str python_exe: The Python interpreter to run the worker with.
+        :param dict init_data: The initialization data sent to the worker. This
+            has the same layout as the arguments given to get_commands.py, plus
+            the logging prefix given to execute_command.py.
+        :param str contents_hash: The contents hash of the pipeline
+            configuration at the time the worker was started.
+        """
+        self._contents_hash = contents_hash
+        self._lock = threading.Lock()
+        self._last_used = time.time()
+
+        # Guards the retirement of the worker against the end of a request.
+        self._state_lock = threading.Lock()
+        self._retired = False
+
+        # The worker writes its logs to the tk-shotgun log file, so we don't
+        # need to capture stderr. Not capturing it also guarantees that the
+        # worker can never block on a full pipe we're not reading from.
+        self._process = subprocess.Popen(
+            [python_exe, self.SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=command.Command.get_environment(),
+            close_fds=True,
+            universal_newlines=True,
+        )
+        self._send(init_data)
+        logger.debug("Started engine worker %s.", self._process.pid)
+
+    @property
+    def contents_hash(self):
+        """
+        The contents hash of the pipeline configuration the worker was
+        started for.
+        """
+        return self._contents_hash
+
+    @property
+    def last_used(self):
+        """
+        The time at which the worker last finished a request.
+        """
+        return self._last_used
+
+    def is_alive(self):
+        """
+        :returns: ``True`` if the worker process is still running.
+        """
+        return self._process.poll() is None
+
+    def is_busy(self):
+        """
+        :returns: ``True`` if the worker is processing a request.
+        """
+        return self._lock.locked()
+
+    def request(
+        self, request, on_output=None, blocking=True, timeout=None, cancellation=None
+    ):
+        """
+        Sends a request to the worker and waits for its result.
+
+        :param dict request: The request to send.
+        :param on_output: Optional callable invoked with each line of output
+            the worker sends back before the result.
+        :param bool blocking: If ``False``, the request is not sent if the
+            worker is already processing another one.
+        :param float timeout: Optional number of seconds after which the
+            worker is killed if it hasn't sent back its result. This includes
+            the time spent waiting for another request to complete.
+        :param cancellation: Optional :class:`concurrency.Cancellation`, the
+            worker is killed if it's cancelled during the request.
+
+        :returns: The result sent back by the worker.
+        :rtype: dict
+
+        :raises EngineWorkerBusyError: If ``blocking`` is ``False`` and the
+            worker is processing another request, or if it was still
+            processing it once the timeout expired.
+        :raises EngineWorkerInterruptedError: If the worker was killed because
+            the request timed out or was cancelled.
+        :raises EngineWorkerError: If the worker died or sent back something
+            that couldn't be understood.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        if blocking and deadline is not None:
+            acquired = self._lock.acquire(timeout=timeout)
+        else:
+            acquired = self._lock.acquire(blocking)
+
+        if not acquired:
+            raise EngineWorkerBusyError("Engine worker %s is busy." % self._process.pid)
+
+        # Why the request was interrupted, if it was. Once the request is
+        # done, the worker isn't ours to kill anymore.
+        interruption = dict(reason=None, done=False)
+
+        def interrupt(reason):
+            with self._state_lock:
+                if interruption["done"] or interruption["reason"] is not None:
+                    return
+                interruption["reason"] = reason
+
+            logger.debug(
+                "Engine worker %s request %s, killing it.", self._process.pid, reason
+            )
+            self._process.kill()
+
+        timer = None
+        if deadline is not None:
+            timer = threading.Timer(
+                max(0, deadline - time.time()), interrupt, ("timed out",)
+            )
+            timer.daemon = True
+            timer.start()
+
+        if cancellation is not None:
+            cancellation.on_cancel(lambda: interrupt("cancelled"))
+
+        try:
+            self._send(request)
+
+            while True:
+                line = self._process.stdout.readline()
+                if not line:
+                    break
+
+                message = json.loads(line)
+                if message.get("type") == "result":
+                    return message
+                elif message.get("type") == "output" and on_output is not None:
+                    on_output(message["line"])
+        except (IOError, ValueError) as e:
+            if interruption["reason"] is None:
+                raise EngineWorkerError(
+                    "Engine worker %s could not process the request: %s"
+                    % (self._process.pid, e)
+                )
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+            self._last_used = time.time()
+            with self._state_lock:
+                interruption["done"] = True
+                self._lock.release()
+                retired = self._retired
+
+            if retired:
+                # The worker was retired during the request. Its caller already
+                # has what it needs, so it doesn't wait for the worker to stop.
+                threading.Thread(
+                    target=self.terminate, name="EngineWorkerRetirement", daemon=True
+                ).start()
+
+        if interruption["reason"] is not None:
+            raise EngineWorkerInterruptedError(
+                "Engine worker %s request %s."
+                % (self._process.pid, interruption["reason"]),
+                interruption["reason"] == "cancelled",
+            )
+
+        raise EngineWorkerError(
+            "Engine worker %s exited unexpectedly." % self._process.pid
+        )
+
+    def retire(self):
+        """
+        Stops the worker once it's done with the request it is processing, or
+        right away if it is idle. The worker must not be handed out for new
+        requests anymore.
+        """
+        with self._state_lock:
+            self._retired = True
+            if self.is_busy():
+                logger.debug(
+                    "Engine worker %s is busy, stopping it after its request.",
+                    self._process.pid,
+                )
+                return
+
+        self.terminate()
+
+    def terminate(self):
+        """
+        Stops the worker process.
+        """
+        logger.debug("Stopping engine worker %s.", self._process.pid)
+
+        # Closing stdin lets the worker leave its request loop and exit
+        # cleanly. If it's stuck in the middle of a request, we kill it.
+        try:
+            self._process.stdin.close()
+        except IOError:
+            pass
+
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+    def _send(self, message):
+        """
+        Writes a message to the worker's stdin.
+
+        :param dict message: The message to send.
+        """
+        self._process.stdin.write(json.dumps(message, ensure_ascii=True) + "\n")
+        self._process.stdin.flush()
+
+
+class EngineWorkerPool(object):
+    """
+    Pool of engine workers, keyed by pipeline configuration and Python
+    interpreter. Workers that haven't been used for a while are stopped, and
+    workers started for an out of date contents hash are replaced.
+    """
+
+    def __init__(self, idle_timeout, reap_interval):
+        """
+        :param float idle_timeout: Number of seconds a worker can stay unused
+            before it is stopped.
+        :param float reap_interval: Number of seconds between checks for idle
+            workers.
+        """
+        self._idle_timeout = idle_timeout
+        self._reap_interval = reap_interval
+        self._workers = dict()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._reaper = None
+
+    def request(
+        self,
+        key,
+        python_exe,
+        contents_hash,
+        init_data,
+        request,
+        on_output=None,
+        blocking=True,
+        timeout=None,
+        cancellation=None,
+    ):
+        """
+        Sends a request to the worker associated with the given key, starting
+        one if needed. A worker whose request timed out or was cancelled is
+        discarded.
+
+        :param key: Hashable key identifying the pipeline configuration.
+        :param str python_exe: The Python interpreter to run the worker with.
+        :param str contents_hash: The current contents hash of the pipeline
+            configuration.
+        :param dict init_data: The initialization data for a new worker.
+        :param dict request: The request to send to the worker.
+        :param on_output: Optional callable invoked with each line of output
+            the worker sends back before the result.
+        :param bool blocking: If ``False``, the request is not sent if the
+            worker is already processing another one.
+        :param float timeout: Optional number of seconds after which the
+            request is abandoned.
+        :param cancellation: Optional :class:`concurrency.Cancellation` of the
+            request.
+
+        :returns: The result sent back by the worker.
+        :rtype: dict
+
+        :raises EngineWorkerBusyError: If the worker is processing another
+            request, and either ``blocking`` is ``False`` or it didn't
+            complete before the timeout.
+        :raises EngineWorkerInterruptedError: If the request timed out or was
+            cancelled.
+        :raises EngineWorkerError: If the worker couldn't process the request.
+        """
+        worker = self._get_worker(key, python_exe, contents_hash, init_data)
+
+        try:
+            return worker.request(
+                request,
+                on_output=on_output,
+                blocking=blocking,
+                timeout=timeout,
+                cancellation=cancellation,
+            )
+        except EngineWorkerBusyError:
+            raise
+        except EngineWorkerError:
+            self._discard(key, python_exe, worker)
+            raise
+
+    def discard(self, key, python_exe):
+        """
+        Stops the worker associated with the given key, if any, once it's done
+        with the request it is processing. This is used when a worker reported
+        a failure it might not recover from.
+
+        :param key: Hashable key identifying the pipeline configuration.
+        :param str python_exe: The Python interpreter the worker runs with.
+        """
+        with self._lock:
+            worker = self._workers.pop((key, python_exe), None)
+
+        if worker is not None:
+            worker.retire()
+
+    def shutdown(self):
+        """
+        Stops all workers.
+        """
+        self._stopped.set()
+
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+
+        for worker in workers:
+            worker.terminate()
+
+    def _get_worker(self, key, python_exe, contents_hash, init_data):
+        """
+        Gets a worker that is up to date with the given contents hash.
+
+        A worker started for an out of date contents hash might still be
+        processing another request, such as a user's command execution. It is
+        replaced right away, but only stopped once that request is done.
+
+        :returns: An :class:`EngineWorker` instance.
+        """
+        stale_worker = None
+
+        with self._lock:
+            worker = self._workers.get((key, python_exe))
+
+            if worker is not None and (
+                not worker.is_alive() or worker.contents_hash != contents_hash
+            ):
+                logger.debug("Engine worker for %s is out of date, recycling it.", key)
+                stale_worker = worker
+                worker = None
+
+            if worker is None:
+                worker = EngineWorker(python_exe, init_data, contents_hash)
+                self._workers[(key, python_exe)] = worker
+
+            self._start_reaper()
+
+        if stale_worker is not None:
+            stale_worker.retire()
+
+        return worker
+
+    def _discard(self, key, python_exe, worker):
+        """
+        Stops the given worker if it is still the one registered for the key.
+        """
+        with self._lock:
+            if self._workers.get((key, python_exe)) is worker:
+                del self._workers[(key, python_exe)]
+
+        worker.retire()
+
+    def _start_reaper(self):
+        """
+        Starts the thread that stops idle workers, if it isn't running yet.
+        Must be called with the pool's lock held.
+        """
+        if self._reaper is not None:
+            return
+
+        self._reaper = threading.Thread(
+            target=self._reap_idle_workers, name="EngineWorkerReaper", daemon=True
+        )
+        self._reaper.start()
+
+    def _reap_idle_workers(self):
+        """
+        Periodically stops the workers that have been idle for too long.
+        """
+        while not self._stopped.wait(self._reap_interval):
+            now = time.time()
+            idle_workers = []
+
+            with self._lock:
+                for worker_key, worker in list(self._workers.items()):
+                    if worker.is_busy():
+                        continue
+                    if now - worker.last_used > self._idle_timeout:
+                        idle_workers.append(worker)
+                        del self._workers[worker_key]
+
+            for worker in idle_workers:
+                logger.debug("Engine worker has been idle for too long.")
+                worker.terminate()
+
+
+class EngineWorkerError(sgtk.TankError):
+    """
+    Raised when an engine worker can't process a request.
+    """
+
+    pass
+
+
+class EngineWorkerBusyError(EngineWorkerError):
+    """
+    Raised when a non-blocking request is sent to a busy engine worker.
+    """
+
+    pass
+
+
+class EngineWorkerInterruptedError(EngineWorkerError):
+    """
+    Raised when an engine worker was killed because its request timed out or
+    was cancelled.
+    """
+
+    def __init__(self, message, cancelled):
+        """
+        :param str message: The error message.
+        :param bool cancelled: Whether the request was cancelled, rather than
+            timed out.
+        """
+        super(EngineWorkerInterruptedError, self).__init__(message)
+        self.cancelled = cancelled
@@ -0,0 +1,168 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import inspect
+import os
+import threading
+
+import sgtk
+
+from . import caches
+
+logger = sgtk.platform.get_logger(__name__)
+
+
+class HookCache(object):
+    """
+    Keeps an instance of one of a bundle's hooks, so that its methods can be
+    called without going through the hook loader every time.
+
+    The instance is created again when one of the files its classes were
+    loaded from changes. The results of hook methods that only depend on
+    their arguments can be memoized, and are dropped along with the instance.
+    """
+
+    def __init__(self, bundle, setting, memo_size):
+        """
+        :param bundle: The bundle the hook is configured for.
+        :param str setting: The name of the hook's setting.
+        :param int memo_size: Maximum number of memoized results.
+        """
+        self._bundle = bundle
+        self._setting = setting
+        self._memo_size = memo_size
+        self._instance = None
+        self._mtimes = None
+        self._memo = None
+        self._lock = threading.Lock()
+
+    def execute(self, method_name, **kwargs):
+        """
+        Calls a hook method.
+
+        :param str method_name: The name of the method.
+        :param kwargs: The arguments of the method.
+
+        :returns: The value returned by the method.
+        """
+        instance, memo = self._get()
+
+        if instance is None:
+            return self._bundle.execute_hook_method(
+                self._setting, method_name, **kwargs
+            )
+
+        return getattr(instance, method_name)(**kwargs)
+
+    def execute_memoized(self, key, method_name, **kwargs):
+        """
+        Calls a hook method, unless it was already called for the same key
+        since the hook files last changed.
+
+        :param key: Hashable key identifying the arguments.
+        :param str method_name: The name of the method.
+        :param kwargs: The arguments of the method.
+
+        :returns: The value returned by the method.
+        """
+        instance, memo = self._get()
+
+        if instance is None:
+            return self._bundle.execute_hook_method(
+                self._setting, method_name, **kwargs
+            )
+
+        key = (method_name, key)
+        value = memo.get(key)
+
+        if value is None:
+            value = getattr(instance, method_name)(**kwargs)
+            memo.set(key, value)
+
+        return value
+
+    def _get(self):
+        """
+        Gets the hook instance and its memoized results, creating them if the
+        hook files changed.
+
+        :returns: A tuple of the hook instance, or None if the hook couldn't
+            be instantiated from its setting, and the memoized results.
+        :rtype: tuple
+        """
+        with self._lock:
+            if self._mtimes is not None and _get_mtimes(self._mtimes) == self._mtimes:
+                return (self._instance, self._memo)
+
+            if self._mtimes is not None:
+                logger.debug("Hook %s changed, loading it again.", self._setting)
+
+            try:
+                self._instance = self._bundle.create_hook_instance(
+                    self._bundle.get_setting(self._setting)
+                )
+            except Exception:
+                # Hook expressions that need the hook's setting to be resolved
+                # are only supported by execute_hook_method.
+                logger.debug(
+                    "Unable to keep an instance of hook %s.",
+                    self._setting,
+                    exc_info=True,
+                )
+                self._instance = None
+                self._mtimes = None
+                self._memo = None
+                return (None, None)
+
+            self._mtimes = _get_mtimes(_get_hook_files(self._instance))
+            self._memo = caches.LRUCache(self._memo_size)
+            return (self._instance, self._memo)
+
+
+def _get_hook_files(instance):
+    """
+    Gets the files the classes of a hook instance were loaded from. A hook can
+    be made of several files that inherit from each other.
+
+    :param instance: The hook instance.
+
+    :returns: A list of file paths.
+    :rtype: list
+    """
+    files = []
+    for cls in type(instance).__mro__:
+        try:
+            path = inspect.getfile(cls)
+        except TypeError:
+            # Builtin classes, such as object.
+            continue
+
+        if path not in files:
+            files.append(path)
+    return files
+
+
+def _get_mtimes(paths):
+    """
+    Gets the mtimes of the given files.
+
+    :param paths: The file paths.
+
+    :returns: A dictionary of mtimes keyed by path, None for the files that
+        don't exist.
+    :rtype: dict
+    """
+    mtimes = dict()
+    for path in paths:
+        try:
+            mtimes[path] = os.path.getmtime(path)
+        except OSError:
+            mtimes[path] = None
+    return mtimes
@@ -0,0 +1,161 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import threading
+import time
+
+import sgtk
+from twisted.internet import defer, reactor, threads
+
+logger = sgtk.platform.get_logger(__name__)
+
+# The key the prewarming requests are cached under, in place of a WSS
+# connection's key.
+WSS_KEY = "__prewarm__"
+
+
+class NullHost(object):
+    """
+    Message host for the requests made by the prewarmer, which nobody is
+    waiting on. Replies are only logged.
+    """
+
+    def reply(self, data):
+        """
+        Logs the reply to the request.
+
+        :param data: The reply.
+        """
+        logger.debug("Prewarming reply: %s", data)
+
+    def report_error(self, error_message, error_data=None):
+        """
+        Logs an error raised by the request.
+
+        :param str error_message: The error message.
+        :param error_data: Optional data associated with the error.
+        """
+        logger.debug("Prewarming error: %s", error_message)
+
+
+class Prewarmer(object):
+    """
+    Populates the engine commands cache in the background for the projects
+    the current user accessed most recently, so that the first actions
+    requested for them don't wait for a bootstrap.
+
+    Each project's actions are requested the way the browser requests them
+    when a project page is loaded. Caching a pipeline configuration caches
+    the commands for all the entity types its shotgun_*.yml files support,
+    so a single request per project is enough.
+
+    Projects are prewarmed one at a time, only once no interactive request
+    has been in progress for a while. Prewarming stops once the time budget
+    is spent.
+    """
+
+    def __init__(self, api_factory, activity, max_projects, time_budget, idle_time):
+        """
+        :param api_factory: Callable that takes a message host and returns an
+            API instance to make the requests with.
+        :param activity: The :class:`concurrency.ActivityTracker` of the
+            interactive requests.
+        :param int max_projects: Maximum number of projects to prewarm.
+        :param float time_budget: Number of seconds after which prewarming
+            stops.
+        :param float idle_time: Number of seconds without any interactive
+            request before a project is prewarmed.
+        """
+        self._api_factory = api_factory
+        self._activity = activity
+        self._max_projects = max_projects
+        self._time_budget = time_budget
+        self._idle_time = idle_time
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts prewarming in a background thread.
+        """
+        self._thread = threading.Thread(
+            target=self._run, name="ActionsPrewarmer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops prewarming. A request already in progress isn't interrupted, so
+        we don't wait for the thread to finish.
+        """
+        self._stop_event.set()
+
+    def _run(self):
+        """
+        Prewarms the most recently accessed projects.
+        """
+        deadline = time.time() + self._time_budget
+
+        try:
+            projects = self._get_recent_projects()
+        except Exception:
+            logger.exception("Unable to list the projects to prewarm.")
+            return
+
+        logger.debug("Prewarming actions for projects: %s", projects)
+
+        for project in projects:
+            if not self._activity.wait_until_idle(self._idle_time, self._stop_event):
+                return
+
+            if time.time() >= deadline:
+                logger.debug("Prewarming time budget spent, stopping.")
+                return
+
+            logger.debug("Prewarming actions for %s", project)
+            api = self._api_factory(NullHost())
+
+            try:
+                result = api.get_actions(
+                    dict(
+                        project_id=project["id"],
+                        entity_id=project["id"],
+                        entity_type="Project",
+                    )
+                )
+
+                # The caching might still be running, one project at a time is
+                # enough.
+                if isinstance(result, defer.Deferred):
+                    threads.blockingCallFromThread(reactor, lambda: result)
+            finally:
+                # The data cached for our requests isn't needed anymore.
+                api.release_connection(WSS_KEY)
+
+        logger.debug("Prewarming complete.")
+
+    def _get_recent_projects(self):
+        """
+        Gets the projects the current user accessed most recently.
+
+        :returns: A list of Project entity dictionaries.
+        :rtype: list
+        """
+        return sgtk.platform.current_engine().shotgun.find(
+            "Project",
+            [
+                ["archived", "is_not", True],
+                ["is_template", "is_not", True],
+                ["last_accessed_by_current_user", "is_not", None],
+            ],
+            ["name"],
+            order=[dict(field_name="last_accessed_by_current_user", direction="desc")],
+            limit=self._max_projects,
+        )
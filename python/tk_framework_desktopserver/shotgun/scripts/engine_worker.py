@@ -0,0 +1,310 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Long-lived worker process used by the RPC API to answer engine command
+requests without paying for a full bootstrap every time.
+
+The worker is started with no arguments. It reads newline-delimited json
+messages from stdin and answers each of them with newline-delimited json
+messages on stdout. The first message received is the initialization data,
+which has the same layout as the arguments given to get_commands.py,
+plus the "logging_prefix" given to execute_command.py.
+Every following message is a request, which is answered by a single message
+whose "type" is "result". While an engine command is being executed, its log
+messages are sent back ahead of the result as messages whose "type" is
+"output", formatted the same way execute_command.py writes them to stdout.
+"""
+
+import os
+import sys
+import json
+import copy
+import logging
+import threading
+import traceback
+
+# get_commands.py and execute_command.py live next to this script, which
+# means they are importable since the script's folder is at the front of
+# sys.path.
+import get_commands
+import execute_command
+
+
+class _OutputHandler(logging.Handler):
+    """
+    Logging handler that sends log messages back to the RPC API while an
+    engine command is being executed, and drops them the rest of the time.
+    """
+
+    def __init__(self, worker):
+        """
+        :param worker: The :class:`EngineWorker` to send messages through.
+        """
+        super().__init__()
+        self._worker = worker
+        self.capturing = False
+
+    def emit(self, record):
+        """
+        Sends the formatted record as an "output" message.
+
+        :param record: The log record to emit.
+        """
+        if not self.capturing:
+            return
+
+        try:
+            self._worker.send(dict(type="output", line=self.format(record)))
+        except Exception:
+            self.handleError(record)
+
+
+class EngineWorker(object):
+    """
+    Keeps an sgtk instance bootstrapped for a single pipeline configuration
+    and starts the engine on demand for each request it receives.
+    """
+
+    def __init__(self, init_data, output):
+        """
+        :param dict init_data: The initialization data sent by the RPC API.
+        :param output: File object the replies are written to.
+        """
+        self._init_data = init_data
+        self._output = output
+        self._output_lock = threading.Lock()
+        self._tk = None
+
+        # Same setup as execute_command.py, except that the log messages are
+        # sent back as messages rather than printed to stdout.
+        import sgtk
+
+        self._log_handler = _OutputHandler(self)
+        self._log_handler.setFormatter(execute_command._Formatter())
+        sgtk.LogManager().initialize_custom_handler(self._log_handler)
+
+    def run(self):
+        """
+        Processes requests until stdin is closed.
+        """
+        while True:
+            line = sys.stdin.readline()
+            if not line:
+                break
+
+            request = json.loads(line)
+
+            try:
+                reply = self._process_request(request)
+            except Exception:
+                reply = dict(
+                    retcode=get_commands.ENGINE_INIT_ERROR_EXIT_CODE,
+                    output=traceback.format_exc(),
+                )
+
+            reply["type"] = "result"
+            self.send(reply)
+
+    def send(self, message):
+        """
+        Sends a message back to the RPC API. Log messages can be emitted from
+        any thread, so writes are serialized.
+
+        :param dict message: The message to send.
+        """
+        with self._output_lock:
+            self._output.write(json.dumps(message) + "\n")
+            self._output.flush()
+
+    def _process_request(self, request):
+        """
+        Dispatches a request to the method that can handle it.
+
+        :param dict request: The request sent by the RPC API.
+
+        :returns: The reply to send back.
+        :rtype: dict
+        """
+        if request["command"] == "get_commands":
+            return self._get_commands(
+                request["data"],
+                request["lookup_hash"],
+                request.get("batch"),
+                request["config_is_mutable"],
+            )
+        elif request["command"] == "execute":
+            return self._execute(
+                request["project"], request["name"], request["entities"]
+            )
+
+        raise ValueError("Unknown worker command: %s" % request["command"])
+
+    def _start_engine(self, data):
+        """
+        Starts the engine for the entity described by the given payload. The
+        first call bootstraps the pipeline configuration. Later calls reuse
+        the bootstrapped sgtk instance and only start a new engine.
+
+        :param dict data: Payload containing entity_type, entity_id and
+            project_id keys.
+
+        :returns: The started engine.
+        """
+        if self._tk is None:
+            engine = get_commands.bootstrap(
+                data,
+                self._init_data["base_configuration"],
+                self._init_data["engine_name"],
+                self._init_data["config_data"],
+                self._init_data["bundle_cache_fallback_paths"],
+                self._user,
+            )
+            self._tk = engine.sgtk
+            return engine
+
+        return get_commands.start_engine(self._tk, self._init_data["engine_name"], data)
+
+    def _get_commands(self, data, lookup_hash, batch, config_is_mutable):
+        """
+        Lists the engine commands available for the given entity, as well as
+        for any additional entities in the batch.
+
+        :param dict data: Payload containing entity_type, entity_id and
+            project_id keys.
+        :param str lookup_hash: The lookup hash for the given entity.
+        :param list batch: List of dictionaries containing "data" and
+            "lookup_hash" keys for the additional entities.
+        :param bool config_is_mutable: Whether the pipeline config is mutable.
+
+        :returns: A reply containing "retcode", "output" and "results" keys,
+            where "results" has the same layout as the output of
+            get_commands.py.
+        :rtype: dict
+        """
+        try:
+            engine = self._start_engine(data)
+        except Exception as e:
+            return dict(
+                retcode=get_commands.get_engine_error_code(e),
+                output=traceback.format_exc(),
+            )
+
+        try:
+            commands = get_commands.get_engine_commands(
+                engine, data["entity_type"], config_is_mutable
+            )
+        finally:
+            engine.destroy()
+
+        results = [
+            dict(lookup_hash=lookup_hash, retcode=0, output="", commands=commands)
+        ]
+
+        if batch:
+            results.extend(
+                get_commands.get_batch_commands(
+                    self._tk, self._init_data["engine_name"], batch, config_is_mutable
+                )
+            )
+
+        return dict(retcode=0, output="", results=results)
+
+    def _execute(self, project, name, entities):
+        """
+        Executes an engine command, sending its log messages back as they
+        are emitted.
+
+        :param dict project: The project entity.
+        :param str name: The name of the engine command to execute.
+        :param list entities: The list of entities selected in the web UI when
+            the command action was triggered.
+
+        :returns: A reply containing "retcode" and "output" keys.
+        :rtype: dict
+        """
+        # Same as execute_command.py, we start the engine for the first
+        # selected entity.
+        if entities:
+            entity = entities[0]
+        else:
+            entity = project
+
+        data = dict(
+            entity_type=entity["type"],
+            entity_id=entity["id"],
+            project_id=project["id"],
+        )
+
+        self._log_handler.capturing = True
+        try:
+            try:
+                engine = self._start_engine(data)
+            except Exception:
+                return dict(retcode=1, output=traceback.format_exc())
+
+            # The special commands log through engine.sgtk.log, which
+            # execute_command.py sets up from its pre-engine-start callback.
+            import sgtk
+
+            engine.sgtk.log = sgtk.LogManager.get_logger(
+                "env.project.%s" % self._init_data["engine_name"]
+            )
+
+            try:
+                execute_command.execute_engine_command(engine, name, entities, entity)
+            except Exception:
+                return dict(retcode=1, output=traceback.format_exc())
+            finally:
+                engine.destroy()
+        finally:
+            self._log_handler.capturing = False
+
+        return dict(retcode=0, output="")
+
+    @property
+    def _user(self):
+        """
+        The user the worker was asked to bootstrap with.
+        """
+        import sgtk
+
+        return sgtk.authentication.deserialize_user(self._init_data["user"])
+
+
+if __name__ == "__main__":
+    # Anything printed by the engine or its apps would corrupt the replies,
+    # so we keep a private handle on stdout for the replies and route
+    # everything else to stderr.
+    output = os.fdopen(os.dup(sys.stdout.fileno()), "wt")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    init_data = json.loads(sys.stdin.readline())
+
+    # The RPC api has given us the path to its tk-core to prepend
+    # to our sys.path prior to importing sgtk. We'll prepend the
+    # the path, import sgtk, and then clean up after ourselves.
+    original_sys_path = copy.copy(sys.path)
+    try:
+        sys.path = [init_data["sys_path"]] + sys.path
+        import sgtk
+    finally:
+        sys.path = original_sys_path
+
+    # Now that we have sgtk.util loaded, use it to make sure we have only utf-8 data in the args
+    init_data = sgtk.util.unicode.ensure_contains_str(init_data)
+
+    # execute_command.py expects these to be set up by its __main__ block.
+    execute_command.sgtk = sgtk
+    execute_command.LOGGING_PREFIX = init_data["logging_prefix"]
+
+    EngineWorker(init_data, output).run()
+
+    sys.exit(0)
@@ -300,14 +300,27 @@ def execute(
         user,
     )
 
+    execute_engine_command(engine, name, entities, entity)
+
+
+def execute_engine_command(engine, name, entities, entity):
+    """
+    Executes an engine command with an engine that has already been started.
+
+    :param engine: The engine instance to execute the command with.
+    :param str name: The name of the engine command to execute.
+    :param list entities: The list of entities selected in the web UI when the
+        command action was triggered.
+    :param dict entity: The entity the engine was started for.
+    """
     # Handle the "special" commands that aren't tied to any registered engine
     # commands.
     if name == CORE_INFO_COMMAND:
         core_info(engine)
-        sys.exit(0)
+        return
     elif name == UPGRADE_CHECK_COMMAND:
         app_upgrade_info(engine)
-        sys.exit(0)
+        return
 
     # Import sgtk here after the bootstrap. That will ensure that we get the
     # core that was swapped in during the bootstrap.
@@ -375,10 +388,18 @@ def execute(
 
 
 if __name__ == "__main__":
-    arg_data_file = sys.argv[1]
+    # The server sends our arguments over stdin.
+    arg_data = json.load(sys.stdin)
 
-    with open(arg_data_file, "rt") as fh:
-        arg_data = json.load(fh)
+    # When we can time out, we lead our own process group, so that the
+    # processes the bootstrap and the command start, such as git for a
+    # descriptor download, are terminated along with us.
+    if arg_data.get("new_session") and hasattr(os, "setsid"):
+        try:
+            os.setsid()
+        except OSError:
+            # We already lead our own session.
+            pass
 
     # The RPC api has given us the path to its tk-core to prepend
     # to our sys.path prior to importing sgtk. We'll prepend the
@@ -8,6 +8,7 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import os
 import sys
 import json
 import traceback
@@ -19,6 +20,10 @@ LOGGER_NAME = "wss2.cache_commands"
 ENGINE_INIT_ERROR_EXIT_CODE = 77
 UNRESOLVED_ENV_ERROR_EXIT_CORE = 78
 
+# Tells us where to write our results: the file descriptor of a pipe, or the
+# path of a file on Windows.
+RESULTS_ENV_VAR = "TK_DESKTOP_SERVER_RESULTS"
+
 
 def bootstrap(
     data,
@@ -44,6 +49,11 @@ def bootstrap(
 
     :returns: Bootstrapped engine instance.
     """
+    # The sgtk module is imported by whoever drives this module, either the
+    # __main__ block below or the engine_worker script, so we pick it up from
+    # sys.modules rather than relying on a module global.
+    import sgtk
+
     sgtk.LogManager().initialize_base_file_handler("tk-shotgun")
 
     logger = sgtk.LogManager.get_logger(LOGGER_NAME)
@@ -74,75 +84,124 @@ def bootstrap(
     return engine
 
 
-def cache(
-    cache_file,
-    output_file,
-    data,
-    base_configuration,
-    engine_name,
-    config_data,
-    config_is_mutable,
-    bundle_cache_fallback_paths,
-    user,
-):
+def start_engine(tk, engine_name, data):
     """
-    Populates the sqlite cache with a row representing the desired pipeline
-    configuration and entity type. If an entry already exists, it is updated.
+    Starts an engine for the entity described by the given payload, reusing
+    an already bootstrapped sgtk instance. This is a lot cheaper than going
+    through a new bootstrap, since the config, its core and its bundles are
+    already loaded.
 
-    :param str cache_file: The path to the sqlite cache file on disk.
-    :param str output_file: The path to the file where the results should be stored
-    :param dict data: The raw payload send down by the client.
-    :param str base_configuration: The desired base pipeline configuration's
-        uri.
-    :param str engine_name: The name of the engine to bootstrap into. This
-        is most likely going to be "tk-shotgun"
-    :param dict config_data: All relevant pipeline configuration data. This
-        dict is keyed by pipeline config entity id, each containing a dict
-        that contains, at a minimum, "entity", "lookup_hash", and
-        "contents_hash" keys.
-    :param bool config_is_mutable: Whether the pipeline config is mutable. If
-        it is, then we include the __core_info and __upgrade_check commands.
-    :param ShotgunUser user: The user that should be used in the bootstrap process
+    :param tk: The sgtk instance of a previously bootstrapped engine.
+    :param str engine_name: The name of the engine to start.
+    :param dict data: Payload containing entity_type and entity_id keys.
+
+    :returns: The started engine.
+    """
+    # The bootstrap swapped in the config's core, so we need to import
+    # sgtk again to get at that version of the API.
+    import sgtk
+
+    context = tk.context_from_entity(data["entity_type"], data["entity_id"])
+    return sgtk.platform.start_engine(engine_name, tk, context)
+
+
+def get_engine_error_code(exception):
+    """
+    Maps an exception raised while starting an engine to the exit code that
+    reports it to the RPC API.
+
+    :param exception: The exception that was raised.
+
+    :returns: The matching exit code.
+    :rtype: int
     """
     try:
-        engine = bootstrap(
-            data,
-            base_configuration,
-            engine_name,
-            config_data,
-            bundle_cache_fallback_paths,
-            user,
-        )
-    except Exception as e:
-        exit_code = ENGINE_INIT_ERROR_EXIT_CODE
+        import sgtk
 
-        # Store the original exception information so we don't report any possible exceptions from below
-        exc_info = sys.exc_info()
+        if isinstance(exception, sgtk.platform.TankUnresolvedEnvironmentError):
+            return UNRESOLVED_ENV_ERROR_EXIT_CORE
+    except Exception:
+        pass
+
+    return ENGINE_INIT_ERROR_EXIT_CODE
+
+
+def get_batch_commands(tk, engine_name, batch, config_is_mutable):
+    """
+    Lists the engine commands for each entity in the batch, starting a new
+    engine for each of them from an already bootstrapped sgtk instance.
+    Failures are reported per entity rather than interrupting the batch.
+
+    :param tk: The sgtk instance of a previously bootstrapped engine.
+    :param str engine_name: The name of the engine to start.
+    :param list batch: List of dictionaries containing "data" and
+        "lookup_hash" keys, where "data" is a payload like the one sent down
+        by the client.
+    :param bool config_is_mutable: Whether the pipeline config is mutable.
+
+    :returns: A list of dictionaries containing "lookup_hash", "retcode",
+        "output" and "commands" keys.
+    :rtype: list
+    """
+    results = []
+
+    for item in batch:
+        data = item["data"]
 
-        # Try to use a more specific exit code if possible
         try:
-            import sgtk
+            engine = start_engine(tk, engine_name, data)
+        except Exception as e:
+            results.append(
+                dict(
+                    lookup_hash=item["lookup_hash"],
+                    retcode=get_engine_error_code(e),
+                    output=traceback.format_exc(),
+                    commands=None,
+                )
+            )
+            continue
 
-            if isinstance(e, sgtk.platform.TankUnresolvedEnvironmentError):
-                exit_code = UNRESOLVED_ENV_ERROR_EXIT_CORE
-        except Exception:
-            pass
+        try:
+            commands = get_engine_commands(
+                engine, data["entity_type"], config_is_mutable
+            )
+        except Exception as e:
+            results.append(
+                dict(
+                    lookup_hash=item["lookup_hash"],
+                    retcode=get_engine_error_code(e),
+                    output=traceback.format_exc(),
+                    commands=None,
+                )
+            )
+            continue
+        finally:
+            engine.destroy()
+
+        results.append(
+            dict(
+                lookup_hash=item["lookup_hash"],
+                retcode=0,
+                output="",
+                commands=commands,
+            )
+        )
 
-        # We need to give the server a way to know that this failed due
-        # to an engine initialization issue. That will allow it to skip
-        # this config gracefully and log appropriately.
-        print("".join(traceback.format_exception(*exc_info)))
-        sys.exit(exit_code)
+    return results
 
-    # Note that from here on out, we have to use the legacy log_* methods
-    # that the engine provides. This is because we're now operating in the
-    # tk-core that is configured for the project, which means we can't
-    # guarantee that it is v0.18+.
-    engine.log_debug("Raw payload from client: %s" % data)
 
-    lookup_hash = config_data["lookup_hash"]
-    contents_hash = config_data["contents_hash"]
+def get_engine_commands(engine, entity_type, config_is_mutable):
+    """
+    Builds the list of command dictionaries registered by the given engine.
 
+    :param engine: The bootstrapped engine instance.
+    :param str entity_type: The entity type the engine was started for.
+    :param bool config_is_mutable: Whether the pipeline config is mutable. If
+        it is, then we include the __core_info and __upgrade_check commands.
+
+    :returns: A list of command dictionaries.
+    :rtype: list
+    """
     engine.log_debug("Processing engine commands...")
     commands = []
 
@@ -150,9 +209,7 @@ def cache(
     # engine commands. We only do this for mutable configs, as it doesn't
     # make sense to ask for upgrade information for a config that can't be
     # upgraded.
-    engine.log_debug("Configuration data: %s" % config_data)
-
-    if data["entity_type"].lower() == "project" and config_is_mutable:
+    if entity_type.lower() == "project" and config_is_mutable:
         engine.log_debug("Registering core and app upgrade commands...")
         commands.extend(
             [
@@ -219,22 +276,115 @@ def cache(
         commands.append(command_data)
 
     engine.log_debug("Engine commands processed.")
+    return commands
 
-    with open(output_file, "wt") as f:
-        json.dump(commands, f)
+
+def cache(
+    cache_file,
+    output_file,
+    data,
+    base_configuration,
+    engine_name,
+    config_data,
+    config_is_mutable,
+    bundle_cache_fallback_paths,
+    user,
+    batch=None,
+):
+    """
+    Lists the engine commands for the desired pipeline configuration and
+    entity type, as well as for any additional entities in the batch, and
+    writes them to the output file.
+
+    The output is a list of dictionaries with "lookup_hash",
+    "retcode", "output" and "commands" keys. The first entry is always the
+    one for the payload sent down by the client.
+
+    :param str cache_file: The path to the sqlite cache file on disk.
+    :param output_file: The path to the file, or the file descriptor of the
+        pipe, where the results should be written.
+    :param dict data: The raw payload send down by the client.
+    :param str base_configuration: The desired base pipeline configuration's
+        uri.
+    :param str engine_name: The name of the engine to bootstrap into. This
+        is most likely going to be "tk-shotgun"
+    :param dict config_data: All relevant pipeline configuration data. This
+        dict is keyed by pipeline config entity id, each containing a dict
+        that contains, at a minimum, "entity", "lookup_hash", and
+        "contents_hash" keys.
+    :param bool config_is_mutable: Whether the pipeline config is mutable. If
+        it is, then we include the __core_info and __upgrade_check commands.
+    :param ShotgunUser user: The user that should be used in the bootstrap process
+    :param list batch: List of dictionaries containing "data" and "lookup_hash"
+        keys for other entities whose commands should be listed from the same
+        bootstrap.
+    """
+    try:
+        engine = bootstrap(
+            data,
+            base_configuration,
+            engine_name,
+            config_data,
+            bundle_cache_fallback_paths,
+            user,
+        )
+    except Exception as e:
+        # Store the original exception information so we don't report any possible exceptions from below
+        exc_info = sys.exc_info()
+
+        # Try to use a more specific exit code if possible
+        exit_code = get_engine_error_code(e)
+
+        # We need to give the server a way to know that this failed due
+        # to an engine initialization issue. That will allow it to skip
+        # this config gracefully and log appropriately.
+        print("".join(traceback.format_exception(*exc_info)))
+        sys.exit(exit_code)
+
+    # Note that from here on out, we have to use the legacy log_* methods
+    # that the engine provides. This is because we're now operating in the
+    # tk-core that is configured for the project, which means we can't
+    # guarantee that it is v0.18+.
+    engine.log_debug("Raw payload from client: %s" % data)
+
+    lookup_hash = config_data["lookup_hash"]
+    contents_hash = config_data["contents_hash"]
+
+    engine.log_debug("Configuration data: %s" % config_data)
+    commands = get_engine_commands(engine, data["entity_type"], config_is_mutable)
+    results = [dict(lookup_hash=lookup_hash, retcode=0, output="", commands=commands)]
 
     # Tear down the engine. This is both good practice before we exit
-    # this process, but also necessary if there are multiple pipeline
-    # configs that we're iterating over.
+    # this process, but also necessary before we start the engine again
+    # for the rest of the batch.
     engine.log_debug("Shutting down engine...")
+    tk = engine.sgtk
     engine.destroy()
 
+    if batch:
+        results.extend(get_batch_commands(tk, engine_name, batch, config_is_mutable))
+
+    with open(output_file, "wt") as f:
+        json.dump(results, f)
+
 
 if __name__ == "__main__":
-    arg_data_file = sys.argv[1]
+    # We lead our own process group, so that the processes the bootstrap
+    # starts, such as git for a descriptor download, are terminated along
+    # with us when we time out.
+    if hasattr(os, "setsid"):
+        try:
+            os.setsid()
+        except OSError:
+            # We already lead our own session.
+            pass
 
-    with open(arg_data_file, "rt") as fh:
-        arg_data = json.load(fh)
+    # The server sends our arguments over stdin, and tells us where to write
+    # our results. The processes we start don't need to know about it.
+    arg_data = json.load(sys.stdin)
+    output_file = os.environ.pop(RESULTS_ENV_VAR)
+    if output_file.isdigit():
+        output_file = int(output_file)
 
     # The RPC api has given us the path to its tk-core to prepend
     # to our sys.path prior to importing sgtk. We'll prepend the
@@ -251,7 +401,7 @@ if __name__ == "__main__":
 
     cache(
         arg_data["cache_file"],
-        arg_data["output_file"],
+        output_file,
         arg_data["data"],
         arg_data["base_configuration"],
         arg_data["engine_name"],
@@ -259,6 +409,7 @@ if __name__ == "__main__":
         arg_data["config_is_mutable"],
         arg_data["bundle_cache_fallback_paths"],
         sgtk.authentication.deserialize_user(arg_data["user"]),
+        arg_data.get("batch"),
     )
 
     sys.exit(0)
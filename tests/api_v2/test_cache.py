@@ -10,6 +10,11 @@
 
 import os
 import sys
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import patch
 
 from tank_test.tank_test_base import setUpModule
 from base_test import TestDesktopServerFramework, MockConfigDescriptor
@@ -141,15 +146,22 @@ class TestCacheMethods(TestDesktopServerFramework):
             ]
         )
 
-        # We have to clear the entity cache, though, because the wss_key isn't
-        # changing the way it would on a page refresh or navigation.
+        # We have to clear the entity caches, though, because the wss_key isn't
+        # changing the way it would on a page refresh or navigation, and no
+        # event is logged by the mocked site.
         self.api._cache = dict()
+        self.api.SHARED_CACHE.clear()
         hash_3 = self.api._get_contents_hash(
             config_descriptor,
             self.api._get_software_entities(),
         )
         self.assertNotEqual(hash_1, hash_3)
 
+        # The hasher can tell which input changed.
+        self.assertEqual(
+            self.api.CONTENTS_HASHER.diff(hash_1, hash_3), ["added Software 8"]
+        )
+
         # Setting the descriptor to imply that the config is mutable should
         # also change the hash, as the mtimes of environment yml files will
         # be included in the hash.
@@ -168,8 +180,11 @@ class TestCacheMethods(TestDesktopServerFramework):
         )
         self.assertEqual(hash_4, hash_5)
 
-        # Updating mtimes should cause the hash to change again.
+        # Updating mtimes should cause the hash to change again. Where the
+        # config is polled rather than watched with inotify, the change is
+        # only noticed on the next poll, so we ask for it right away.
         os.utime(os.path.join(self.config_root, "env", "test.yml"), None)
+        self.api._get_config_watcher().refresh()
 
         # We have to clear the entity cache, though, because the wss_key isn't
         # changing the way it would on a page refresh or navigation.
@@ -179,3 +194,392 @@ class TestCacheMethods(TestDesktopServerFramework):
             self.api._get_software_entities(),
         )
         self.assertNotEqual(hash_5, hash_6)
+
+    def test_database_migration(self):
+        """
+        Tests that a cache database using the original schema, which had no
+        primary key, is migrated in place and that duplicate rows are dropped.
+        """
+        cache_dir = os.path.dirname(self.api._cache_path)
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        elif os.path.exists(self.api._cache_path):
+            os.remove(self.api._cache_path)
+
+        connection = sqlite3.connect(self.api._cache_path)
+        connection.execute(
+            "CREATE TABLE engine_commands (lookup_hash text, contents_hash text, commands blob)"
+        )
+        connection.executemany(
+            "INSERT INTO engine_commands VALUES (?, ?, ?)",
+            [
+                ("lookup_1", "contents_1", b"[]"),
+                ("lookup_1", "contents_2", b"[]"),
+                ("lookup_2", "contents_1", b"[]"),
+            ],
+        )
+        connection.commit()
+        connection.close()
+
+        with self.api._db_connect() as (connection, cursor):
+            cursor.execute("PRAGMA user_version")
+            self.assertEqual(cursor.fetchone()[0], self.api.DATABASE_FORMAT_VERSION)
+
+            cursor.execute(
+                "SELECT lookup_hash, contents_hash FROM engine_commands ORDER BY lookup_hash"
+            )
+            self.assertEqual(
+                cursor.fetchall(),
+                [("lookup_1", "contents_2"), ("lookup_2", "contents_1")],
+            )
+
+        # Writing to an existing lookup hash should replace the row.
+        self.api._write_commands_to_db([("lookup_1", [])], "contents_3")
+
+        with self.api._db_connect() as (connection, cursor):
+            cursor.execute(
+                "SELECT contents_hash FROM engine_commands WHERE lookup_hash=?",
+                ("lookup_1",),
+            )
+            self.assertEqual(cursor.fetchall(), [("contents_3",)])
+
+    def test_actions_cache(self):
+        """
+        Tests that the in-memory actions cache only answers for the contents
+        hash most recently written for a lookup hash.
+        """
+        caches = self.framework_module.shotgun.caches
+        actions_cache = caches.ActionsCache(max_size=2)
+
+        self.assertIsNone(actions_cache.get("lookup_1"))
+
+        actions_cache.set("lookup_1", "contents_1", ["command_1"])
+        self.assertEqual(actions_cache.get("lookup_1"), ("contents_1", ["command_1"]))
+
+        # Writing a new contents hash invalidates the cached commands, and
+        # commands read for an older contents hash aren't cached anymore.
+        actions_cache.invalidate("lookup_1", "contents_2")
+        self.assertIsNone(actions_cache.get("lookup_1"))
+        actions_cache.set("lookup_1", "contents_1", ["command_1"])
+        self.assertIsNone(actions_cache.get("lookup_1"))
+
+        actions_cache.set("lookup_1", "contents_2", ["command_2"])
+        self.assertEqual(actions_cache.get("lookup_1"), ("contents_2", ["command_2"]))
+
+        # The least recently used entries are evicted when the cache is full.
+        actions_cache.set("lookup_2", "contents_1", ["command_3"])
+        actions_cache.set("lookup_3", "contents_1", ["command_4"])
+        self.assertIsNone(actions_cache.get("lookup_1"))
+        self.assertIsNotNone(actions_cache.get("lookup_3"))
+        self.assertEqual(len(actions_cache._contents_hashes), 2)
+
+    def test_cached_data_is_frozen(self):
+        """
+        Tests that the per-connection caches hand out read-only snapshots
+        instead of copies, and that they hash the same as the source data.
+        """
+        software_entities = self.api._get_software_entities()
+        self.assertIs(software_entities, self.api._get_software_entities())
+
+        with self.assertRaises(TypeError):
+            software_entities[0]["code"] = "Something New"
+
+        config_descriptor = MockConfigDescriptor(
+            path=self.config_root,
+            is_immutable=True,
+        )
+        self.assertEqual(
+            self.api._get_contents_hash(config_descriptor, software_entities),
+            self.api._get_contents_hash(
+                config_descriptor,
+                [dict(entity) for entity in software_entities],
+            ),
+        )
+
+    def test_connection_cache_manager(self):
+        """
+        Tests that per-connection caches are released, expired and evicted,
+        and that the manager keeps count of it.
+        """
+        caches = self.framework_module.shotgun.caches
+        manager = caches.ConnectionCacheManager(
+            ttl=3600.0, max_bytes=1024 * 1024, size_interval=0.0
+        )
+
+        cache = manager.get("key_1")
+        cache["data"] = "foobar"
+        self.assertIs(manager.get("key_1"), cache)
+
+        # Releasing a connection drops its data.
+        manager.release("key_1")
+        self.assertEqual(manager.get("key_1"), dict())
+
+        stats = manager.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["releases"], 1)
+
+        # The least recently used caches are evicted when over budget, but
+        # the one being requested is kept.
+        manager = caches.ConnectionCacheManager(
+            ttl=3600.0, max_bytes=1, size_interval=0.0
+        )
+        manager.get("key_1")["data"] = "foobar"
+        manager.get("key_2")["data"] = "foobar"
+        manager.get("key_2")
+        self.assertEqual(len(manager), 1)
+        self.assertEqual(manager.get("key_2"), dict(data="foobar"))
+        self.assertEqual(manager.stats()["evictions"], 1)
+
+        # Expired caches are dropped.
+        manager = caches.ConnectionCacheManager(
+            ttl=0.0, max_bytes=1024 * 1024, size_interval=0.0
+        )
+        manager.get("key_1")["data"] = "foobar"
+        self.assertEqual(manager.get("key_1"), dict())
+        self.assertEqual(manager.stats()["expirations"], 1)
+
+    def test_shared_cache(self):
+        """
+        Tests that data shared by all connections is fetched once, and
+        dropped when the site's event log shows that it changed.
+        """
+        caches = self.framework_module.shotgun.caches
+        shared_cache = caches.SharedCache(ttl=3600.0, probe_interval=0.0)
+        fetches = []
+
+        def fetch():
+            fetches.append(None)
+            return len(fetches)
+
+        key = ("site", "software_entities", None)
+        self.assertEqual(shared_cache.get(key, fetch), 1)
+        self.assertEqual(shared_cache.get(key, fetch), 1)
+
+        # The first probe only records the latest event.
+        shared_cache.check_events("site", lambda last_event_id: 10)
+        self.assertEqual(shared_cache.get(key, fetch), 1)
+
+        # No relevant event since then.
+        shared_cache.check_events("site", lambda last_event_id: None)
+        self.assertEqual(shared_cache.get(key, fetch), 1)
+
+        # A relevant event drops the site's data.
+        probed = []
+        shared_cache.check_events(
+            "site", lambda last_event_id: probed.append(last_event_id) or 11
+        )
+        self.assertEqual(probed, [10])
+        self.assertEqual(shared_cache.get(key, fetch), 2)
+
+        # Data can also be dropped explicitly.
+        shared_cache.invalidate("site", "pipeline_configurations")
+        self.assertEqual(shared_cache.get(key, fetch), 2)
+        shared_cache.invalidate("site", "software_entities")
+        self.assertEqual(shared_cache.get(key, fetch), 3)
+
+    def _wait_for_owners(self, flights, key, count):
+        """
+        Waits until the given number of callers joined the call in progress
+        for a key.
+
+        :param flights: The :class:`concurrency.SingleFlight` object.
+        :param key: The key of the call.
+        :param int count: The number of owners to wait for.
+        """
+        cancellation = flights.cancellation(key)
+        deadline = time.monotonic() + 10
+        while len(cancellation._owners) < count:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_single_flight(self):
+        """
+        Tests that concurrent calls for the same key share a single call.
+        """
+        concurrency = self.framework_module.shotgun.concurrency
+        flights = concurrency.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def func():
+            calls.append(None)
+            started.set()
+            release.wait()
+            return len(calls)
+
+        leader = threading.Thread(
+            target=lambda: results.append(flights.do("key", func, owner="leader"))
+        )
+        leader.start()
+        started.wait()
+        self.assertTrue(flights.in_flight("key"))
+
+        follower = threading.Thread(
+            target=lambda: results.append(flights.do("key", func, owner="follower"))
+        )
+        follower.start()
+        # The follower waits on the leader's call once it joined it.
+        self._wait_for_owners(flights, "key", 2)
+        release.set()
+        leader.join()
+        follower.join()
+
+        # The function was only called once, and both callers got its result.
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [1, 1])
+        self.assertFalse(flights.in_flight("key"))
+
+        # Errors are raised again for the caller that got them.
+        def fail():
+            raise ValueError("foobar")
+
+        self.assertRaises(ValueError, flights.do, "key", fail)
+        self.assertFalse(flights.in_flight("key"))
+
+    def test_single_flight_release(self):
+        """
+        Tests that calls are only cancelled once all their owners released
+        them, and never when a caller gave no owner.
+        """
+        concurrency = self.framework_module.shotgun.concurrency
+        flights = concurrency.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        cancelled = []
+
+        def func():
+            flights.cancellation("key").on_cancel(lambda: cancelled.append(None))
+            started.set()
+            release.wait()
+            return flights.cancellation("key").cancelled
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda owner=owner: results.append(
+                    flights.do("key", func, owner=owner)
+                )
+            )
+            for owner in ("first", "second")
+        ]
+        threads[0].start()
+        started.wait()
+        threads[1].start()
+        self._wait_for_owners(flights, "key", 2)
+
+        # Another caller still needs the call.
+        self.assertEqual(flights.release("first"), 0)
+        self.assertEqual(cancelled, [])
+
+        self.assertEqual(flights.release("second"), 1)
+        self.assertEqual(cancelled, [None])
+
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True, True])
+
+        # Calls made without an owner are never cancelled.
+        cancellation = concurrency.Cancellation()
+        cancellation.add_owner("first")
+        cancellation.add_owner(None)
+        self.assertFalse(cancellation.release("first"))
+        self.assertFalse(cancellation.cancelled)
+
+    def test_work_queue(self):
+        """
+        Tests that work items are deduplicated by key, and dropped when the
+        queue is full.
+        """
+        concurrency = self.framework_module.shotgun.concurrency
+        work_queue = concurrency.WorkQueue(
+            max_workers=1, max_queued=1, name="TestWorkQueue"
+        )
+        started = threading.Event()
+        release = threading.Event()
+        done = threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        self.assertTrue(work_queue.submit("key_1", block))
+        started.wait()
+
+        # The running item's key is deduplicated, and only one item fits in
+        # the queue.
+        self.assertFalse(work_queue.submit("key_1", block))
+        self.assertTrue(work_queue.submit("key_2", done.set))
+        self.assertFalse(work_queue.submit("key_3", done.set))
+        self.assertEqual(len(work_queue), 1)
+
+        stats = work_queue.stats()
+        self.assertEqual(stats["running"], 1)
+        self.assertEqual(stats["queued"], 1)
+        self.assertEqual(stats["deduplicated"], 1)
+        self.assertEqual(stats["dropped"], 1)
+
+        release.set()
+        done.wait()
+        work_queue.shutdown()
+        self.assertFalse(work_queue.submit("key_4", done.set))
+
+    def test_hook_cache(self):
+        """
+        Tests that the browser_integration hook is instantiated once, and
+        that the cache keys it computes are memoized.
+        """
+        hook = self.api._get_browser_integration_hook()
+        kwargs = dict(
+            config_uri="sgtk:descriptor:path?path=/foo",
+            project=dict(type="Project", id=1),
+            entity_type="Shot",
+        )
+        key = ("sgtk:descriptor:path?path=/foo", 1, "Shot")
+        cache_key = hook.execute_memoized(key, "get_cache_key", **kwargs)
+
+        with patch.object(
+            self.api._bundle, "create_hook_instance"
+        ) as create_hook_instance:
+            self.assertEqual(
+                hook.execute_memoized(key, "get_cache_key", **kwargs), cache_key
+            )
+            create_hook_instance.assert_not_called()
+
+    def test_config_watcher(self):
+        """
+        Tests that the config watcher keeps the yml file mtimes of a
+        directory up to date, with inotify as well as by polling.
+        """
+        config_watcher = self.framework_module.shotgun.config_watcher
+
+        for force_polling in (False, True):
+            env_path = tempfile.mkdtemp()
+            yml_path = os.path.join(env_path, "project.yml")
+            open(yml_path, "w").close()
+
+            watcher = config_watcher.ConfigWatcher(
+                poll_interval=3600.0, force_polling=force_polling
+            )
+            changes = []
+            watcher.add_listener(changes.append)
+
+            try:
+                self.assertEqual(list(watcher.get_mtimes(env_path)), [yml_path])
+
+                os.utime(yml_path, (1, 1))
+                watcher.refresh()
+                self.assertEqual(watcher.get_mtimes(env_path)[yml_path], 1)
+
+                # New directories are picked up as well.
+                os.makedirs(os.path.join(env_path, "includes"))
+                new_yml_path = os.path.join(env_path, "includes", "apps.yml")
+                open(new_yml_path, "w").close()
+                watcher.refresh()
+                self.assertIn(new_yml_path, watcher.get_mtimes(env_path))
+                self.assertIn(env_path, changes)
+            finally:
+                watcher.close()
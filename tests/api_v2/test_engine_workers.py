@@ -0,0 +1,270 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+from tank_test.tank_test_base import setUpModule  # noqa
+from base_test import TestDesktopServerFramework
+
+
+class TestEngineWorkers(TestDesktopServerFramework):
+    """
+    Tests for the engine worker pool, whose workers run a fake script that
+    answers requests without bootstrapping anything.
+    """
+
+    def setUp(self):
+        super(TestEngineWorkers, self).setUp()
+        self.engine_workers = self.framework_module.shotgun.engine_workers
+
+        patched = patch.object(
+            self.engine_workers.EngineWorker,
+            "SCRIPT",
+            os.path.join(
+                self.framework_root, "tests", "fixtures", "fake_engine_worker.py"
+            ),
+        )
+        patched.start()
+        self.addCleanup(patched.stop)
+
+        self.pool = self._create_pool(idle_timeout=600, reap_interval=60)
+
+    def _create_pool(self, idle_timeout, reap_interval):
+        """
+        Creates an engine worker pool that is shut down once the test is done.
+
+        :returns: An :class:`engine_workers.EngineWorkerPool` object.
+        """
+        pool = self.engine_workers.EngineWorkerPool(idle_timeout, reap_interval)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def _request(self, request, contents_hash="hash", pool=None, **kwargs):
+        """
+        Sends a request to the worker of the test's configuration.
+
+        :param dict request: The request to send.
+        :param str contents_hash: The current contents hash of the configuration.
+        :param pool: The pool to use, if not the test's.
+        :param kwargs: Arguments for :meth:`EngineWorkerPool.request`.
+
+        :returns: The result sent back by the worker.
+        :rtype: dict
+        """
+        return (pool or self.pool).request(
+            "config",
+            sys.executable,
+            contents_hash,
+            dict(name="init"),
+            request,
+            **kwargs
+        )
+
+    def _request_from_thread(self, request, **kwargs):
+        """
+        Sends a request to the worker of the test's configuration from another
+        thread, once it's registered in the pool.
+
+        :param dict request: The request to send.
+        :param kwargs: Arguments for :meth:`EngineWorkerPool.request`.
+
+        :returns: A tuple containing the thread, the worker and a list that
+            holds the result, or the error, once the thread is done.
+        :rtype: tuple
+        """
+        outcome = []
+
+        def run():
+            try:
+                outcome.append(self._request(request, **kwargs))
+            except Exception as e:
+                outcome.append(e)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join)
+
+        self._wait_until(lambda: self._get_worker() is not None)
+        worker = self._get_worker()
+        self._wait_until(worker.is_busy)
+        return thread, worker, outcome
+
+    def _get_worker(self, pool=None):
+        """
+        Gets the worker registered for the test's configuration.
+
+        :returns: An :class:`engine_workers.EngineWorker` object, or None.
+        """
+        return (pool or self.pool)._workers.get(("config", sys.executable))
+
+    def _wait_until(self, predicate):
+        """
+        Waits until the given predicate is true.
+
+        :param predicate: Callable that takes no arguments.
+        """
+        deadline = time.monotonic() + 10
+        while not predicate():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_engine_worker_reuse(self):
+        """
+        Tests that a worker answers the requests for its configuration until
+        the configuration changes.
+        """
+        result = self._request(dict(value=1))
+        self.assertEqual(result["value"], 1)
+        self.assertEqual(result["init_data"], dict(name="init"))
+
+        worker = self._get_worker()
+        self.assertEqual(self._request(dict(value=2))["pid"], result["pid"])
+
+        # A worker started for an out of date contents hash is replaced.
+        self.assertNotEqual(
+            self._request(dict(value=3), contents_hash="new_hash")["pid"],
+            result["pid"],
+        )
+        self.assertEqual(worker._process.wait(timeout=10), 0)
+
+    def test_dead_engine_worker(self):
+        """
+        Tests that a worker that died is replaced.
+        """
+        pid = self._request(dict(value=1))["pid"]
+
+        worker = self._get_worker()
+        worker._process.kill()
+        worker._process.wait()
+        new_pid = self._request(dict(value=2))["pid"]
+        self.assertNotEqual(new_pid, pid)
+
+        # The worker dies in the middle of the request.
+        self.assertRaises(
+            self.engine_workers.EngineWorkerError, self._request, dict(exit=True)
+        )
+        self.assertIsNone(self._get_worker())
+        self.assertNotEqual(self._request(dict(value=3))["pid"], new_pid)
+
+    def test_engine_worker_retired_during_request(self):
+        """
+        Tests that a worker replaced or discarded while it's processing a
+        request is only stopped once the request is done.
+        """
+        thread, worker, outcome = self._request_from_thread(
+            dict(value="first", sleep=1)
+        )
+        # The new worker answers right away.
+        result = self._request(dict(value="second"), contents_hash="new_hash")
+        self.assertEqual(result["value"], "second")
+        self.assertNotEqual(result["pid"], worker._process.pid)
+
+        thread.join()
+        self.assertEqual(outcome[0]["value"], "first")
+        self.assertEqual(worker._process.wait(timeout=10), 0)
+
+        thread, worker, outcome = self._request_from_thread(
+            dict(value="third", sleep=1), contents_hash="new_hash"
+        )
+        self.pool.discard("config", sys.executable)
+        self.assertIsNone(self._get_worker())
+
+        thread.join()
+        self.assertEqual(outcome[0]["value"], "third")
+        self.assertEqual(worker._process.wait(timeout=10), 0)
+
+    def test_idle_engine_workers_reaped(self):
+        """
+        Tests that workers that haven't been used for a while are stopped.
+        """
+        pool = self._create_pool(idle_timeout=0.1, reap_interval=0.1)
+        self._request(dict(value=1), pool=pool)
+
+        worker = self._get_worker(pool)
+        self._wait_until(lambda: self._get_worker(pool) is None)
+        self.assertEqual(worker._process.wait(timeout=10), 0)
+
+    def test_busy_engine_worker(self):
+        """
+        Tests that a request that can't wait isn't sent to a busy worker, and
+        that the output sent ahead of the result is reported.
+        """
+        thread, worker, outcome = self._request_from_thread(dict(value=1, sleep=1))
+        self.assertRaises(
+            self.engine_workers.EngineWorkerBusyError,
+            self._request,
+            dict(value=2),
+            blocking=False,
+        )
+
+        thread.join()
+        self.assertEqual(outcome[0]["value"], 1)
+
+        output = []
+        result = self._request(
+            dict(value=3, output=["first line", "second line"]),
+            on_output=output.append,
+            blocking=False,
+        )
+        self.assertEqual(result["pid"], worker._process.pid)
+        self.assertEqual(output, ["first line", "second line"])
+
+    def test_engine_worker_timeout(self):
+        """
+        Tests that a worker is killed and discarded once its request timed
+        out, and that waiting for a busy worker times out too.
+        """
+        thread, worker, outcome = self._request_from_thread(dict(value=1, sleep=1))
+        self.assertRaises(
+            self.engine_workers.EngineWorkerBusyError,
+            self._request,
+            dict(value=2),
+            timeout=0.1,
+        )
+        thread.join()
+
+        with self.assertRaises(self.engine_workers.EngineWorkerInterruptedError) as cm:
+            self._request(dict(value=3, sleep=30), timeout=0.5)
+        self.assertFalse(cm.exception.cancelled)
+        self.assertIsNone(self._get_worker())
+        self.assertIsNotNone(worker._process.wait(timeout=10))
+
+    def test_engine_worker_cancel(self):
+        """
+        Tests that a worker is killed once its request is cancelled, and only
+        then.
+        """
+        concurrency = self.framework_module.shotgun.concurrency
+
+        cancellation = concurrency.Cancellation()
+        cancellation.add_owner("owner")
+        thread, worker, outcome = self._request_from_thread(
+            dict(value=1, sleep=30), cancellation=cancellation
+        )
+        cancellation.release("owner")
+        thread.join()
+
+        self.assertIsInstance(
+            outcome[0], self.engine_workers.EngineWorkerInterruptedError
+        )
+        self.assertTrue(outcome[0].cancelled)
+        self.assertIsNone(self._get_worker())
+
+        # Cancelling a request that is done doesn't affect the worker.
+        cancellation = concurrency.Cancellation()
+        cancellation.add_owner("owner")
+        pid = self._request(dict(value=2), cancellation=cancellation)["pid"]
+        cancellation.release("owner")
+        self.assertTrue(self._get_worker().is_alive())
+        self.assertEqual(self._request(dict(value=3))["pid"], pid)
@@ -8,7 +8,10 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
-from unittest.mock import patch
+import base64
+import importlib.util
+import os
+from unittest.mock import MagicMock, patch
 import sgtk
 from tank_test.tank_test_base import setUpModule  # noqa
 
@@ -134,6 +137,36 @@ class TestUtilMethods(TestDesktopServerFramework):
         self.assertTrue(isinstance(actual_return[0], dict))
         self.assertEqual(project_entity["id"], actual_return[0]["id"])
 
+    def test_batched_parent_projects(self):
+        """
+        Tests that the projects of multiple entities are queried all at once,
+        and cached for the following requests.
+        """
+        project_entity = dict(type="Project", id=1)
+        shot_entities = [
+            dict(type="Shot", id=entity_id, project=project_entity)
+            for entity_id in (2, 3, 4)
+        ]
+        self.add_to_sg_mock_db([project_entity] + shot_entities)
+
+        test_payload = dict(
+            project_id=None,
+            entity_type="Shot",
+            entity_ids=[2, 3, 4],
+        )
+
+        shotgun = self.api._engine.shotgun
+        with patch.object(shotgun, "find", wraps=shotgun.find) as find:
+            project, entities = self.api._get_entities_from_payload(test_payload)
+            self.assertEqual(find.call_count, 1)
+
+            self.assertEqual(project["id"], project_entity["id"])
+            for entity in entities:
+                self.assertEqual(entity["project"]["id"], project_entity["id"])
+
+            self.api._get_entities_from_payload(test_payload)
+            self.assertEqual(find.call_count, 1)
+
     def test_get_task_entity_parent_type(self):
         """
         Tests that we get the correct parent entity type from Tasks.
@@ -157,6 +190,50 @@ class TestUtilMethods(TestDesktopServerFramework):
         self.assertEqual(self.api._get_task_parent_entity_type(task_id=1), "Shot")
         self.assertEqual(self.api._get_task_parent_entity_type(task_id=2), "Asset")
 
+        # The parent entity types are persisted, so a new connection doesn't
+        # query them again.
+        self.api._cache = dict()
+        shotgun = self.api._engine.shotgun
+        with patch.object(shotgun, "find", wraps=shotgun.find) as find:
+            self.assertEqual(
+                self.api._get_task_parent_entity_types([1, 2]),
+                {1: "Shot", 2: "Asset"},
+            )
+            self.assertEqual(find.call_count, 0)
+
+    def test_prefetch_task_parent_entity_types(self):
+        """
+        Tests that the parent entity types of all the Tasks in a payload are
+        queried with a single find.
+        """
+        task_entities = [
+            dict(
+                type="Task",
+                id=task_id,
+                content="Task %s" % task_id,
+                entity=dict(type="Shot", id=task_id),
+            )
+            for task_id in range(10, 15)
+        ]
+        self.add_to_sg_mock_db(task_entities)
+
+        project_entity, entities = self.api._get_entities_from_payload(
+            dict(
+                project_id=self.project["id"],
+                entity_type="Task",
+                entity_ids=[task["id"] for task in task_entities],
+            )
+        )
+
+        shotgun = self.api._engine.shotgun
+        with patch.object(shotgun, "find", wraps=shotgun.find) as find:
+            self.api._prefetch_task_parent_entity_types(entities)
+            for task in task_entities:
+                self.assertEqual(
+                    self.api._get_task_parent_entity_type(task["id"]), "Shot"
+                )
+            self.assertEqual(find.call_count, 1)
+
     def test_legacy_shotgun_environments(self):
         """
         Tests to ensure that a shotgun_xxx.yml file in a config includes
@@ -265,6 +342,114 @@ class TestUtilMethods(TestDesktopServerFramework):
         self.assertEqual(len(filtered_actions), 1)
         self.assertEqual(filtered_actions[0], actions[0])
 
+    def test_hook_commands_filtered_by_project(self):
+        """
+        Tests that the commands added by the browser_integration hook are
+        filtered by project like the cached ones.
+        """
+        sw = dict(
+            code="Maya",
+            engine="tk-maya",
+            id=8,
+            type="Software",
+            projects=[dict(type="Project", id=999)],
+        )
+        self.add_to_sg_mock_db([sw])
+
+        cached = dict(name="cached", title="Cached", app_name="tk-multi-app")
+        added = dict(
+            name="launch_maya",
+            title="Maya",
+            app_name="tk-multi-launchapp",
+            engine_name="tk-maya",
+            software_entity_id=8,
+        )
+
+        def process_commands(method_name, commands, project, entities):
+            return commands + [dict(added)]
+
+        hook = MagicMock()
+        hook.execute.side_effect = process_commands
+        config = dict(type="PipelineConfiguration", id=1, name="Primary")
+        project = dict(type="Project", id=1)
+
+        with patch.object(self.api, "_get_browser_integration_hook", return_value=hook):
+            self.api._reply_actions(
+                {1: dict(entity=config, commands=(cached,))},
+                set(),
+                dict(),
+                dict(),
+                [],
+                project,
+                [project],
+            )
+
+        actions = self.mock_host.reply_data["actions"]["Primary"]["actions"]
+        self.assertEqual([action["name"] for action in actions], ["cached"])
+
+    def test_stream_command_output(self):
+        """
+        Tests that only the log messages of an engine command are streamed to
+        the client.
+        """
+        encoded = base64.b64encode(b"Creating folders\nfor 3 shots").decode("utf-8")
+
+        with patch.object(self.mock_host, "progress", create=True) as progress:
+            self.api._stream_command_output("stderr", "Traceback:\n")
+            self.api._stream_command_output("stdout", "PTR:%s\n" % encoded)
+
+        progress.assert_called_once_with(dict(out="Creating folders\nfor 3 shots"))
+
+    def test_batch_commands_failure(self):
+        """
+        Tests that an entity of the batch whose commands can't be listed is
+        reported on its own, without interrupting the rest of the batch.
+        """
+        script = os.path.join(
+            self.framework_root,
+            "python",
+            "tk_framework_desktopserver",
+            "shotgun",
+            "scripts",
+            "get_commands.py",
+        )
+        spec = importlib.util.spec_from_file_location("get_commands", script)
+        get_commands = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(get_commands)
+
+        batch = [
+            dict(lookup_hash="shot", data=dict(entity_type="Shot", entity_id=1)),
+            dict(lookup_hash="asset", data=dict(entity_type="Asset", entity_id=2)),
+        ]
+        engine = MagicMock()
+
+        def get_engine_commands(engine, entity_type, config_is_mutable):
+            if entity_type == "Shot":
+                raise RuntimeError("Broken hook")
+            return [dict(name="cmd")]
+
+        with patch.object(get_commands, "start_engine", return_value=engine):
+            with patch.object(
+                get_commands, "get_engine_commands", side_effect=get_engine_commands
+            ):
+                results = get_commands.get_batch_commands(
+                    None, "tk-shotgun", batch, False
+                )
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["lookup_hash"], "shot")
+        self.assertEqual(
+            results[0]["retcode"], get_commands.ENGINE_INIT_ERROR_EXIT_CODE
+        )
+        self.assertIn("Broken hook", results[0]["output"])
+        self.assertIsNone(results[0]["commands"])
+        self.assertEqual(results[1]["lookup_hash"], "asset")
+        self.assertEqual(results[1]["retcode"], 0)
+        self.assertEqual(results[1]["commands"], [dict(name="cmd")])
+
+        # Both engines were destroyed.
+        self.assertEqual(engine.destroy.call_count, 2)
+
     def test_multiple_projects_per_software(self):
         """
         Tests to ensure that a software can be assigned to multiple projects.
@@ -440,6 +625,57 @@ class TestUtilMethods(TestDesktopServerFramework):
         # registered one.
         self.assertEqual(filtered_actions, actions[1:])
 
+    def test_software_index(self):
+        """
+        Tests that the Software index gives the same answers as scanning the
+        Software entities available in each project.
+        """
+
+        def project(project_id):
+            return dict(type="Project", id=project_id)
+
+        sw_entities = [
+            dict(id=1, engine="tk-maya", projects=[]),
+            dict(id=2, engine="tk-maya", projects=[project(10)]),
+            dict(id=3, engine="tk-nuke", projects=[project(10), project(11)]),
+            dict(id=4, engine="tk-nuke", projects=[project(12)]),
+            dict(id=5, engine="tk-houdini", projects=[project(11)]),
+            dict(id=6, engine="tk-houdini"),
+            dict(id=7, engine=None, projects=[project(12)]),
+            dict(id=8, engine="tk-3dsmax", projects=[project(10)]),
+        ]
+        sw_index = self.framework_module.shotgun.caches.SoftwareIndex(sw_entities)
+
+        for project_id in (10, 11, 12, 13):
+            # This is how actions used to be filtered.
+            available = [
+                sw
+                for sw in sw_entities
+                if not sw.get("projects", [])
+                or project_id in [p["id"] for p in sw["projects"]]
+            ]
+
+            for sw_id in range(10):
+                self.assertEqual(
+                    sw_index.allows_software(sw_id, project_id),
+                    any(sw["id"] == sw_id for sw in available),
+                    (sw_id, project_id),
+                )
+
+            for engine_name in (
+                "tk-maya",
+                "tk-nuke",
+                "tk-houdini",
+                "tk-3dsmax",
+                "tk-photoshopcc",
+                None,
+            ):
+                self.assertEqual(
+                    sw_index.allows_engine(engine_name, project_id),
+                    any(sw["engine"] == engine_name for sw in available),
+                    (engine_name, project_id),
+                )
+
     @patch("sgtk.log.LogManager.global_debug")
     def test_get_exception_message(self, global_mock):
         """
@@ -0,0 +1,295 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import json
+import os
+import select
+import signal
+import sys
+import time
+from unittest.mock import Mock, patch
+
+from tank_test.tank_test_base import setUpModule  # noqa
+
+import sgtk
+
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+sys.path.insert(0, os.path.join(repo_root, "python"))
+
+# Mock Qt since we don't have it.
+sgtk.platform.qt.QtCore = Mock()
+sgtk.platform.qt.QtGui = Mock()
+
+# Doing this import will add the twisted librairies
+import tk_framework_desktopserver  # noqa
+from tk_framework_desktopserver.command import Command
+
+from twisted.internet import defer, reactor, task
+from twisted.trial import unittest
+
+# Reads a value from its stdin, and writes it back doubled to its results
+# pipe, separately from its output.
+RESULTS_SCRIPT = """
+import json, os, sys
+arguments = json.load(sys.stdin)
+results = os.environ.pop(%r)
+print("working")
+with open(int(results), "wt") as f:
+    json.dump(dict(value=arguments["value"] * 2), f)
+""" % Command.RESULTS_ENV_VAR
+
+
+def python_args(script):
+    """
+    Builds the command line running a Python script with our interpreter.
+
+    :param str script: The source of the script.
+
+    :returns: Command line tokens.
+    :rtype: list
+    """
+    return [sys.executable, "-c", script]
+
+
+class TestCommand(unittest.TestCase):
+    """
+    Tests for running subprocesses and reading their output.
+    """
+
+    # The output of processes run on Windows is only read once they've exited.
+    skip = "Not supported on Windows." if sgtk.util.is_windows() else None
+
+    def test_read_output(self):
+        """
+        Tests that both pipes are read as the process writes to them, and that
+        each complete line is reported as soon as it's read.
+        """
+        lines = []
+        retcode, stdout, stderr = Command.call_cmd(
+            python_args(
+                "import sys\n"
+                "sys.stdout.write('out 1\\nout')\n"
+                "sys.stdout.flush()\n"
+                # More than a pipe can hold, which the process can only write
+                # if stderr is read before stdout is closed.
+                "sys.stderr.buffer.write(b'err \\xc3\\xa9\\n' + b'e' * 1000000)\n"
+                "sys.stderr.flush()\n"
+                "sys.stdout.write(' 2\\n')\n"
+                "sys.exit(3)\n"
+            ),
+            line_callback=lambda name, line: lines.append((name, line)),
+        )
+
+        self.assertEqual(retcode, 3)
+        self.assertEqual(stdout, "out 1\nout 2\n")
+        self.assertEqual(stderr, "err é\n" + "e" * 1000000)
+        self.assertEqual(
+            [line for name, line in lines if name == "stdout"], ["out 1\n", "out 2\n"]
+        )
+        # The last line is reported once the pipe is closed.
+        self.assertEqual(
+            [line for name, line in lines if name == "stderr"],
+            ["err é\n", "e" * 1000000],
+        )
+
+    def test_timeout(self):
+        """
+        Tests that a process is terminated once its timeout is over, and
+        killed if it's still running once the grace period is over.
+        """
+        self.patch(Command, "TERMINATE_GRACE_PERIOD", 0.5)
+
+        retcode, stdout, stderr = Command.call_cmd(
+            python_args("import time\nprint('ready', flush=True)\ntime.sleep(30)"),
+            timeout=0.5,
+        )
+        self.assertEqual(retcode, -signal.SIGTERM)
+        self.assertEqual(stdout, "ready\n")
+        self.assertTrue(stderr.endswith(Command.get_timeout_message(0.5)))
+
+        start = time.monotonic()
+        retcode, stdout, stderr = Command.call_cmd(
+            python_args(
+                "import signal, time\n"
+                "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+                "print('ready', flush=True)\n"
+                "time.sleep(30)\n"
+            ),
+            timeout=2,
+        )
+        self.assertEqual(retcode, -signal.SIGKILL)
+        self.assertEqual(stdout, "ready\n")
+        self.assertTrue(stderr.endswith(Command.get_timeout_message(2)))
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_stdin_data(self):
+        """
+        Tests that the data for the process' stdin is written as the process
+        reads it, at most PIPE_BUF bytes at a time, while its output is read.
+        """
+        data = b"0123456789abcdef\n" * 100000
+
+        # The process writes its stdin back as it reads it, so it would block
+        # on a full stdout if we wrote all the data before reading.
+        with patch.object(os, "write", wraps=os.write) as write:
+            retcode, stdout, stderr = Command.call_cmd(
+                python_args(
+                    "import os\n"
+                    "while True:\n"
+                    "    data = os.read(0, 65536)\n"
+                    "    if not data:\n"
+                    "        break\n"
+                    "    os.write(1, data)\n"
+                ),
+                stdin_data=data,
+            )
+
+        self.assertEqual(retcode, 0)
+        self.assertEqual(stdout, data.decode("utf-8"))
+        self.assertGreater(write.call_count, 1)
+        for call in write.call_args_list:
+            self.assertLessEqual(len(call[0][1]), select.PIPE_BUF)
+
+    def test_results_pipe(self):
+        """
+        Tests that the results the process writes to its own pipe are returned
+        separately from its output.
+        """
+        retcode, stdout, stderr, results = Command.call_cmd(
+            python_args(RESULTS_SCRIPT),
+            stdin_data=json.dumps(dict(value=21)).encode("utf-8"),
+            results_pipe=True,
+        )
+        self.assertEqual(retcode, 0)
+        self.assertEqual(stdout, "working\n")
+        self.assertEqual(json.loads(results), dict(value=42))
+
+        # A process that doesn't write any results.
+        self.assertEqual(
+            Command.call_cmd(python_args("pass"), results_pipe=True), (0, "", "", "")
+        )
+
+    def test_pipes_closed_on_error(self):
+        """
+        Tests that the pipes are closed, and the process killed and reaped,
+        when reading its output fails.
+        """
+        pids = []
+
+        def line_callback(name, line):
+            pids.append(int(line))
+            raise ValueError("Unexpected output.")
+
+        open_fds = len(os.listdir("/dev/fd"))
+        retcode, stdout, stderr, results = Command.call_cmd(
+            python_args(
+                "import os, time\n"
+                "print(os.getpid(), flush=True)\n"
+                "time.sleep(30)\n"
+            ),
+            line_callback=line_callback,
+            results_pipe=True,
+        )
+
+        self.assertEqual(retcode, 1)
+        self.assertIn("ValueError", stderr)
+        self.assertEqual(len(os.listdir("/dev/fd")), open_fds)
+        # There is no process left, not even a zombie.
+        self.assertRaises(ProcessLookupError, os.kill, pids[0], 0)
+
+    def _wait_for_exit(self, pid):
+        """
+        Waits for a process to exit and be reaped, without blocking the
+        reactor.
+
+        :param int pid: The process id.
+
+        :returns: A Deferred firing once the process is gone.
+        """
+
+        def check():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return None
+            return task.deferLater(reactor, 0.05, check)
+
+        return defer.maybeDeferred(check)
+
+    def test_spawn_cmd(self):
+        """
+        Tests that the Deferred of a process spawned by the reactor fires with
+        its exit code, its output and its results.
+        """
+        lines = []
+        deferred = Command.spawn_cmd(
+            python_args(RESULTS_SCRIPT + "sys.exit(3)\n"),
+            line_callback=lambda name, line: lines.append((name, line)),
+            stdin_data=json.dumps(dict(value=21)).encode("utf-8"),
+            results_pipe=True,
+        )
+
+        def check(result):
+            retcode, stdout, stderr, results = result
+            self.assertEqual(retcode, 3)
+            self.assertEqual(stdout, "working\n")
+            self.assertEqual(json.loads(results), dict(value=42))
+            self.assertEqual(lines, [("stdout", "working\n")])
+
+        return deferred.addCallback(check)
+
+    def test_spawn_cmd_timeout(self):
+        """
+        Tests that a process spawned by the reactor is killed once its timeout
+        and the grace period are over.
+        """
+        self.patch(Command, "TERMINATE_GRACE_PERIOD", 0.5)
+
+        deferred = Command.spawn_cmd(
+            python_args(
+                "import signal, time\n"
+                "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+                "print('ready', flush=True)\n"
+                "time.sleep(30)\n"
+            ),
+            timeout=2,
+        )
+
+        def check(result):
+            retcode, stdout, stderr = result
+            self.assertEqual(retcode, -signal.SIGKILL)
+            self.assertEqual(stdout, "ready\n")
+            self.assertTrue(stderr.endswith(Command.get_timeout_message(2)))
+
+        return deferred.addCallback(check)
+
+    def test_spawn_cmd_cancel(self):
+        """
+        Tests that cancelling the Deferred of a process spawned by the reactor
+        terminates the process.
+        """
+        started = defer.Deferred()
+        deferred = Command.spawn_cmd(
+            python_args(
+                "import os, time\n"
+                "print(os.getpid(), flush=True)\n"
+                "time.sleep(30)\n"
+            ),
+            line_callback=lambda name, line: started.callback(int(line)),
+        )
+
+        def cancel(pid):
+            deferred.cancel()
+            return self.assertFailure(deferred, defer.CancelledError).addCallback(
+                lambda _: self._wait_for_exit(pid)
+            )
+
+        return started.addCallback(cancel)
@@ -0,0 +1,63 @@
+# Copyright (c) 2026 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Stands in for scripts/engine_worker.py in the engine worker tests. It speaks
+the same protocol without bootstrapping anything: each request is answered
+with the worker's process id, its initialization data and the request's
+value, once the request's output lines are sent and its delay is over.
+"""
+
+import os
+import sys
+import json
+import time
+
+
+def send(message):
+    """
+    Sends a message back to the engine worker pool.
+
+    :param dict message: The message to send.
+    """
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def main():
+    init_data = json.loads(sys.stdin.readline())
+
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+
+        request = json.loads(line)
+        for output in request.get("output", []):
+            send(dict(type="output", line=output))
+
+        time.sleep(request.get("sleep", 0))
+        if request.get("exit"):
+            # Dies in the middle of the request.
+            sys.exit(1)
+
+        send(
+            dict(
+                type="result",
+                retcode=0,
+                pid=os.getpid(),
+                init_data=init_data,
+                value=request.get("value"),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -67,6 +67,10 @@ class TestDesktopServerFramework(TankTestBase):
         """
         Fixtures teardown
         """
+        # The API keeps its database connections open between requests, so
+        # we release them along with everything else it shares.
+        self.api.tear_down()
+
         # engine is held as global, so must be destroyed.
         cur_engine = sgtk.platform.current_engine()
         if cur_engine:
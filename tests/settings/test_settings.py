@@ -41,6 +41,7 @@ class TestFrameworkWithUserSettings(ShotgunTestBase):
         self.assertEqual(settings.port, 9000)
         self.assertEqual(settings.certificate_folder, None)
         self.assertEqual(settings.integration_enabled, True)
+        self.assertEqual(settings.prewarm_projects, 5)
         self.assertDictEqual(settings.host_aliases, {})
 
     def test_browser_integration_settings(self):
@@ -52,6 +53,7 @@ class TestFrameworkWithUserSettings(ShotgunTestBase):
                 "port": 9001,
                 "certificate_folder": "/a/b/c",
                 "enabled": False,
+                "prewarm_projects": 0,
             }
         )
 
@@ -59,6 +61,7 @@ class TestFrameworkWithUserSettings(ShotgunTestBase):
         self.assertEqual(settings.port, 9001)
         self.assertEqual(settings.certificate_folder, "/a/b/c")
         self.assertEqual(settings.integration_enabled, False)
+        self.assertEqual(settings.prewarm_projects, 0)
 
     def test_host_aliases(self):
         """